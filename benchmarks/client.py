@@ -0,0 +1,262 @@
+"""
+Measures the throughput, latency, CPU time and allocations of client methods
+against a local App Search stand-in, serially, from threads and from asyncio
+tasks.
+
+    python -m benchmarks.client --duration 2 --output baseline.json
+    python -m benchmarks.client --compare baseline.json
+
+Results are written as JSON so that runs can be compared. CPU time is that
+of the benchmark process, the stand-in runs in a separate process unless
+`--in-process` is given.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from elastic_app_search import Client
+from elastic_app_search.instrumentation import Histogram
+from elastic_app_search.retry import RetryPolicy
+
+from .standin import StandInConfig, StandInServer, start_in_subprocess
+
+try:
+    from elastic_app_search.async_client import AsyncClient
+except ImportError:  # aiohttp is not installed
+    AsyncClient = None
+
+ENGINE_NAME = 'benchmark'
+
+
+def make_documents(count, offset=0):
+    return [{'id': str(offset + i), 'title': 'Document {}'.format(i), 'body': 'x' * 256}
+            for i in range(count)]
+
+
+DOCUMENTS = make_documents(100)
+DOCUMENT_IDS = [document['id'] for document in DOCUMENTS]
+SEARCHES = [{'query': 'cat {}'.format(i)} for i in range(5)]
+
+# Each scenario is a callable taking a client and returning the result of
+# one operation, which is a coroutine for the asyncio client.
+SCENARIOS = {
+    'search': lambda client: client.search(ENGINE_NAME, 'cat', {}),
+    'multi_search': lambda client: client.multi_search(ENGINE_NAME, SEARCHES),
+    'get_documents': lambda client: client.get_documents(ENGINE_NAME, DOCUMENT_IDS),
+    'index_documents': lambda client: client.index_documents(ENGINE_NAME, DOCUMENTS),
+    'list_documents': lambda client: client.list_documents(ENGINE_NAME, 1, 100),
+    'list_engines': lambda client: client.list_engines(),
+}
+
+MODES = ('serial', 'threads', 'asyncio')
+
+
+def make_client(client_class, port, options):
+    return client_class('', 'api_key', 'localhost:{}/api/as/v1'.format(port), False, **options)
+
+
+class Measurement:
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.operations = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, started_at, error=False):
+        self.histogram.record(time.perf_counter() - started_at)
+        with self.lock:
+            self.operations += 1
+            self.errors += error
+
+    def summary(self, elapsed, cpu):
+        operations = max(self.operations, 1)
+        return {
+            'operations': self.operations,
+            'errors': self.errors,
+            'operations_per_second': self.operations / elapsed,
+            'p50_ms': (self.histogram.percentile(50) or 0) * 1e3,
+            'p99_ms': (self.histogram.percentile(99) or 0) * 1e3,
+            'cpu_us_per_operation': cpu / operations * 1e6,
+        }
+
+
+def run_serial(operation, client, duration, concurrency, measurement):
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started_at = time.perf_counter()
+        try:
+            operation(client)
+        except Exception:
+            measurement.record(started_at, error=True)
+        else:
+            measurement.record(started_at)
+
+
+def run_threads(operation, client, duration, concurrency, measurement):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_serial, operation, client, duration, 1, measurement)
+                   for _ in range(concurrency)]
+        for future in futures:
+            future.result()
+
+
+def run_asyncio(operation, client, duration, concurrency, measurement):
+    async def worker(deadline):
+        while time.perf_counter() < deadline:
+            started_at = time.perf_counter()
+            try:
+                await operation(client)
+            except Exception:
+                measurement.record(started_at, error=True)
+            else:
+                measurement.record(started_at)
+
+    async def run():
+        deadline = time.perf_counter() + duration
+        async with client:
+            await asyncio.gather(*[worker(deadline) for _ in range(concurrency)])
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+RUNNERS = {'serial': run_serial, 'threads': run_threads, 'asyncio': run_asyncio}
+
+
+def measure_allocations(operation, client, operations):
+    """
+    :return: Dict with the number of allocated blocks and bytes still held,
+    and the peak traced memory, per operation.
+    """
+    operation(client)  # warm up connections and caches
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for _ in range(operations):
+            operation(client)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    allocated = [stat for stat in after.compare_to(before, 'filename') if stat.size_diff > 0]
+    return {
+        'retained_bytes_per_operation': sum(stat.size_diff for stat in allocated) / operations,
+        'retained_blocks_per_operation': sum(stat.count_diff for stat in allocated) / operations,
+        'peak_bytes': peak,
+    }
+
+
+def run_scenario(name, mode, port, duration, concurrency, options, allocation_operations):
+    operation = SCENARIOS[name]
+    client_class = AsyncClient if mode == 'asyncio' else Client
+    client = make_client(client_class, port, options)
+    measurement = Measurement()
+    started_at, cpu_started_at = time.perf_counter(), time.process_time()
+    RUNNERS[mode](operation, client, duration, concurrency, measurement)
+    elapsed = time.perf_counter() - started_at
+    result = measurement.summary(elapsed, time.process_time() - cpu_started_at)
+    if mode == 'serial' and allocation_operations:
+        result.update(measure_allocations(operation, client, allocation_operations))
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change of throughput and p99 latency of every scenario found
+    in both runs.
+
+    :return: Number of scenarios slower than `threshold` percent.
+    """
+    regressions = 0
+    for key, result in sorted(results['scenarios'].items()):
+        previous = baseline['scenarios'].get(key)
+        if previous is None or not previous['operations_per_second']:
+            continue
+        throughput = (result['operations_per_second'] / previous['operations_per_second'] - 1) * 100
+        p99 = (result['p99_ms'] / previous['p99_ms'] - 1) * 100 if previous['p99_ms'] else 0.0
+        regressed = throughput < -threshold
+        regressions += regressed
+        print("{:40} throughput {:+7.1f}%  p99 {:+7.1f}%{}".format(
+            key, throughput, p99, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(sorted(SCENARIOS)))
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='threads or tasks of the concurrent modes')
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds per scenario')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--throttle-every', type=int, default=0)
+    parser.add_argument('--results', type=int, default=20)
+    parser.add_argument('--field-bytes', type=int, default=64)
+    parser.add_argument('--allocation-operations', type=int, default=50)
+    parser.add_argument('--in-process', action='store_true',
+                        help='run the stand-in in the benchmark process')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare with the results of this JSON file')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='throughput loss in percent reported as a regression')
+    arguments = parser.parse_args(argv)
+
+    config = StandInConfig(arguments.latency, arguments.throttle_every,
+                           arguments.results, arguments.field_bytes)
+    if arguments.in_process:
+        server = StandInServer(config)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.port
+    else:
+        process, port = start_in_subprocess(config)
+
+    options = {'pool_maxsize': max(arguments.concurrency, 10)}
+    if arguments.throttle_every:
+        options['retry_policy'] = RetryPolicy(max_retries=3, backoff_factor=0)
+
+    modes = [mode for mode in arguments.modes.split(',')
+             if mode != 'asyncio' or AsyncClient is not None]
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config.as_dict(),
+        'concurrency': arguments.concurrency,
+        'scenarios': {},
+    }
+    try:
+        for name in arguments.scenarios.split(','):
+            for mode in modes:
+                concurrency = 1 if mode == 'serial' else arguments.concurrency
+                result = run_scenario(name, mode, port, arguments.duration, concurrency,
+                                      options, arguments.allocation_operations)
+                key = '{}/{}/{}'.format(name, mode, concurrency)
+                results['scenarios'][key] = result
+                print("{:40} {:9.1f} op/s  p50 {:7.2f} ms  p99 {:7.2f} ms  cpu {:8.1f} us/op".format(
+                    key, result['operations_per_second'], result['p50_ms'],
+                    result['p99_ms'], result['cpu_us_per_operation']))
+    finally:
+        if not arguments.in_process:
+            process.terminate()
+
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            if compare(results, json.load(f), arguments.threshold):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
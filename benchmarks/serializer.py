@@ -0,0 +1,41 @@
+"""
+Compares the JSON serializers on a typical 100 document indexing batch and
+search response.
+
+    python -m benchmarks.serializer
+"""
+import timeit
+
+from elastic_app_search.serializer import JSONSerializer, OrjsonSerializer, orjson
+
+
+def make_documents(count=100):
+    return [
+        {
+            'id': 'product-{}'.format(i),
+            'title': 'Product {}'.format(i),
+            'description': 'A long description of the product. ' * 20,
+            'price': i * 1.25,
+            'tags': ['tag-{}'.format(j) for j in range(10)],
+            'created_at': '2020-01-01T00:00:00Z',
+        }
+        for i in range(count)
+    ]
+
+
+def run(number=200):
+    documents = make_documents()
+    serializers = [('json', JSONSerializer())]
+    if orjson is not None:
+        serializers.append(('orjson', OrjsonSerializer()))
+
+    for name, serializer in serializers:
+        encoded = serializer.dumps(documents)
+        dumps = timeit.timeit(lambda: serializer.dumps(documents), number=number)
+        loads = timeit.timeit(lambda: serializer.loads(encoded), number=number)
+        print("{:8} dumps {:8.1f} us  loads {:8.1f} us  ({} bytes)".format(
+            name, dumps / number * 1e6, loads / number * 1e6, len(encoded)))
+
+
+if __name__ == '__main__':
+    run()
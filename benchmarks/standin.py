@@ -0,0 +1,198 @@
+"""
+Local stand-in for the App Search API, serving canned responses to the
+endpoints exercised by the benchmarks with configurable latency, throttling
+and payload sizes.
+
+    python -m benchmarks.standin --port 3002 --latency 0.005
+"""
+import argparse
+import json
+import multiprocessing
+import re
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+BASE_PATH = '/api/as/v1/'
+ENGINE_PATH = re.compile(r'^engines/(?P<engine>[^/]+)/(?P<resource>.+)$')
+
+
+class StandInConfig:
+    """
+    :param latency: Seconds every response is delayed by.
+    :param throttle_every: Answer every Nth request with `429 Too Many
+    Requests`, 0 to never throttle.
+    :param results: Number of results of search and list responses.
+    :param field_bytes: Size of each text field of generated documents.
+    :param fields: Number of text fields of generated documents.
+    """
+
+    def __init__(self, latency=0.0, throttle_every=0, results=20, field_bytes=64, fields=8):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.results = results
+        self.field_bytes = field_bytes
+        self.fields = fields
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def make_document(config, document_id):
+    document = {'id': str(document_id)}
+    for field in range(config.fields):
+        document['field_{}'.format(field)] = 'x' * config.field_bytes
+    return document
+
+
+def make_search_response(config):
+    results = []
+    for i in range(config.results):
+        result = {name: {'raw': value} for name, value in make_document(config, i).items()}
+        result['_meta'] = {'id': str(i), 'engine': 'benchmark', 'score': 1.0}
+        results.append(result)
+    return {
+        'meta': {
+            'page': {'current': 1, 'size': config.results, 'total_pages': 1,
+                     'total_results': config.results},
+            'request_id': 'benchmark',
+        },
+        'results': results,
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which Nagle's algorithm would
+    # delay until the client acknowledges the headers.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def read_body(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        return json.loads(body.decode('utf-8')) if body else None
+
+    def respond(self, status, payload, headers=()):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        server = self.server
+        config = server.config
+        body = self.read_body()
+        with server.lock:
+            server.requests += 1
+            throttled = config.throttle_every and server.requests % config.throttle_every == 0
+        if config.latency:
+            time.sleep(config.latency)
+        if throttled:
+            self.respond(429, {'errors': ['Rate limit exceeded']}, [('Retry-After', '0')])
+            return
+
+        path = self.path.split('?')[0]
+        if not path.startswith(BASE_PATH):
+            self.respond(404, {'errors': ['Not found']})
+            return
+        path = path[len(BASE_PATH):]
+        if path == 'engines':
+            self.respond(200, {'meta': {'page': {'current': 1, 'total_pages': 1}},
+                               'results': [{'name': 'benchmark'}]})
+            return
+
+        match = ENGINE_PATH.match(path)
+        resource = match.group('resource') if match else None
+        if resource == 'search':
+            self.respond(200, server.search_response)
+        elif resource == 'multi_search':
+            self.respond(200, b'[' + b','.join(
+                [server.search_response] * len(body['queries'])) + b']')
+        elif resource == 'documents/list':
+            self.respond(200, server.list_response)
+        elif resource == 'documents' and self.command in ('POST', 'PATCH'):
+            self.respond(200, [{'id': document.get('id'), 'errors': []} for document in body])
+        elif resource == 'documents' and self.command == 'DELETE':
+            self.respond(200, [{'id': document_id, 'deleted': True} for document_id in body])
+        elif resource == 'documents':
+            self.respond(200, [make_document(config, document_id) for document_id in body])
+        else:
+            self.respond(404, {'errors': ['Not found']})
+
+    do_GET = do_POST = do_PATCH = do_DELETE = handle_request
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server answering App Search requests from memory.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config=None, port=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), StandInHandler)
+        self.config = config or StandInConfig()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.search_response = json.dumps(make_search_response(self.config)).encode('utf-8')
+        self.list_response = json.dumps({
+            'meta': {'page': {'current': 1, 'size': self.config.results, 'total_pages': 1}},
+            'results': [make_document(self.config, i) for i in range(self.config.results)],
+        }).encode('utf-8')
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def serve(config, ready):
+    server = StandInServer(config)
+    ready.put(server.port)
+    server.serve_forever()
+
+
+def start_in_subprocess(config):
+    """
+    Runs a stand-in server in a separate process, so that its CPU time is
+    not attributed to the client being measured.
+
+    :return: Tuple of the process and the port the server listens on.
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(config, ready))
+    process.daemon = True
+    process.start()
+    return process, ready.get(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=3002)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--throttle-every', type=int, default=0)
+    parser.add_argument('--results', type=int, default=20)
+    parser.add_argument('--field-bytes', type=int, default=64)
+    arguments = parser.parse_args()
+    config = StandInConfig(arguments.latency, arguments.throttle_every,
+                           arguments.results, arguments.field_bytes)
+    StandInServer(config, arguments.port).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
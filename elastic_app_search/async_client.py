@@ -0,0 +1,714 @@
+"""asyncio client for Elastic App Search. Requires Python 3.6+ and aiohttp."""
+import asyncio
+from collections import deque
+
+import aiohttp
+
+from .bulk import (
+    DestroySummary, DocumentLookup, chunk_documents, chunk_ids, document_cache_key)
+from .cache import cache_key
+from .endpoints import can_fail_over, http_health_check
+from .instrumentation import RequestMetrics
+from .pagination import PageIterator, is_last_page
+from .client import Client
+from .exceptions import CircuitOpen, InvalidDocument
+from .pool import PoolStats, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from .request_session import (
+    compress_body, default_headers, error_for_status, make_endpoint_pool, should_compress,
+    single_flight_allowed, with_header)
+from .serializer import default_serializer
+from .streaming import ResultsParser
+from .validation import DocumentValidator, merge_statuses
+
+
+class AsyncSingleFlight:
+    """
+    asyncio version of :class:`~elastic_app_search.singleflight.SingleFlight`
+    where `fn` returns a coroutine. Cancelling a waiting caller does not
+    cancel the shared call.
+    """
+
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, fn):
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def in_flight(self):
+        return len(self.calls)
+
+
+class AsyncRequestSession:
+    """
+    Non-blocking counterpart of
+    :class:`~elastic_app_search.request_session.RequestSession` backed by a
+    keep-alive pool of aiohttp connections.
+
+    The underlying :class:`aiohttp.ClientSession` is created on first use so
+    that it is bound to the running event loop. Pool options mirror the ones
+    of the synchronous session: at most `pool_maxsize` connections are opened
+    per host and `pool_connections * pool_maxsize` in total. aiohttp always
+    queues requests once the pool is exhausted, so `pool_block` is implied.
+    `socket_options` are not supported.
+    """
+
+    def __init__(self, api_key, base_url,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=True,
+                 keep_alive=True,
+                 socket_options=None,
+                 retry_policy=None,
+                 rate_limiter=None,
+                 serializer=None,
+                 compress_threshold=None,
+                 compression_level=6,
+                 hooks=None,
+                 single_flight=False,
+                 endpoint_pool=None,
+                 circuit_breaker=None,
+                 keepalive_timeout=15):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.headers = default_headers(api_key)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.keepalive_timeout = keepalive_timeout
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.serializer = serializer or default_serializer()
+        self.compress_threshold = compress_threshold
+        self.compression_level = compression_level
+        self.hooks = list(hooks or [])
+        self.single_flight = AsyncSingleFlight() if single_flight else None
+        self.circuit_breaker = circuit_breaker
+        self.stats = PoolStats()
+        self.session = None
+        self.endpoint_pool = make_endpoint_pool(endpoint_pool)
+        if self.endpoint_pool is not None:
+            # Health checks are blocking requests sent from their own thread.
+            self.endpoint_pool.start(http_health_check(self.headers))
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_connections * self.pool_maxsize,
+                limit_per_host=self.pool_maxsize,
+                force_close=not self.keep_alive,
+                keepalive_timeout=self.keepalive_timeout if self.keep_alive else None)
+            self.session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector,
+                trace_configs=[self.trace_config()])
+        return self.session
+
+    def trace_config(self):
+        stats = self.stats
+
+        def timings(context):
+            return context.trace_request_ctx if isinstance(context.trace_request_ctx, dict) else {}
+
+        def start(name):
+            async def on_start(session, context, params):
+                timings(context)[name] = asyncio.get_event_loop().time()
+            return on_start
+
+        def end(name):
+            async def on_end(session, context, params):
+                request_timings = timings(context)
+                if name in request_timings:
+                    elapsed = asyncio.get_event_loop().time() - request_timings.pop(name)
+                    request_timings[name + '_elapsed'] = elapsed
+            return on_end
+
+        async def on_request_start(session, context, params):
+            stats.increment('checkouts')
+            await start('ttfb')(session, context, params)
+
+        async def on_connection_create_end(session, context, params):
+            stats.increment('created')
+            await end('connect')(session, context, params)
+
+        async def on_connection_queued_start(session, context, params):
+            stats.increment('waited')
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(end('ttfb'))
+        trace_config.on_dns_resolvehost_start.append(start('dns'))
+        trace_config.on_dns_resolvehost_end.append(end('dns'))
+        trace_config.on_connection_create_start.append(start('connect'))
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        return trace_config
+
+    def pool_stats(self):
+        """
+        :return: Dict with the number of connections `created`, `reused` and
+        `waited` on since the session was created.
+        """
+        return self.stats.as_dict()
+
+    def raise_if_error(self, response, body):
+        if response.status >= 400:
+            error = error_for_status(
+                response.status, response.reason, body.decode('utf-8', 'replace'))
+            if error is not None:
+                raise error
+
+        response.raise_for_status()
+
+    async def send_once(self, http_method, endpoint, url, metrics=None, stream=False, **kwargs):
+        """
+        :param stream: Leave the body of successful responses unread, in
+        which case the returned body is None. Error responses are read whole.
+        """
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(endpoint)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        if metrics is not None:
+            kwargs['trace_request_ctx'] = timings = {}
+        response = await self.get_session().request(http_method.upper(), url, **kwargs)
+        if stream and response.status < 400:
+            body = None
+        else:
+            async with response:
+                body = await response.read()
+        if metrics is not None:
+            for name in ('dns', 'connect'):
+                metrics.add_timing(name, timings.get(name + '_elapsed'))
+            metrics.ttfb = timings.get('ttfb_elapsed')
+            metrics.status_code = response.status
+            if body is not None:
+                metrics.response_bytes = len(body)
+        return response, body
+
+    async def send(self, http_method, endpoint, base_url=None, **kwargs):
+        if kwargs.get('json') is not None:
+            kwargs['data'] = self.serializer.dumps(kwargs.pop('json'))
+        if should_compress(kwargs.get('data'), self.compress_threshold):
+            # Compress on the default executor so the event loop keeps
+            # serving other requests; zlib releases the GIL meanwhile.
+            kwargs['data'] = await asyncio.get_event_loop().run_in_executor(
+                None, compress_body, kwargs['data'], self.compression_level)
+            with_header(kwargs, 'Content-Encoding', 'gzip')
+        if not self.hooks:
+            return await self.send_with_breaker(http_method, endpoint, base_url, **kwargs)
+
+        metrics = RequestMetrics(http_method, endpoint, len(kwargs.get('data') or b''))
+        try:
+            return await self.send_with_breaker(http_method, endpoint, base_url, metrics, **kwargs)
+        except Exception as error:
+            metrics.error = error
+            raise
+        finally:
+            metrics.finish()
+            for hook in self.hooks:
+                hook(metrics)
+
+    async def send_with_breaker(self, http_method, endpoint, base_url=None, metrics=None,
+                                **kwargs):
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return await self.send_to_endpoint(http_method, endpoint, base_url, metrics, **kwargs)
+
+        call = breaker.begin(endpoint)
+        try:
+            result = await self.send_to_endpoint(http_method, endpoint, base_url, metrics, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            breaker.end(call, failed=True)
+            raise
+        except aiohttp.ClientResponseError as error:
+            breaker.end(call, error.status >= 500)
+            raise
+        except Exception:
+            breaker.end(call)
+            raise
+        except BaseException:
+            breaker.abandon(call)
+            raise
+        breaker.end(call)
+        return result
+
+    async def send_to_endpoint(self, http_method, endpoint, base_url=None, metrics=None,
+                               **kwargs):
+        pool = self.endpoint_pool
+        if base_url is not None or pool is None:
+            url = "{}/{}".format(base_url or self.base_url, endpoint)
+            return await self.send_with_retries(http_method, endpoint, url, metrics, **kwargs)
+
+        loop = asyncio.get_event_loop()
+        tried = []
+        while True:
+            node = pool.acquire(tried)
+            url = "{}/{}".format(node.url, endpoint)
+            started_at = loop.time()
+            try:
+                result = await self.send_with_retries(http_method, endpoint, url, metrics, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                pool.release(node, failed=True)
+                failure = error
+                request_sent = not isinstance(error, aiohttp.ClientConnectorError)
+            except aiohttp.ClientResponseError as error:
+                failed = error.status >= 500
+                pool.release(node, loop.time() - started_at, failed)
+                if not failed:
+                    raise
+                failure, request_sent = error, True
+            except BaseException:
+                pool.release(node, loop.time() - started_at)
+                raise
+            else:
+                pool.release(node, loop.time() - started_at)
+                return result
+            tried.append(node)
+            if len(tried) >= len(pool) or not can_fail_over(http_method, request_sent):
+                raise failure
+
+    async def send_with_retries(self, http_method, endpoint, url, metrics=None, **kwargs):
+        policy = self.retry_policy
+        if policy is None:
+            response, body = await self.send_once(http_method, endpoint, url, metrics, **kwargs)
+            self.raise_if_error(response, body)
+            return response, body
+
+        policy.record_request()
+        attempt = 0
+        while True:
+            try:
+                response, body = await self.send_once(http_method, endpoint, url, metrics, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                request_sent = not isinstance(error, aiohttp.ClientConnectorError)
+                delay = policy.get_delay(http_method, attempt, request_sent=request_sent)
+                if delay is None:
+                    raise
+            else:
+                if response.status < 400:
+                    return response, body
+                delay = policy.get_delay(http_method, attempt, response.status,
+                                         response.headers.get('Retry-After'))
+                if delay is None:
+                    self.raise_if_error(response, body)
+                    return response, body
+            attempt += 1
+            if metrics is not None:
+                metrics.retries = attempt
+            await asyncio.sleep(delay)
+
+    async def request(self, http_method, endpoint, base_url=None, **kwargs):
+        if self.single_flight is not None and single_flight_allowed(http_method, kwargs):
+            if kwargs.get('json') is not None:
+                kwargs['data'] = self.serializer.dumps(kwargs.pop('json'))
+            key = (base_url or self.base_url, endpoint, kwargs.get('data'))
+            return await self.single_flight.do(
+                key, lambda: self.request_and_decode(http_method, endpoint, base_url, **kwargs))
+        return await self.request_and_decode(http_method, endpoint, base_url, **kwargs)
+
+    async def request_conditional(self, http_method, endpoint, etag=None, base_url=None, **kwargs):
+        """
+        Sends a request with `If-None-Match` when `etag` is given.
+
+        :return: Tuple of the decoded response, or None when the server
+        answered `304 Not Modified`, and the `ETag` of the response.
+        """
+        if etag is not None:
+            with_header(kwargs, 'If-None-Match', etag)
+        response, body = await self.send(http_method, endpoint, base_url, **kwargs)
+        if response.status == 304:
+            return None, etag
+        return self.serializer.loads(body), response.headers.get('ETag')
+
+    async def request_and_decode(self, http_method, endpoint, base_url=None, loads=None,
+                                 **kwargs):
+        _, body = await self.send(http_method, endpoint, base_url, **kwargs)
+        return (loads or self.serializer.loads)(body)
+
+    async def request_stream(self, http_method, endpoint, base_url=None, chunk_size=64 * 1024,
+                             **kwargs):
+        """
+        Sends a request and decodes the `results` of its JSON object response
+        while it is downloaded, instead of buffering the whole body.
+
+        :param chunk_size: Number of bytes read at a time.
+        :return: :class:`AsyncResultStream`
+        """
+        response, _ = await self.send(http_method, endpoint, base_url, stream=True, **kwargs)
+        return AsyncResultStream(response.content.iter_chunked(chunk_size), response.release)
+
+    async def request_ignore_response(self, http_method, endpoint, base_url=None, **kwargs):
+        response, _ = await self.send(http_method, endpoint, base_url, **kwargs)
+        return response
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncResultStream:
+    """
+    asyncio version of :class:`~elastic_app_search.streaming.ResultStream`,
+    iterated with `async for`. `await stream.meta()` reads ahead until the
+    `meta` of the response is available.
+
+    :param chunks: Async iterable of response body chunks.
+    :param close: Optional callable releasing the response.
+    """
+
+    def __init__(self, chunks, close=None):
+        self.chunks = chunks.__aiter__()
+        self.release = close
+        self.parser = ResultsParser()
+        self.pending = deque()
+        self.finished = False
+
+    @property
+    def members(self):
+        return self.parser.members
+
+    async def meta(self):
+        while 'meta' not in self.parser.members and await self.read():
+            pass
+        return self.parser.members.get('meta')
+
+    async def read(self):
+        """
+        Parses the next chunk.
+
+        :return: False once the body is exhausted.
+        """
+        if self.finished:
+            return False
+        try:
+            try:
+                chunk = await self.chunks.__anext__()
+            except StopAsyncIteration:
+                self.pending.extend(self.parser.close())
+                self.close()
+                return False
+            self.pending.extend(self.parser.feed(chunk))
+            return True
+        except Exception:
+            self.close()
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.pending:
+            if not await self.read():
+                raise StopAsyncIteration
+        return self.pending.popleft()
+
+    def close(self):
+        if not self.finished:
+            self.finished = True
+            if self.release is not None:
+                self.release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class AsyncPageIterator(PageIterator):
+    """
+    Asynchronous :class:`~elastic_app_search.pagination.PageIterator`, where
+    `fetch_page` returns a coroutine and the next page is fetched as a
+    separate task.
+    """
+
+    def __iter__(self):
+        raise TypeError("use 'async for' to iterate over AsyncPageIterator")
+
+    async def __aiter__(self):
+        current = self.current
+        pending = asyncio.ensure_future(self.fetch_page(current, self.size))
+        try:
+            while pending is not None:
+                response = await pending
+                self.current = current
+                pending = None
+                if not is_last_page(response, self.size):
+                    current += 1
+                    next_page = self.fetch_page(current, self.size)
+                    if self.prefetch:
+                        pending = asyncio.ensure_future(next_page)
+                    else:
+                        pending = next_page
+                for result in response.get('results') or []:
+                    yield result
+        finally:
+            if pending is not None:
+                if self.prefetch:
+                    pending.cancel()
+                else:
+                    pending.close()
+
+
+class AsyncClient(Client):
+    """
+    asyncio version of :class:`~elastic_app_search.Client`. It exposes the
+    same methods, each of which returns a coroutine.
+
+    Endpoints and payloads are built by the shared :class:`Client` methods, so
+    only the transport differs between the two clients.
+    """
+
+    session_class = AsyncRequestSession
+
+    def __init__(self, *args, **kwargs):
+        if kwargs.get('search_coalescer') is not None:
+            raise ValueError('search_coalescer is not supported by AsyncClient')
+        if kwargs.get('event_sender') is not None:
+            raise ValueError('event_sender is not supported by AsyncClient')
+        super(AsyncClient, self).__init__(*args, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Closes the pooled connections of the client."""
+        await self.session.close()
+
+    async def _cached_request(self, engine_name, http_method, endpoint, options, send=None):
+        if self.cache is None:
+            return await self.session.request(http_method, endpoint, json=options)
+
+        key = cache_key(engine_name, endpoint, options)
+        response = self.cache.get(key)
+        if response is None:
+            generation = self.cache.generation(engine_name)
+            try:
+                response = await self.session.request(http_method, endpoint, json=options)
+            except CircuitOpen:
+                response = self.cache.get_stale(key)
+                if response is None:
+                    raise
+                return response
+            self.cache.set(key, response, generation)
+        return response
+
+    def _iterate_pages(self, fetch_page, current, size, prefetch):
+        return AsyncPageIterator(fetch_page, current, size, prefetch)
+
+    async def _write_request(self, engine_name, http_method, endpoint,
+                             invalidate_metadata=False, **kwargs):
+        response = await self.session.request(http_method, endpoint, **kwargs)
+        self._invalidate(engine_name, invalidate_metadata)
+        return response
+
+    async def _metadata_request(self, engine_name, kind, endpoint):
+        cache = self.metadata_cache
+        if cache is None:
+            return await self.session.request('get', endpoint)
+
+        key = (engine_name, kind)
+        value, refresh = cache.lookup(key)
+        if value is None:
+            return await self._revalidate_metadata(key, endpoint)
+        if refresh and cache.claim_refresh(key):
+            task = asyncio.ensure_future(self._revalidate_metadata(key, endpoint))
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            task.add_done_callback(lambda _: cache.release_refresh(key))
+        return value
+
+    async def _revalidate_metadata(self, key, endpoint):
+        cache = self.metadata_cache
+        generation = cache.generation(key[0])
+        value, etag = await self.session.request_conditional('get', endpoint, cache.etag(key))
+        if value is None:
+            value = cache.revalidated(key)
+            if value is not None:
+                return value
+            value, etag = await self.session.request_conditional('get', endpoint)
+        cache.store(key, value, etag, generation)
+        return value
+
+    async def index_document(self, engine_name, document):
+        """
+        Create or update a document for an engine. Raises
+        :class:`~elastic_app_search.exceptions.InvalidDocument` when the document
+        has processing errors
+
+        :param engine_name: Name of engine to index documents into.
+        :param document: Hash representing a single document.
+        :return: dict processed document status
+        """
+        document_status = (await self.index_documents(engine_name, [document]))[0]
+        errors = document_status['errors']
+        if errors:
+            raise InvalidDocument('; '.join(errors), document)
+
+        return {
+            key: document_status[key]
+            for key in document_status
+            if key != 'errors'
+        }
+
+    async def bulk_get_documents(self, engine_name, document_ids, max_workers=4):
+        """
+        Retrieves any number of documents by id from an engine. Ids are split
+        into chunks that fit the server limits and at most `max_workers`
+        chunks are fetched concurrently.
+
+        :param engine_name: Name of engine to get documents from.
+        :param document_ids: Iterable of ids of documents to be returned.
+        :param max_workers: Number of requests sent in parallel.
+        :return: Array of documents in the order of `document_ids`, with None
+        for ids that do not exist.
+        """
+        cache = self.document_cache
+        lookup = DocumentLookup(engine_name, document_ids, cache)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(chunk):
+            async with semaphore:
+                generation = cache.generation(engine_name) if cache is not None else None
+                documents = await self.get_documents(engine_name, chunk)
+            if cache is not None:
+                for document_id, document in zip(chunk, documents):
+                    if document is not None:
+                        cache.set(document_cache_key(engine_name, document_id),
+                                  document, generation)
+            lookup.fill(chunk, documents)
+
+        await asyncio.gather(*[fetch(chunk) for chunk in lookup.chunks()])
+        return lookup.documents
+
+    async def index_documents(self, engine_name, documents, validate=False):
+        """
+        Create or update documents for an engine.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Hashes representing documents.
+        :param validate: Check documents against the engine schema first and
+        only send the valid ones.
+        :return: Array of document status dictionaries. Errors will be present
+        in a document status with a key of `errors`.
+        """
+        endpoint = "engines/{}/documents".format(engine_name)
+        if validate:
+            validator = await self._schema_validator(engine_name)
+            valid, rejected = validator.partition(documents)
+            if rejected:
+                statuses = await self.index_documents(engine_name, valid) if valid else []
+                return merge_statuses(len(documents), rejected, statuses)
+        data = self.session.serializer.dumps(documents)
+
+        return await self._write_request(engine_name, 'post', endpoint, data=data)
+
+    async def bulk_index_documents(self, engine_name, documents, max_workers=4,
+                                   validate=False):
+        """
+        Create or update any number of documents for an engine. Documents are
+        split into chunks that fit the server limits and at most `max_workers`
+        chunks are sent concurrently.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Iterable or generator of document dicts.
+        :param max_workers: Number of requests sent in parallel.
+        :param validate: Check documents against the engine schema first and
+        only send the valid ones.
+        :return: Async generator of document status dictionaries, in input
+        order.
+        """
+        endpoint = "engines/{}/documents".format(engine_name)
+        validator = await self._schema_validator(engine_name) if validate else None
+        encode = self.session.serializer.dumps
+
+        async def send(chunk, body):
+            if validator is not None:
+                valid, rejected = validator.partition(chunk)
+                if rejected:
+                    statuses = []
+                    if valid:
+                        statuses = await self._write_request(
+                            engine_name, 'post', endpoint, data=encode(valid))
+                    return merge_statuses(len(chunk), rejected, statuses)
+            return await self._write_request(engine_name, 'post', endpoint, data=body)
+
+        pending = deque()
+        try:
+            for chunk, body in chunk_documents(documents, encode=encode):
+                if len(pending) >= max_workers:
+                    for status in await pending.popleft():
+                        yield status
+                pending.append(asyncio.ensure_future(send(chunk, body)))
+            while pending:
+                for status in await pending.popleft():
+                    yield status
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def bulk_destroy_documents(self, engine_name, document_ids, max_workers=4,
+                                     progress=None):
+        """
+        Destroys any number of documents by id for an engine. Ids are split
+        into chunks that fit the server limits and at most `max_workers`
+        chunks are sent concurrently.
+
+        :param engine_name: Name of engine.
+        :param document_ids: Iterable or generator of document ids.
+        :param max_workers: Number of requests sent in parallel.
+        :param progress: Optional callable receiving the running summary after
+        each chunk.
+        :return: Dict with the number of `documents` processed and `deleted`,
+        the ids of `missing` documents, the elapsed `seconds` and
+        `documents_per_second`.
+        """
+        endpoint = "engines/{}/documents".format(engine_name)
+        dumps = self.session.serializer.dumps
+        summary = DestroySummary()
+        pending = deque()
+
+        async def completed(task):
+            summary.add(await task)
+            if progress is not None:
+                progress(summary.as_dict())
+
+        try:
+            for chunk in chunk_ids(document_ids):
+                if len(pending) >= max_workers:
+                    await completed(pending.popleft())
+                pending.append(asyncio.ensure_future(
+                    self._write_request(engine_name, 'delete', endpoint, data=dumps(chunk))))
+            while pending:
+                await completed(pending.popleft())
+        finally:
+            for task in pending:
+                task.cancel()
+        return summary.as_dict()
+
+    async def _schema_validator(self, engine_name):
+        version = self._schema_versions.get(engine_name, 0)
+        cached = self._validators.get(engine_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        validator = await self.document_validator(engine_name)
+        if self._schema_versions.get(engine_name, 0) == version:
+            self._validators[engine_name] = (version, validator)
+        return validator
+
+    async def document_validator(self, engine_name, **kwargs):
+        """
+        Build a validator checking documents against the current schema of an
+        engine, so that invalid documents can be rejected without a request.
+
+        :param engine_name: Name of engine.
+        :return: :class:`~elastic_app_search.validation.DocumentValidator`
+        """
+        kwargs.setdefault('serializer', self.session.serializer)
+        return DocumentValidator(await self.get_schema(engine_name), **kwargs)
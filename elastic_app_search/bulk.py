@@ -0,0 +1,268 @@
+"""Helpers for sending large numbers of documents to Elastic App Search."""
+import json
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from .compat import monotonic
+from .validation import merge_statuses
+
+# Limits enforced by App Search on the documents endpoints.
+MAX_DOCUMENTS_PER_REQUEST = 100
+MAX_PAYLOAD_BYTES = 10 * 1024 * 1024
+
+
+def encode_document(document):
+    return json.dumps(document).encode('utf-8')
+
+
+def chunk_documents(documents, max_documents=MAX_DOCUMENTS_PER_REQUEST,
+                    max_bytes=MAX_PAYLOAD_BYTES, encode=encode_document):
+    """
+    Splits an iterable of documents into request sized chunks.
+
+    A chunk is closed as soon as adding the next document would exceed either
+    `max_documents` or `max_bytes` once serialized as a JSON array. A single
+    document larger than `max_bytes` is sent on its own so that the server can
+    report it as an error.
+
+    :param documents: Iterable or generator of document dicts.
+    :param max_documents: Maximum number of documents per chunk.
+    :param max_bytes: Maximum size of a serialized chunk.
+    :param encode: Callable encoding a document to JSON bytes.
+    :return: Generator of (documents, body) tuples where body is the encoded
+    JSON array for the documents.
+    """
+    chunk = []
+    encoded = []
+    size = 2  # the enclosing brackets
+
+    for document in documents:
+        data = encode(document)
+        # Every document after the first one is preceded by a comma.
+        added = len(data) + (1 if chunk else 0)
+        if chunk and (len(chunk) >= max_documents or size + added > max_bytes):
+            yield chunk, b'[' + b','.join(encoded) + b']'
+            chunk, encoded, size = [], [], 2
+            added = len(data)
+        chunk.append(document)
+        encoded.append(data)
+        size += added
+
+    if chunk:
+        yield chunk, b'[' + b','.join(encoded) + b']'
+
+
+def chunk_ids(document_ids, max_ids=MAX_DOCUMENTS_PER_REQUEST):
+    """
+    Splits an iterable of ids into lists of at most `max_ids` ids.
+    """
+    document_ids = iter(document_ids)
+    while True:
+        chunk = list(islice(document_ids, max_ids))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ordered_map(fn, iterable, max_workers=4, max_pending=None):
+    """
+    Applies `fn` to every item of `iterable` on a pool of threads and yields
+    the results in input order.
+
+    At most `max_pending` items are in flight at any time so that a large or
+    unbounded iterable is never fully materialized. When `fn` raises, pending
+    work is cancelled and the exception is re-raised to the caller.
+
+    :param fn: Callable applied to each item.
+    :param iterable: Items to process.
+    :param max_workers: Number of worker threads.
+    :param max_pending: Maximum number of submitted but unconsumed items.
+    Defaults to twice `max_workers`.
+    """
+    max_pending = max_pending or max_workers * 2
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in iterable:
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(fn, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def document_cache_key(engine_name, document_id):
+    return (engine_name, 'documents', document_id)
+
+
+class DocumentLookup:
+    """
+    Tracks the requested positions of document ids, so that each missing id
+    is fetched once and documents are returned in request order.
+
+    :param engine_name: Name of engine the documents belong to.
+    :param document_ids: Requested ids, possibly repeated.
+    :param cache: Optional :class:`~elastic_app_search.cache.ResponseCache`
+    of documents, found documents are not fetched again.
+    """
+
+    def __init__(self, engine_name, document_ids, cache=None):
+        self.documents = []
+        self.positions = OrderedDict()
+        for position, document_id in enumerate(document_ids):
+            document = None
+            if cache is not None:
+                document = cache.get(document_cache_key(engine_name, document_id))
+            self.documents.append(document)
+            if document is None:
+                self.positions.setdefault(document_id, []).append(position)
+
+    def chunks(self, max_ids=MAX_DOCUMENTS_PER_REQUEST):
+        """
+        :return: List of lists of at most `max_ids` distinct ids to fetch.
+        """
+        document_ids = list(self.positions)
+        return [document_ids[start:start + max_ids]
+                for start in range(0, len(document_ids), max_ids)]
+
+    def fill(self, document_ids, documents):
+        for document_id, document in zip(document_ids, documents):
+            for position in self.positions[document_id]:
+                self.documents[position] = document
+
+
+class BulkIndexer:
+    """
+    Indexes an arbitrary iterable of documents by splitting it into chunks that
+    fit the server limits and sending the chunks concurrently.
+
+    The worker threads share the connection pool of the client's
+    :class:`~elastic_app_search.request_session.RequestSession`.
+
+    When a :class:`~elastic_app_search.validation.DocumentValidator` is given,
+    invalid documents are not sent and get a status with their local errors.
+    """
+
+    def __init__(self, client, max_workers=4,
+                 max_documents=MAX_DOCUMENTS_PER_REQUEST,
+                 max_bytes=MAX_PAYLOAD_BYTES, max_pending=None,
+                 validator=None):
+        self.client = client
+        self.max_workers = max_workers
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.validator = validator
+
+    def index(self, engine_name, documents):
+        """
+        Create or update documents for an engine.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Iterable or generator of document dicts.
+        :return: Generator of document status dictionaries, in the same order
+        as the input documents.
+        """
+        endpoint = "engines/{}/documents".format(engine_name)
+
+        def send(chunk):
+            documents, body = chunk
+            if self.validator is not None:
+                valid, rejected = self.validator.partition(documents)
+                if rejected:
+                    statuses = []
+                    if valid:
+                        statuses = self.client._write_request(
+                            engine_name, 'post', endpoint,
+                            data=self.client.session.serializer.dumps(valid))
+                    return merge_statuses(len(documents), rejected, statuses)
+            return self.client._write_request(engine_name, 'post', endpoint, data=body)
+
+        chunks = chunk_documents(documents, self.max_documents, self.max_bytes,
+                                 self.client.session.serializer.dumps)
+        for statuses in ordered_map(send, chunks, self.max_workers,
+                                    self.max_pending):
+            for status in statuses:
+                yield status
+
+
+class DestroySummary:
+    """
+    Running totals of a bulk deletion: the number of `deleted` documents, the
+    ids of `missing` documents the server did not delete, and throughput.
+    """
+
+    def __init__(self):
+        self.deleted = 0
+        self.missing = []
+        self.started_at = monotonic()
+
+    @property
+    def documents(self):
+        return self.deleted + len(self.missing)
+
+    def add(self, statuses):
+        for status in statuses:
+            # Older App Search versions report `result` instead of `deleted`.
+            if status.get('deleted', status.get('result')):
+                self.deleted += 1
+            else:
+                self.missing.append(status.get('id'))
+
+    def as_dict(self):
+        elapsed = monotonic() - self.started_at
+        return {
+            'documents': self.documents,
+            'deleted': self.deleted,
+            'missing': list(self.missing),
+            'seconds': elapsed,
+            'documents_per_second': self.documents / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class BulkDestroyer:
+    """
+    Destroys an arbitrary iterable of document ids by splitting it into
+    chunks that fit the server limits and sending the chunks concurrently.
+
+    :param client: :class:`~elastic_app_search.Client` sending the requests.
+    :param max_workers: Number of requests sent in parallel.
+    :param progress: Optional callable receiving the running summary, as
+    returned by :meth:`DestroySummary.as_dict`, after each chunk.
+    """
+
+    def __init__(self, client, max_workers=4,
+                 max_documents=MAX_DOCUMENTS_PER_REQUEST, max_pending=None,
+                 progress=None):
+        self.client = client
+        self.max_workers = max_workers
+        self.max_documents = max_documents
+        self.max_pending = max_pending
+        self.progress = progress
+
+    def destroy(self, engine_name, document_ids):
+        """
+        Destroys documents by id for an engine.
+
+        :param engine_name: Name of engine.
+        :param document_ids: Iterable or generator of document ids.
+        :return: Summary dict, see :meth:`DestroySummary.as_dict`.
+        """
+        endpoint = "engines/{}/documents".format(engine_name)
+        dumps = self.client.session.serializer.dumps
+
+        def send(chunk):
+            return self.client._write_request(engine_name, 'delete', endpoint, data=dumps(chunk))
+
+        summary = DestroySummary()
+        chunks = chunk_ids(document_ids, self.max_documents)
+        for statuses in ordered_map(send, chunks, self.max_workers, self.max_pending):
+            summary.add(statuses)
+            if self.progress is not None:
+                self.progress(summary.as_dict())
+        return summary.as_dict()
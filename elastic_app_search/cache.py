@@ -0,0 +1,133 @@
+"""In-memory response cache for search requests."""
+import json
+import threading
+from collections import OrderedDict
+
+from .compat import monotonic
+
+
+def cache_key(engine_name, endpoint, options):
+    """
+    Builds a canonical key so that equivalent options given in a different
+    key order share a cache entry.
+    """
+    return (engine_name, endpoint,
+            json.dumps(options, sort_keys=True, separators=(',', ':')))
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with time-to-live for search and query suggestion
+    responses, or documents when used as a client's `document_cache`.
+
+    Cached responses are returned as is and shared between callers, they must
+    not be mutated.
+
+    :param max_entries: Maximum number of cached responses. The least
+    recently used response is evicted first.
+    :param ttl: Default time-to-live of a response in seconds.
+    :param engine_ttls: Dict of engine name to time-to-live, overriding `ttl`.
+    :param stale_ttl: Seconds expired responses are kept for :meth:`get_stale`,
+    served when a circuit breaker rejects the request.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, engine_ttls=None, stale_ttl=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.engine_ttls = engine_ttls or {}
+        self.stale_ttl = stale_ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.generations = {}
+        self.invalidation_hooks = []
+
+    def generation(self, engine_name):
+        """
+        Returns a token that changes every time the engine is invalidated.
+        Passing it to :meth:`set` prevents a response fetched before a write
+        from being cached after it.
+        """
+        with self.lock:
+            return self.generations.get(engine_name, 0), self.generations.get(None, 0)
+
+    def get(self, key):
+        """
+        :return: The cached response for `key`, or None when missing or
+        expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                now = monotonic()
+                if expires_at > now:
+                    self.entries[key] = self.entries.pop(key)
+                    self.hits += 1
+                    return response
+                if expires_at + self.stale_ttl <= now:
+                    del self.entries[key]
+            self.misses += 1
+            return None
+
+    def get_stale(self, key):
+        """
+        :return: The response for `key`, expired for less than `stale_ttl`
+        seconds, or None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] + self.stale_ttl <= monotonic():
+                return None
+            self.stale_hits += 1
+            return entry[1]
+
+    def set(self, key, response, generation=None):
+        engine_name = key[0]
+        ttl = self.engine_ttls.get(engine_name, self.ttl)
+        if ttl <= 0:
+            return
+        with self.lock:
+            current = self.generations.get(engine_name, 0), self.generations.get(None, 0)
+            if generation is not None and generation != current:
+                return
+            self.entries.pop(key, None)
+            self.entries[key] = (monotonic() + ttl, response)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, engine_name=None):
+        """
+        Drops the cached responses of an engine, or of every engine when
+        `engine_name` is None, then calls the registered invalidation hooks.
+        """
+        with self.lock:
+            self.generations[engine_name] = self.generations.get(engine_name, 0) + 1
+            if engine_name is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == engine_name]:
+                    del self.entries[key]
+        for hook in self.invalidation_hooks:
+            hook(engine_name)
+
+    def add_invalidation_hook(self, hook):
+        """
+        Registers `hook(engine_name)`, called whenever the cache of an engine
+        is invalidated, e.g. after documents are written through the client.
+        """
+        self.invalidation_hooks.append(hook)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'evictions': self.evictions,
+                'size': len(self.entries)
+            }
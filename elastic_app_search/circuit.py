@@ -0,0 +1,212 @@
+"""Circuit breakers failing fast on degraded engines and endpoints."""
+import threading
+from collections import deque
+
+from .compat import monotonic
+from .exceptions import CircuitOpen
+from .instrumentation import endpoint_template
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def circuit_key(endpoint):
+    """
+    :return: Tuple of the engine name, or None outside of engines, and the
+    template of `endpoint`, e.g. `('videos', 'engines/{engine_name}/search')`.
+    """
+    parts = endpoint.split('/')
+    engine_name = parts[1] if len(parts) >= 2 and parts[0] == 'engines' else None
+    return engine_name, endpoint_template(endpoint)
+
+
+class Circuit:
+    """
+    State of the circuit of one key: the outcomes of the calls of the last
+    `window` seconds as (finished at, failed, slow) tuples, along with the
+    number of failed and slow ones among them.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.state = CLOSED
+        self.calls = deque()
+        self.failures = 0
+        self.slow_calls = 0
+        self.opened_at = None
+        self.probes = 0
+        self.successful_probes = 0
+
+    def add(self, now, failed, slow):
+        self.calls.append((now, failed, slow))
+        self.failures += failed
+        self.slow_calls += slow
+
+    def trim(self, now, window):
+        while self.calls and self.calls[0][0] < now - window:
+            _, failed, slow = self.calls.popleft()
+            self.failures -= failed
+            self.slow_calls -= slow
+
+    def clear(self):
+        self.calls.clear()
+        self.failures = self.slow_calls = 0
+
+    def as_dict(self):
+        calls = float(len(self.calls) or 1)
+        return {
+            'state': self.state,
+            'calls': len(self.calls),
+            'failure_rate': self.failures / calls,
+            'slow_call_rate': self.slow_calls / calls,
+        }
+
+
+class CircuitCall:
+    """Call admitted by :meth:`CircuitBreaker.begin`."""
+
+    __slots__ = ('circuit', 'started_at', 'probe')
+
+    def __init__(self, circuit, started_at, probe):
+        self.circuit = circuit
+        self.started_at = started_at
+        self.probe = probe
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while an engine and endpoint, such as the searches of
+    one engine, are failing or slow, instead of letting every caller wait for
+    the timeout.
+
+    Calls are tracked per engine name and endpoint template over a sliding
+    window of `window` seconds. Once it holds at least `min_calls`, the
+    circuit opens when the share of failed calls reaches `failure_rate`, or
+    the share of calls slower than `slow_call_duration` seconds reaches
+    `slow_call_rate`. Network errors, timeouts and `5xx` responses are
+    failures, other errors mean the server is up.
+
+    An open circuit raises :class:`~elastic_app_search.exceptions.CircuitOpen`
+    without sending the request for `open_time` seconds. It is then half
+    open: up to `half_open_calls` probes are let through, the circuit closes
+    once they all succeed and opens again as soon as one fails or is slow.
+
+    :param failure_rate: Share of failed calls, from 0 to 1, opening the
+    circuit.
+    :param slow_call_duration: Seconds after which a call counts as slow,
+    None to ignore latency.
+    :param slow_call_rate: Share of slow calls, from 0 to 1, opening the
+    circuit.
+    :param min_calls: Number of calls in the window before the rates are
+    evaluated.
+    :param window: Seconds of calls the rates are computed over.
+    :param open_time: Seconds an open circuit rejects calls before probing.
+    :param half_open_calls: Number of probes closing a half open circuit.
+    """
+
+    def __init__(self, failure_rate=0.5, slow_call_duration=None, slow_call_rate=0.8,
+                 min_calls=20, window=30.0, open_time=30.0, half_open_calls=1):
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_time = open_time
+        self.half_open_calls = half_open_calls
+        self.circuits = {}
+        self.lock = threading.Lock()
+
+    def begin(self, endpoint):
+        """
+        Admits a call to `endpoint` or raises
+        :class:`~elastic_app_search.exceptions.CircuitOpen`.
+
+        :return: :class:`CircuitCall` to pass to :meth:`end`.
+        """
+        key = circuit_key(endpoint)
+        now = monotonic()
+        with self.lock:
+            circuit = self.circuits.get(key)
+            if circuit is None:
+                circuit = self.circuits[key] = Circuit(key)
+            if circuit.state == OPEN and now - circuit.opened_at >= self.open_time:
+                circuit.state = HALF_OPEN
+                circuit.probes = circuit.successful_probes = 0
+            if circuit.state == OPEN or (
+                    circuit.state == HALF_OPEN and circuit.probes >= self.half_open_calls):
+                raise CircuitOpen(key, max(circuit.opened_at + self.open_time - now, 0.0))
+            probe = circuit.state == HALF_OPEN
+            if probe:
+                circuit.probes += 1
+            return CircuitCall(circuit, now, probe)
+
+    def end(self, call, failed=False):
+        """
+        Records the outcome of a call admitted by :meth:`begin`.
+
+        :param failed: Whether the call failed with a network or server error.
+        """
+        now = monotonic()
+        slow = (self.slow_call_duration is not None
+                and now - call.started_at >= self.slow_call_duration)
+        circuit = call.circuit
+        with self.lock:
+            if call.probe:
+                if circuit.state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self.open(circuit, now)
+                else:
+                    circuit.successful_probes += 1
+                    if circuit.successful_probes >= self.half_open_calls:
+                        circuit.state = CLOSED
+                        circuit.clear()
+                return
+            if circuit.state != CLOSED:
+                # Finished after the circuit opened, the outcome is stale.
+                return
+            circuit.add(now, failed, slow)
+            circuit.trim(now, self.window)
+            calls = len(circuit.calls)
+            if calls < self.min_calls:
+                return
+            if (circuit.failures >= self.failure_rate * calls
+                    or (self.slow_call_duration is not None
+                        and circuit.slow_calls >= self.slow_call_rate * calls)):
+                self.open(circuit, now)
+
+    def abandon(self, call):
+        """
+        Forgets a call interrupted before its outcome was known, e.g.
+        cancelled, freeing its slot when it was a probe.
+        """
+        with self.lock:
+            if call.probe and call.circuit.state == HALF_OPEN:
+                call.circuit.probes -= 1
+
+    def open(self, circuit, now):
+        circuit.state = OPEN
+        circuit.opened_at = now
+        circuit.clear()
+
+    def state(self, endpoint):
+        """
+        :return: `closed`, `open` or `half_open`, the state of the circuit
+        of `endpoint`. An open circuit due for probing is reported open.
+        """
+        with self.lock:
+            circuit = self.circuits.get(circuit_key(endpoint))
+            return circuit.state if circuit is not None else CLOSED
+
+    def stats(self):
+        """
+        :return: Dict of (engine name, endpoint template) to the `state`,
+        number of `calls` in the window, `failure_rate` and `slow_call_rate`
+        of its circuit.
+        """
+        now = monotonic()
+        with self.lock:
+            for circuit in self.circuits.values():
+                circuit.trim(now, self.window)
+            return {key: circuit.as_dict() for key, circuit in self.circuits.items()}
@@ -1,7 +1,15 @@
-import json
+from functools import partial
+
 import jwt
 from .request_session import RequestSession
-from .exceptions import InvalidDocument
+from .bulk import BulkDestroyer, BulkIndexer, DocumentLookup, document_cache_key, ordered_map
+from .cache import cache_key
+from .lazy import loads_lazily
+from .metadata_cache import SCHEMA, SEARCH_SETTINGS
+from .pagination import PageIterator, MAX_PAGE_SIZE
+from .pool import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from .validation import DocumentValidator, merge_statuses
+from .exceptions import CircuitOpen, InvalidDocument
 
 
 class Client:
@@ -9,19 +17,149 @@ class Client:
     ELASTIC_APP_SEARCH_BASE_ENDPOINT = 'api.swiftype.com/api/as/v1'
     SIGNED_SEARCH_TOKEN_JWT_ALGORITHM = 'HS256'
 
+    session_class = RequestSession
+
     def __init__(self, host_identifier='', api_key='',
                  base_endpoint=ELASTIC_APP_SEARCH_BASE_ENDPOINT,
                  use_https=True,
-                 account_host_key='' # Deprecated - use host_identifier instead
+                 account_host_key='', # Deprecated - use host_identifier instead
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False,
+                 keep_alive=True,
+                 socket_options=None,
+                 retry_policy=None,
+                 rate_limiter=None,
+                 cache=None,
+                 serializer=None,
+                 compress_threshold=None,
+                 compression_level=6,
+                 hooks=None,
+                 single_flight=False,
+                 endpoint_pool=None,
+                 circuit_breaker=None,
+                 search_coalescer=None,
+                 metadata_cache=None,
+                 event_sender=None,
+                 document_cache=None
                  ):
         self.host_identifier = host_identifier or account_host_key
         self.account_host_key = self.host_identifier # Deprecated
         self.api_key = api_key
+        self.cache = cache
+        self.search_coalescer = search_coalescer
+        self.metadata_cache = metadata_cache
+        self.event_sender = event_sender
+        self.document_cache = document_cache
+        # Validators of `validate=True` writes and the schema version they
+        # were built for, per engine.
+        self._validators = {}
+        self._schema_versions = {}
 
         uri_scheme = 'https' if use_https else 'http'
         host_prefix = host_identifier + '.' if host_identifier else ''
         base_url = "{}://{}{}".format(uri_scheme, host_prefix, base_endpoint)
-        self.session = RequestSession(self.api_key, base_url)
+        self.session = self.session_class(
+            self.api_key, base_url,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            keep_alive=keep_alive,
+            socket_options=socket_options,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            serializer=serializer,
+            compress_threshold=compress_threshold,
+            compression_level=compression_level,
+            hooks=hooks,
+            single_flight=single_flight,
+            endpoint_pool=endpoint_pool,
+            circuit_breaker=circuit_breaker
+        )
+
+    def _cached_request(self, engine_name, http_method, endpoint, options, send=None):
+        send = send or (lambda: self.session.request(http_method, endpoint, json=options))
+        if self.cache is None:
+            return send()
+
+        key = cache_key(engine_name, endpoint, options)
+        response = self.cache.get(key)
+        if response is None:
+            generation = self.cache.generation(engine_name)
+            try:
+                response = send()
+            except CircuitOpen:
+                response = self.cache.get_stale(key)
+                if response is None:
+                    raise
+                return response
+            self.cache.set(key, response, generation)
+        return response
+
+    def _lazy_request(self, endpoint, options, lazy):
+        result_class = None if lazy is True else lazy
+        loads = partial(loads_lazily, loads=self.session.serializer.loads,
+                        result_class=result_class)
+        return self.session.request_and_decode('get', endpoint, json=options, loads=loads)
+
+    def _write_request(self, engine_name, http_method, endpoint,
+                       invalidate_metadata=False, **kwargs):
+        response = self.session.request(http_method, endpoint, **kwargs)
+        self._invalidate(engine_name, invalidate_metadata)
+        return response
+
+    def _invalidate(self, engine_name, invalidate_metadata):
+        if self.cache is not None:
+            self.cache.invalidate(engine_name)
+        if self.document_cache is not None:
+            self.document_cache.invalidate(engine_name)
+        if invalidate_metadata:
+            self._schema_versions[engine_name] = self._schema_versions.get(engine_name, 0) + 1
+            self._validators.pop(engine_name, None)
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate(engine_name)
+
+    def _schema_validator(self, engine_name):
+        """
+        Validator of `validate=True` writes, built once per engine and
+        rebuilt after the schema is updated through the client.
+        """
+        version = self._schema_versions.get(engine_name, 0)
+        cached = self._validators.get(engine_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        validator = self.document_validator(engine_name)
+        if self._schema_versions.get(engine_name, 0) == version:
+            self._validators[engine_name] = (version, validator)
+        return validator
+
+    def _metadata_request(self, engine_name, kind, endpoint):
+        cache = self.metadata_cache
+        if cache is None:
+            return self.session.request('get', endpoint)
+
+        key = (engine_name, kind)
+        value, refresh = cache.lookup(key)
+        if value is None:
+            return self._revalidate_metadata(key, endpoint)
+        if refresh:
+            cache.refresh_in_background(key, lambda: self._revalidate_metadata(key, endpoint))
+        return value
+
+    def _revalidate_metadata(self, key, endpoint):
+        cache = self.metadata_cache
+        generation = cache.generation(key[0])
+        value, etag = self.session.request_conditional('get', endpoint, cache.etag(key))
+        if value is None:
+            value = cache.revalidated(key)
+            if value is not None:
+                return value
+            value, etag = self.session.request_conditional('get', endpoint)
+        cache.store(key, value, etag, generation)
+        return value
+
+    def _iterate_pages(self, fetch_page, current, size, prefetch):
+        return PageIterator(fetch_page, current, size, prefetch)
 
     def get_documents(self, engine_name, document_ids):
         """
@@ -32,19 +170,73 @@ class Client:
         :return: Array of dictionaries representing documents.
         """
         endpoint = "engines/{}/documents".format(engine_name)
-        data = json.dumps(document_ids)
+        data = self.session.serializer.dumps(document_ids)
         return self.session.request('get', endpoint, data=data)
 
-    def list_documents(self, engine_name, current=1, size=20):
+    def bulk_get_documents(self, engine_name, document_ids, max_workers=4):
+        """
+        Retrieves any number of documents by id from an engine. Ids are split
+        into chunks that fit the server limits and fetched concurrently.
+
+        When the client has a `document_cache`, documents found in it are not
+        fetched and fetched documents are added to it. Writes to the engine
+        through the client invalidate the cached documents.
+
+        :param engine_name: Name of engine to get documents from.
+        :param document_ids: Iterable of ids of documents to be returned.
+        :param max_workers: Number of requests sent in parallel.
+        :return: Array of documents in the order of `document_ids`, with None
+        for ids that do not exist.
+        """
+        cache = self.document_cache
+        lookup = DocumentLookup(engine_name, document_ids, cache)
+
+        def fetch(chunk):
+            generation = cache.generation(engine_name) if cache is not None else None
+            documents = self.get_documents(engine_name, chunk)
+            if cache is not None:
+                for document_id, document in zip(chunk, documents):
+                    if document is not None:
+                        cache.set(document_cache_key(engine_name, document_id),
+                                  document, generation)
+            return documents
+
+        chunks = lookup.chunks()
+        for chunk, documents in zip(chunks, ordered_map(fetch, chunks, max_workers)):
+            lookup.fill(chunk, documents)
+        return lookup.documents
+
+    def list_documents(self, engine_name, current=1, size=20, stream=False):
         """
         Lists all documents in engine.
 
         :param current: Page of documents
         :param size: Number of documents to return per page
+        :param stream: Return a
+        :class:`~elastic_app_search.streaming.ResultStream` yielding the
+        documents while the page is downloaded.
         :return: List of documemts.
         """
         data = { 'page': { 'current': current, 'size': size } }
-        return self.session.request('get', "engines/{}/documents/list".format(engine_name), json=data)
+        endpoint = "engines/{}/documents/list".format(engine_name)
+        if stream:
+            return self.session.request_stream('get', endpoint, json=data)
+        return self.session.request('get', endpoint, json=data)
+
+    def iter_documents(self, engine_name, current=1, size=MAX_PAGE_SIZE, prefetch=True):
+        """
+        Lazily iterates over all documents in engine, fetching the next page
+        in the background while the current one is consumed.
+
+        :param engine_name: Name of the engine.
+        :param current: Page to start from, e.g. to resume an iteration.
+        :param size: Number of documents to fetch per page.
+        :param prefetch: Fetch the next page while the current one is consumed.
+        :return: Iterator of documents.
+        """
+        return self._iterate_pages(
+            lambda current, size: self.list_documents(engine_name, current, size),
+            current, size, prefetch)
 
     def index_document(self, engine_name, document):
         """
@@ -67,19 +259,56 @@ class Client:
             if key != 'errors'
         }
 
-    def index_documents(self, engine_name, documents):
+    def index_documents(self, engine_name, documents, validate=False):
         """
         Create or update documents for an engine.
 
         :param engine_name: Name of engine to index documents into.
         :param documents: Hashes representing documents.
+        :param validate: Check documents against the engine schema first and
+        only send the valid ones.
         :return: Array of document status dictionaries. Errors will be present
         in a document status with a key of `errors`.
         """
         endpoint = "engines/{}/documents".format(engine_name)
-        data = json.dumps(documents)
+        if validate:
+            valid, rejected = self._schema_validator(engine_name).partition(documents)
+            if rejected:
+                statuses = self.index_documents(engine_name, valid) if valid else []
+                return merge_statuses(len(documents), rejected, statuses)
+        data = self.session.serializer.dumps(documents)
+
+        return self._write_request(engine_name, 'post', endpoint, data=data)
+
+    def bulk_index_documents(self, engine_name, documents, max_workers=4,
+                             validate=False):
+        """
+        Create or update any number of documents for an engine. Documents are
+        split into chunks that fit the server limits and sent concurrently.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Iterable or generator of document dicts.
+        :param max_workers: Number of requests sent in parallel.
+        :param validate: Check documents against the engine schema first and
+        only send the valid ones.
+        :return: Generator of document status dictionaries, in input order.
+        Errors will be present in a document status with a key of `errors`.
+        """
+        validator = self._schema_validator(engine_name) if validate else None
+        indexer = BulkIndexer(self, max_workers=max_workers, validator=validator)
+        return indexer.index(engine_name, documents)
+
+    def document_validator(self, engine_name, **kwargs):
+        """
+        Build a validator checking documents against the current schema of an
+        engine, so that invalid documents can be rejected without a request.
+        The schema is fetched on every call, writes with `validate=True`
+        reuse one validator per engine until `update_schema` is called.
 
-        return self.session.request('post', endpoint, data=data)
+        :param engine_name: Name of engine.
+        :return: :class:`~elastic_app_search.validation.DocumentValidator`
+        """
+        return DocumentValidator.from_client(self, engine_name, **kwargs)
 
     def update_documents(self, engine_name, documents):
         """
@@ -91,9 +320,9 @@ class Client:
         in a document status with a key of `errors`.
         """
         endpoint = "engines/{}/documents".format(engine_name)
-        data = json.dumps(documents)
+        data = self.session.serializer.dumps(documents)
 
-        return self.session.request('patch', endpoint, data=data)
+        return self._write_request(engine_name, 'patch', endpoint, data=data)
 
     def destroy_documents(self, engine_name, document_ids):
         """
@@ -104,8 +333,26 @@ class Client:
         :return:
         """
         endpoint = "engines/{}/documents".format(engine_name)
-        data = json.dumps(document_ids)
-        return self.session.request('delete', endpoint, data=data)
+        data = self.session.serializer.dumps(document_ids)
+        return self._write_request(engine_name, 'delete', endpoint, data=data)
+
+    def bulk_destroy_documents(self, engine_name, document_ids, max_workers=4,
+                               progress=None):
+        """
+        Destroys any number of documents by id for an engine. Ids are split
+        into chunks that fit the server limits and sent concurrently.
+
+        :param engine_name: Name of engine.
+        :param document_ids: Iterable or generator of document ids.
+        :param max_workers: Number of requests sent in parallel.
+        :param progress: Optional callable receiving the running summary after
+        each chunk.
+        :return: Dict with the number of `documents` processed and `deleted`,
+        the ids of `missing` documents, the elapsed `seconds` and
+        `documents_per_second`.
+        """
+        destroyer = BulkDestroyer(self, max_workers=max_workers, progress=progress)
+        return destroyer.destroy(engine_name, document_ids)
 
     def get_schema(self, engine_name):
         """
@@ -115,7 +362,7 @@ class Client:
         :return: Schema.
         """
         endpoint = "engines/{}/schema".format(engine_name)
-        return self.session.request('get', endpoint)
+        return self._metadata_request(engine_name, SCHEMA, endpoint)
 
     def update_schema(self, engine_name, schema):
         """
@@ -126,8 +373,8 @@ class Client:
         :return: Updated schema.
         """
         endpoint = "engines/{}/schema".format(engine_name)
-        data = json.dumps(schema)
-        return self.session.request('post', endpoint, data=data)
+        data = self.session.serializer.dumps(schema)
+        return self._write_request(engine_name, 'post', endpoint, invalidate_metadata=True, data=data)
 
     def list_engines(self, current=1, size=20):
         """
@@ -141,6 +388,17 @@ class Client:
         data = { 'page': { 'current': current, 'size': size } }
         return self.session.request('get', 'engines', json=data)
 
+    def iter_engines(self, current=1, size=MAX_PAGE_SIZE, prefetch=True):
+        """
+        Lazily iterates over all engines that the api key has access to.
+
+        :param current: Page to start from, e.g. to resume an iteration.
+        :param size: Number of engines to fetch per page.
+        :param prefetch: Fetch the next page while the current one is consumed.
+        :return: Iterator of engines.
+        """
+        return self._iterate_pages(self.list_engines, current, size, prefetch)
+
     def get_engine(self, engine_name):
         """
         Retrieves an engine by name.
@@ -185,6 +443,20 @@ class Client:
         data = { 'page': { 'current': current, 'size': size } }
         return self.session.request('get', "engines/{}/synonyms".format(engine_name), json=data)
 
+    def iter_synonym_sets(self, engine_name, current=1, size=MAX_PAGE_SIZE, prefetch=True):
+        """
+        Lazily iterates over all synonym sets in engine.
+
+        :param engine_name: Name of the engine.
+        :param current: Page to start from, e.g. to resume an iteration.
+        :param size: Number of synonym sets to fetch per page.
+        :param prefetch: Fetch the next page while the current one is consumed.
+        :return: Iterator of synonym sets.
+        """
+        return self._iterate_pages(
+            lambda current, size: self.list_synonym_sets(engine_name, current, size),
+            current, size, prefetch)
+
     def get_synonym_set(self, engine_name, synonym_set_id):
         """
         Get a single synonym set.
@@ -228,7 +500,7 @@ class Client:
         """
         return self.session.request('delete', "engines/{}/synonyms/{}".format(engine_name, synonym_set_id))
 
-    def search(self, engine_name, query, options=None):
+    def search(self, engine_name, query, options=None, lazy=False):
         """
         Search an engine. See https://swiftype.com/documentation/app-search/ for more details
         on options and return values.
@@ -236,11 +508,23 @@ class Client:
         :param engine_name: Name of engine to search over.
         :param query: Query string to search for.
         :param options: Dict of search options.
+        :param lazy: Decode the response as a
+        :class:`~elastic_app_search.lazy.LazyResponse`: True, or a callable
+        applied to each result such as
+        :class:`~elastic_app_search.lazy.CompactResult`. Lazy searches
+        bypass the response cache and the search coalescer.
         """
         endpoint = "engines/{}/search".format(engine_name)
         options = options or {}
         options['query'] = query
-        return self.session.request('get', endpoint, json=options)
+        if lazy:
+            return self._lazy_request(endpoint, options, lazy)
+        if self.search_coalescer is not None:
+            def send():
+                return self.search_coalescer.search(self, engine_name, options)
+        else:
+            send = None
+        return self._cached_request(engine_name, 'get', endpoint, options, send)
 
     def multi_search(self, engine_name, searches=None):
         """
@@ -278,7 +562,7 @@ class Client:
         endpoint = "engines/{}/query_suggestion".format(engine_name)
         options = options or {}
         options['query'] = query
-        return self.session.request('get', endpoint, json=options)
+        return self._cached_request(engine_name, 'get', endpoint, options)
 
     def click(self, engine_name, options):
         """
@@ -286,10 +570,16 @@ class Client:
         See https://swiftype.com/documentation/app-search/ for more details
         on options and return values.
 
+        When the client has an :class:`~elastic_app_search.events.EventSender`,
+        the click is queued and sent in the background instead.
+
         :param engine_name: Name of engine to search over.
         :param options: Dict of search options.
         """
         endpoint = "engines/{}/click".format(engine_name)
+        if self.event_sender is not None:
+            self.event_sender.enqueue(self.session, endpoint, options)
+            return None
         return self.session.request_ignore_response('post', endpoint, json=options)
 
     def create_meta_engine(self, engine_name, source_engines):
@@ -315,7 +605,7 @@ class Client:
         :param engine_name: Name of the engine.
         """
         endpoint = "engines/{}/search_settings".format(engine_name)
-        return self.session.request('get', endpoint)
+        return self._metadata_request(engine_name, SEARCH_SETTINGS, endpoint)
 
     def update_search_settings(self, engine_name, search_settings):
         """
@@ -325,7 +615,8 @@ class Client:
         :param search_settings: New search settings JSON
         """
         endpoint = "engines/{}/search_settings".format(engine_name)
-        return self.session.request('put', endpoint, json=search_settings)
+        return self._write_request(engine_name, 'put', endpoint, invalidate_metadata=True,
+                                   json=search_settings)
 
     def reset_search_settings(self, engine_name):
         """
@@ -334,7 +625,7 @@ class Client:
         :param engine_name: Name of the engine.
         """
         endpoint = "engines/{}/search_settings/reset".format(engine_name)
-        return self.session.request('post', endpoint)
+        return self._write_request(engine_name, 'post', endpoint, invalidate_metadata=True)
 
     @staticmethod
     def create_signed_search_key(api_key, api_key_name, options):
@@ -350,14 +641,22 @@ class Client:
         options['api_key_name'] = api_key_name
         return jwt.encode(options, api_key, algorithm=Client.SIGNED_SEARCH_TOKEN_JWT_ALGORITHM)
 
-    def get_api_logs(self, engine_name, options=None):
+    def get_api_logs(self, engine_name, options=None, stream=False, lazy=False):
         """
         Searches the API logs.
 
         :param engine_name: Name of engine.
         :param options: Dict of search options.
+        :param stream: Return a
+        :class:`~elastic_app_search.streaming.ResultStream` yielding the log
+        entries while the response is downloaded.
+        :param lazy: Decode the response lazily, as for :meth:`search`.
         """
         endpoint = "engines/{}/logs/api".format(engine_name)
         options = options or {}
+        if stream:
+            return self.session.request_stream('get', endpoint, json=options)
+        if lazy:
+            return self._lazy_request(endpoint, options, lazy)
         return self.session.request('get', endpoint, json=options)
 
@@ -0,0 +1,98 @@
+"""Coalescing of concurrent searches into multi search requests."""
+import threading
+from concurrent.futures import Future
+
+from .exceptions import BadRequest, ElasticAppSearchError
+
+# App Search accepts at most 10 queries per multi search request.
+MAX_MULTI_SEARCH_QUERIES = 10
+
+
+class PendingBatch:
+
+    def __init__(self):
+        self.entries = []
+        self.full = threading.Event()
+
+
+class SearchCoalescer:
+    """
+    Gathers concurrent :meth:`~elastic_app_search.Client.search` calls against
+    the same engine and sends them as a single multi search request.
+
+    The first search of a batch waits up to `window` seconds, or until
+    `max_size` searches joined it, then sends the batch and hands each caller
+    its own result. A search that finds no company within the window is sent
+    as a regular search. When the server rejects a batch as a bad request,
+    its searches are retried one by one so that an invalid query only fails
+    its own caller.
+
+    :param window: Maximum time in seconds a search waits for others.
+    :param max_size: Maximum number of searches per multi search request.
+    """
+
+    def __init__(self, window=0.002, max_size=MAX_MULTI_SEARCH_QUERIES):
+        self.window = window
+        self.max_size = min(max_size, MAX_MULTI_SEARCH_QUERIES)
+        self.lock = threading.Lock()
+        self.batches = {}
+
+    def search(self, client, engine_name, options):
+        """
+        :param client: Client sending the requests.
+        :param engine_name: Name of engine to search over.
+        :param options: Dict of search options, including the query.
+        :return: The search response for `options`.
+        """
+        future = Future()
+        with self.lock:
+            batch = self.batches.get(engine_name)
+            leader = batch is None
+            if leader:
+                batch = self.batches[engine_name] = PendingBatch()
+            batch.entries.append((options, future))
+            if len(batch.entries) >= self.max_size:
+                del self.batches[engine_name]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self.lock:
+                if self.batches.get(engine_name) is batch:
+                    del self.batches[engine_name]
+            self.send(client, engine_name, batch.entries)
+
+        return future.result()
+
+    def send(self, client, engine_name, entries):
+        if len(entries) == 1:
+            self.send_each(client, engine_name, entries)
+            return
+
+        endpoint = "engines/{}/multi_search".format(engine_name)
+        try:
+            results = client.session.request(
+                'get', endpoint, json={'queries': [options for options, _ in entries]})
+        except BadRequest:
+            self.send_each(client, engine_name, entries)
+            return
+        except Exception as error:
+            for _, future in entries:
+                future.set_exception(error)
+            return
+
+        for (_, future), result in zip(entries, results):
+            future.set_result(result)
+        # Never leave a caller waiting on a short response.
+        for _, future in entries[len(results):]:
+            future.set_exception(ElasticAppSearchError(
+                'multi search returned {} results for {} queries'.format(
+                    len(results), len(entries))))
+
+    def send_each(self, client, engine_name, entries):
+        endpoint = "engines/{}/search".format(engine_name)
+        for options, future in entries:
+            try:
+                future.set_result(client.session.request('get', endpoint, json=options))
+            except Exception as error:
+                future.set_exception(error)
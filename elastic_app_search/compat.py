@@ -0,0 +1,12 @@
+"""Compatibility helpers for the supported Python 2 and 3 versions."""
+
+try:
+    from time import monotonic, perf_counter
+except ImportError:  # Python 2
+    from time import time as monotonic  # noqa: F401
+    from time import time as perf_counter  # noqa: F401
+
+try:
+    from os import replace
+except ImportError:  # Python 2, where rename replaces the target on POSIX
+    from os import rename as replace  # noqa: F401
@@ -0,0 +1,12 @@
+"""Counters shared by the background workers."""
+
+
+class CounterMixin(object):
+    """
+    Adds `count` to background workers that keep named counters in
+    `self.counters`, guarded by their `self.condition`.
+    """
+
+    def count(self, name, value=1):
+        with self.condition:
+            self.counters[name] += value
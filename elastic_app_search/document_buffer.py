@@ -0,0 +1,241 @@
+"""Buffering of document writes, coalesced by document id."""
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from .bulk import MAX_DOCUMENTS_PER_REQUEST
+from .compat import monotonic
+from .counters import CounterMixin
+
+INDEX = 'index'
+UPDATE = 'update'
+HTTP_METHODS = {INDEX: 'post', UPDATE: 'patch'}
+
+
+class PendingWrites:
+    """
+    Coalesces index and update operations of one engine by document id.
+
+    An index operation replaces any pending operation of the same document,
+    and an update is merged into the pending index or update of its document,
+    so that each document is sent at most once. Index operations of documents
+    without an id cannot be coalesced and are all kept.
+    """
+
+    def __init__(self):
+        self.operations = {INDEX: OrderedDict(), UPDATE: OrderedDict()}
+        self.added = 0
+        self.anonymous = 0
+
+    def __len__(self):
+        return len(self.operations[INDEX]) + len(self.operations[UPDATE])
+
+    def add(self, operation, document, attempts=0):
+        self.added += 1
+        index, update = self.operations[INDEX], self.operations[UPDATE]
+        document_id = document.get('id')
+        if document_id is None:
+            self.anonymous += 1
+            index[('anonymous', self.anonymous)] = (document, attempts)
+        elif operation == INDEX:
+            update.pop(document_id, None)
+            index[document_id] = (document, attempts)
+        else:
+            pending = index if document_id in index else update
+            if document_id in pending:
+                merged, previous_attempts = pending[document_id]
+                merged = dict(merged)
+                merged.update(document)
+                pending[document_id] = (merged, max(attempts, previous_attempts))
+            else:
+                update[document_id] = (document, attempts)
+
+    def batches(self, max_documents=MAX_DOCUMENTS_PER_REQUEST):
+        """
+        :return: Generator of (operation, [(document, attempts)]) tuples, each
+        holding at most `max_documents` documents.
+        """
+        for operation in (INDEX, UPDATE):
+            entries = list(self.operations[operation].values())
+            for start in range(0, len(entries), max_documents):
+                yield operation, entries[start:start + max_documents]
+
+
+class DocumentBuffer(CounterMixin):
+    """
+    Buffers document writes in memory and sends them through the batch
+    document endpoints, keeping only the latest write of each document.
+
+    Writes are coalesced per engine with :class:`PendingWrites`: a document
+    indexed or updated many times before a flush is sent once. An engine is
+    flushed by the writing thread once `max_documents` distinct documents are
+    pending, by a background thread once its oldest pending write is
+    `max_age` seconds old, or by :meth:`flush`. Flushes are sent one at a
+    time so that writes to a document reach the server in order.
+
+    Writes of a background flush that fails are put back in the buffer,
+    under any newer write of the same documents, and sent with the next
+    flush. Document statuses of size and age triggered flushes are passed to
+    `on_flush(engine_name, operation, statuses)` when given.
+
+    :param client: :class:`~elastic_app_search.Client` sending the documents.
+    :param max_documents: Number of pending documents triggering a flush.
+    :param max_age: Maximum time in seconds a write waits in the buffer.
+    :param on_flush: Optional callable receiving document statuses.
+    """
+
+    def __init__(self, client, max_documents=MAX_DOCUMENTS_PER_REQUEST,
+                 max_age=1.0, on_flush=None):
+        self.client = client
+        self.max_documents = max_documents
+        self.max_age = max_age
+        self.on_flush = on_flush
+        self.pending = {}
+        self.oldest = {}
+        self.condition = threading.Condition()
+        self.send_lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.counters = {'added': 0, 'sent': 0, 'coalesced': 0}
+
+    def index_documents(self, engine_name, documents):
+        """
+        Buffers documents to be created or updated.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Hashes representing documents.
+        """
+        self.add(engine_name, INDEX, documents)
+
+    def update_documents(self, engine_name, documents):
+        """
+        Buffers partial updates of documents.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Hashes representing documents, including their `id`.
+        """
+        for document in documents:
+            if document.get('id') is None:
+                raise ValueError('documents to update must have an id')
+        self.add(engine_name, UPDATE, documents)
+
+    def add(self, engine_name, operation, documents):
+        with self.condition:
+            if self.closed:
+                raise ValueError('document buffer is closed')
+            writes = self.pending.get(engine_name)
+            if writes is None:
+                writes = self.pending[engine_name] = PendingWrites()
+                self.oldest[engine_name] = monotonic()
+            before = len(writes)
+            for document in documents:
+                writes.add(operation, document)
+            self.counters['added'] += len(documents)
+            self.counters['coalesced'] += len(documents) - (len(writes) - before)
+            full = len(writes) >= self.max_documents
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='app-search-buffer')
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify_all()
+        if full:
+            self.flush_engine(engine_name, self.on_flush)
+
+    def take(self, engine_name):
+        with self.condition:
+            self.oldest.pop(engine_name, None)
+            return self.pending.pop(engine_name, None)
+
+    def requeue(self, engine_name, writes):
+        """
+        Puts back writes that could not be sent, under any newer writes.
+        """
+        with self.condition:
+            newer = self.pending.get(engine_name)
+            self.pending[engine_name] = writes
+            self.oldest[engine_name] = monotonic()
+            if newer is not None:
+                before = len(writes)
+                for operation, entries in newer.batches():
+                    for document, attempts in entries:
+                        writes.add(operation, document, attempts)
+                self.counters['coalesced'] += len(newer) - (len(writes) - before)
+
+    def flush_engine(self, engine_name, on_flush=None):
+        endpoint = "engines/{}/documents".format(engine_name)
+        statuses = []
+        with self.send_lock:
+            writes = self.take(engine_name)
+            if writes is None:
+                return statuses
+            try:
+                for operation in (INDEX, UPDATE):
+                    entries = writes.operations[operation]
+                    while entries:
+                        keys = list(islice(entries, MAX_DOCUMENTS_PER_REQUEST))
+                        documents = [entries[key][0] for key in keys]
+                        response = self.client._write_request(
+                            engine_name, HTTP_METHODS[operation], endpoint,
+                            data=self.client.session.serializer.dumps(documents))
+                        for key in keys:
+                            del entries[key]
+                        self.count('sent', len(documents))
+                        if on_flush is not None:
+                            on_flush(engine_name, operation, response)
+                        statuses.extend(response)
+            except Exception:
+                self.requeue(engine_name, writes)
+                raise
+        return statuses
+
+    def flush(self):
+        """
+        Sends every buffered write.
+
+        :return: Document statuses of the sent documents.
+        """
+        with self.condition:
+            engine_names = list(self.pending)
+        statuses = []
+        for engine_name in engine_names:
+            statuses.extend(self.flush_engine(engine_name))
+        return statuses
+
+    def stats(self):
+        """
+        :return: Dict with the number of documents `added`, `sent`, and
+        `coalesced` into another write.
+        """
+        with self.condition:
+            return dict(self.counters)
+
+    def close(self):
+        """
+        Stops the background thread and sends every buffered write.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        return self.flush()
+
+    def run(self):
+        while True:
+            with self.condition:
+                if self.closed:
+                    return
+                now = monotonic()
+                expired = [engine_name for engine_name, oldest in self.oldest.items()
+                           if now - oldest >= self.max_age]
+                if not expired:
+                    timeout = self.max_age
+                    if self.oldest:
+                        timeout = min(self.oldest.values()) + self.max_age - now
+                    self.condition.wait(timeout)
+                    continue
+            for engine_name in expired:
+                try:
+                    self.flush_engine(engine_name, self.on_flush)
+                except Exception:
+                    pass
@@ -0,0 +1,241 @@
+"""Pool of App Search nodes with health checking and load balancing."""
+import random
+import threading
+
+import requests
+
+from .compat import monotonic
+from .retry import IDEMPOTENT_METHODS
+
+LEAST_LOADED = 'least_loaded'
+LOWEST_LATENCY = 'lowest_latency'
+STRATEGIES = (LEAST_LOADED, LOWEST_LATENCY)
+
+
+def can_fail_over(http_method, request_sent=True):
+    """
+    Tells whether a request that failed on one node may be sent to another.
+    Requests that never reached the server can be sent again whatever their
+    method, others only when they are idempotent.
+    """
+    return not request_sent or http_method.upper() in IDEMPOTENT_METHODS
+
+
+def http_health_check(headers, timeout=2.0):
+    """
+    :return: Health check sending `GET engines` to a node, which is healthy
+    when it answers without a server error.
+    """
+    def check(base_url):
+        response = requests.get("{}/engines".format(base_url), headers=headers,
+                                params={'page[size]': 1}, timeout=timeout)
+        response.close()
+        return response.status_code < 500
+    return check
+
+
+class Endpoint:
+    """
+    State of one node of an :class:`EndpointPool`.
+
+    :param url: Base URL of the node, such as
+    `https://node-1.internal:3002/api/as/v1`.
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.in_flight = 0
+        self.latency = None
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+
+    def available(self, now):
+        return self.ejected_until is None or self.ejected_until <= now
+
+    def as_dict(self, now):
+        return {
+            'url': self.url,
+            'healthy': self.available(now),
+            'in_flight': self.in_flight,
+            'latency': self.latency,
+            'failures': self.failures,
+            'ejections': self.ejections,
+        }
+
+    def __repr__(self):
+        return 'Endpoint({!r})'.format(self.url)
+
+
+class EndpointPool:
+    """
+    Spreads requests over several App Search nodes serving the same data.
+
+    Each request is routed to the healthy node with the fewest requests in
+    flight (`least_loaded`), or with the lowest average latency weighted by
+    its requests in flight (`lowest_latency`). Nodes are ejected for
+    `ejection_time` seconds after `max_failures` consecutive network or
+    server errors, doubled on every ejection in a row up to
+    `max_ejection_time`. When every node is ejected, the one due back first
+    is used rather than failing the request.
+
+    With `health_check_interval`, every node is also checked in the
+    background: failing nodes are ejected and ejected nodes that pass are
+    put back in rotation. The check sends `GET engines` unless a
+    `health_check` callable taking the base URL of a node is given.
+
+    A request that fails on a node is sent to the next one when it never
+    reached the server or its method is idempotent, see
+    :func:`can_fail_over`.
+
+    :param urls: Base URLs of the nodes, including the `api/as/v1` prefix.
+    :param strategy: `least_loaded` or `lowest_latency`.
+    :param max_failures: Consecutive failures after which a node is ejected.
+    :param ejection_time: Seconds a node is ejected for the first time.
+    :param max_ejection_time: Upper bound of the ejection time.
+    :param health_check_interval: Seconds between active health checks, None
+    to only eject nodes on failed requests.
+    :param health_check: Optional callable returning whether the node at a
+    base URL is healthy.
+    :param decay: Weight of the latest request in the average latency.
+    """
+
+    def __init__(self, urls, strategy=LEAST_LOADED, max_failures=3, ejection_time=10.0,
+                 max_ejection_time=300.0, health_check_interval=None, health_check=None,
+                 decay=0.3):
+        if not urls:
+            raise ValueError('an endpoint pool needs at least one url')
+        if strategy not in STRATEGIES:
+            raise ValueError('strategy must be one of {}'.format(', '.join(STRATEGIES)))
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.health_check_interval = health_check_interval
+        self.health_check = health_check
+        self.decay = decay
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    @property
+    def urls(self):
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def score(self, endpoint):
+        # Nodes without a measured latency are tried first, nodes that just
+        # failed last among equals.
+        latency = endpoint.latency or 0.0
+        if self.strategy == LEAST_LOADED:
+            return (endpoint.in_flight, endpoint.failures, latency, random.random())
+        return (latency * (endpoint.in_flight + 1), endpoint.failures, random.random())
+
+    def acquire(self, exclude=()):
+        """
+        Picks the node of the next request and counts it in flight on it.
+
+        :param exclude: Nodes the request already failed on.
+        :return: The :class:`Endpoint`, or None when every node is excluded.
+        """
+        now = monotonic()
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            available = [endpoint for endpoint in candidates if endpoint.available(now)]
+            if available:
+                endpoint = min(available, key=self.score)
+            else:
+                endpoint = min(candidates, key=lambda candidate: candidate.ejected_until)
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint, latency=None, failed=False):
+        """
+        Records the outcome of a request sent with :meth:`acquire`.
+
+        :param latency: Seconds the node took to answer.
+        :param failed: Whether the node failed with a network or server error.
+        """
+        with self.lock:
+            endpoint.in_flight -= 1
+            if failed:
+                endpoint.failures += 1
+                if endpoint.failures >= self.max_failures:
+                    self.eject(endpoint)
+                return
+            endpoint.failures = 0
+            endpoint.ejections = 0
+            endpoint.ejected_until = None
+            if latency is not None:
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.decay * (latency - endpoint.latency)
+
+    def eject(self, endpoint):
+        duration = min(self.ejection_time * 2 ** endpoint.ejections, self.max_ejection_time)
+        endpoint.ejected_until = monotonic() + duration
+        endpoint.ejections += 1
+        endpoint.failures = 0
+
+    def readmit(self, endpoint):
+        endpoint.ejected_until = None
+        endpoint.failures = 0
+        # Measure the node again rather than trusting its latency before it failed.
+        endpoint.latency = None
+
+    def check(self):
+        """
+        Runs the health check of every node once.
+        """
+        for endpoint in self.endpoints:
+            try:
+                healthy = self.health_check(endpoint.url)
+            except Exception:
+                healthy = False
+            with self.lock:
+                if healthy and endpoint.ejected_until is not None:
+                    self.readmit(endpoint)
+                elif not healthy and endpoint.available(monotonic()):
+                    self.eject(endpoint)
+
+    def start(self, default_health_check=None):
+        """
+        Starts the health checks, using `default_health_check` unless the
+        pool was given one. Called by the session using the pool.
+        """
+        with self.lock:
+            if self.health_check_interval is None or self.thread is not None:
+                return
+            if self.health_check is None:
+                self.health_check = default_health_check
+            if self.health_check is None:
+                return
+            self.thread = threading.Thread(target=self.run, name='app-search-health-check')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.health_check_interval):
+            self.check()
+
+    def close(self):
+        """Stops the health checks."""
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def stats(self):
+        """
+        :return: List with the `url`, `healthy` state, requests `in_flight`,
+        average `latency`, consecutive `failures` and `ejections` in a row of
+        every node.
+        """
+        now = monotonic()
+        with self.lock:
+            return [endpoint.as_dict(now) for endpoint in self.endpoints]
@@ -0,0 +1,275 @@
+"""Background sending of click events."""
+import atexit
+import io
+import json
+import os
+import threading
+from collections import deque
+
+import requests
+
+from .compat import monotonic, replace
+from .counters import CounterMixin
+from .exceptions import CircuitOpen
+
+
+def server_unavailable(error):
+    """
+    Tells whether a request failed because the server could not be reached
+    or is overloaded, in which case it is worth sending again later.
+    """
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          CircuitOpen)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+
+class EventSender(CounterMixin):
+    """
+    Sends click events from a background thread so that tracking a click does
+    not wait for the server.
+
+    Events are queued in a buffer of at most `max_buffer` events and sent in
+    batches of up to `batch_size` events, as soon as a batch is full or at
+    least every `flush_interval` seconds. When the buffer is full, `enqueue`
+    waits up to `block_timeout` seconds for room and otherwise drops the
+    event.
+
+    While the server is unavailable, sending is paused for `retry_interval`
+    seconds at a time. With a `spill_path`, queued events are appended to that
+    file instead of occupying the buffer, and are sent again, after a restart
+    too, once the server answers. Delivery of spilled events is at least once.
+
+    :meth:`close` sends or spills the remaining events and is registered to
+    run at interpreter exit.
+
+    :param max_buffer: Maximum number of queued events.
+    :param batch_size: Number of events sent per wake up of the sender.
+    :param flush_interval: Maximum time in seconds an event waits in the buffer.
+    :param spill_path: Optional NDJSON file holding events while the server
+    is unavailable.
+    :param block_timeout: Seconds `enqueue` waits for room in a full buffer.
+    :param retry_interval: Seconds to wait before retrying an unavailable server.
+    """
+
+    def __init__(self, max_buffer=10000, batch_size=100, flush_interval=0.5,
+                 spill_path=None, block_timeout=0, retry_interval=5):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.block_timeout = block_timeout
+        self.retry_interval = retry_interval
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.session = None
+        self.thread = None
+        self.closed = False
+        self.flushing = False
+        self.in_flight = 0
+        self.unavailable_until = None
+        self.counters = {'sent': 0, 'failed': 0, 'dropped': 0, 'spilled': 0}
+
+    def enqueue(self, session, endpoint, payload):
+        """
+        Queues an event to be sent with `session`.
+
+        :return: True when the event was queued, False when it was dropped.
+        """
+        with self.condition:
+            if self.closed:
+                raise ValueError('event sender is closed')
+            self.session = session
+            if len(self.buffer) >= self.max_buffer and self.block_timeout:
+                deadline = monotonic() + self.block_timeout
+                while len(self.buffer) >= self.max_buffer and not self.closed:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            if len(self.buffer) >= self.max_buffer:
+                self.counters['dropped'] += 1
+                return False
+            self.buffer.append((endpoint, payload))
+            if self.thread is None:
+                self.start()
+            if len(self.buffer) >= self.batch_size:
+                self.condition.notify_all()
+            return True
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='app-search-events')
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def stats(self):
+        """
+        :return: Dict with the number of events `sent`, `failed` with a client
+        error, `dropped` because the buffer was full, `spilled` to disk, and
+        currently `queued`.
+        """
+        with self.condition:
+            stats = dict(self.counters)
+            stats['queued'] = len(self.buffer) + self.in_flight
+            return stats
+
+    def flush(self, timeout=None):
+        """
+        Sends the queued events now and waits until they are sent or spilled.
+
+        :return: True when the buffer was emptied within `timeout` seconds.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        with self.condition:
+            self.flushing = True
+            self.condition.notify_all()
+            try:
+                while self.buffer or self.in_flight:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+                return True
+            finally:
+                self.flushing = False
+
+    def close(self, timeout=None):
+        """
+        Stops accepting events, then sends or spills the queued ones.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def next_batch(self):
+        """
+        Waits for a batch of events.
+
+        :return: Tuple of the events and whether sending is paused, or None
+        once the sender is closed and drained.
+        """
+        with self.condition:
+            deadline = monotonic() + self.flush_interval
+            while not self.closed:
+                now = monotonic()
+                if self.paused(now) and self.spill_path is None:
+                    # Nowhere to put the events: keep them buffered until retrying.
+                    self.condition.wait(self.unavailable_until - now)
+                    continue
+                if ((self.flushing and self.buffer) or len(self.buffer) >= self.batch_size
+                        or now >= deadline):
+                    break
+                self.condition.wait(deadline - now)
+
+            if self.closed and not self.buffer:
+                return None
+            paused = self.paused(monotonic())
+            size = len(self.buffer)
+            if not (paused or self.closed):
+                size = min(size, self.batch_size)
+            batch = [self.buffer.popleft() for _ in range(size)]
+            self.in_flight = len(batch)
+            self.condition.notify_all()
+            return batch, paused
+
+    def paused(self, now):
+        return self.unavailable_until is not None and now < self.unavailable_until
+
+    def run(self):
+        if self.spill_path is not None:
+            # Events left over by a previous process.
+            if self.replay(self.spill_path + '.replay'):
+                self.replay(self.spill_path)
+        while True:
+            pending = self.next_batch()
+            if pending is None:
+                break
+            batch, paused = pending
+            try:
+                if paused:
+                    self.spill(batch)
+                else:
+                    self.send_batch(batch)
+            finally:
+                with self.condition:
+                    self.in_flight = 0
+                    self.condition.notify_all()
+
+    def send_batch(self, batch):
+        if self.spill_path is not None and not self.replay(self.spill_path):
+            self.spill(batch)
+            return
+        for position, event in enumerate(batch):
+            if not self.send(event):
+                self.unavailable(batch[position:])
+                return
+        self.unavailable_until = None
+
+    def send(self, event):
+        """:return: False when the server is unavailable."""
+        endpoint, payload = event
+        try:
+            self.session.request_ignore_response('post', endpoint, json=payload)
+        except Exception as error:
+            if server_unavailable(error):
+                return False
+            self.count('failed')
+        else:
+            self.count('sent')
+        return True
+
+    def unavailable(self, events):
+        self.unavailable_until = monotonic() + self.retry_interval
+        if self.spill_path is not None:
+            self.spill(events)
+            return
+        with self.condition:
+            room = self.max_buffer - len(self.buffer)
+            self.buffer.extendleft(reversed(events[:room]))
+            self.counters['dropped'] += max(len(events) - room, 0)
+
+    def spill(self, events):
+        if not events:
+            return
+        if self.spill_path is None:
+            self.count('dropped', len(events))
+            return
+        self.write_spill(events)
+        self.count('spilled', len(events))
+
+    def write_spill(self, events):
+        with io.open(self.spill_path, 'ab') as f:
+            for endpoint, payload in events:
+                line = json.dumps({'endpoint': endpoint, 'payload': payload})
+                f.write(line.encode('utf-8') + b'\n')
+
+    def replay(self, path):
+        """
+        Sends the events spilled to `path`. Events that cannot be sent are
+        spilled again.
+
+        :return: False when the server is unavailable.
+        """
+        replay_path = self.spill_path + '.replay'
+        if not os.path.exists(path):
+            return True
+        if path != replay_path:
+            replace(path, replay_path)
+
+        with io.open(replay_path, 'rb') as f:
+            events = [json.loads(line.decode('utf-8')) for line in f if line.strip()]
+        events = [(event['endpoint'], event['payload']) for event in events]
+        available = True
+        for position, event in enumerate(events):
+            if not self.send(event):
+                self.unavailable_until = monotonic() + self.retry_interval
+                self.write_spill(events[position:])
+                available = False
+                break
+        os.remove(replay_path)
+        return available
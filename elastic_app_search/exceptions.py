@@ -30,3 +30,12 @@ class InvalidDocument(ElasticAppSearchError):
     def __init__(self, message, document):
         super(ElasticAppSearchError, self).__init__(message)
         self.document = document
+
+class CircuitOpen(ElasticAppSearchError):
+    """Raised when a request is rejected by an open circuit breaker"""
+
+    def __init__(self, key, retry_after):
+        super(ElasticAppSearchError, self).__init__(
+            'circuit open for {}, retry in {:.1f}s'.format(key, retry_after))
+        self.key = key
+        self.retry_after = retry_after
@@ -0,0 +1,135 @@
+"""Export engine documents to compressed NDJSON files and import them back."""
+import gzip
+import io
+import json
+import os
+
+from .bulk import ordered_map
+from .compat import replace
+from .pagination import MAX_PAGE_SIZE
+from .serializer import JSONSerializer
+
+
+def read_checkpoint(checkpoint_path):
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return None
+    with io.open(checkpoint_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_checkpoint(checkpoint_path, checkpoint):
+    temporary_path = checkpoint_path + '.tmp'
+    with io.open(temporary_path, 'wb') as f:
+        f.write(json.dumps(checkpoint).encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+    replace(temporary_path, checkpoint_path)
+
+
+def export_documents(client, engine_name, path, checkpoint_path=None,
+                     page_size=MAX_PAGE_SIZE, max_workers=4,
+                     pages_per_checkpoint=10, compresslevel=6):
+    """
+    Exports every document of an engine to a gzip compressed NDJSON file.
+
+    Pages are fetched concurrently and written in order, holding at most a
+    few pages in memory. Every `pages_per_checkpoint` pages the output is
+    closed as a complete gzip member, synced to disk and recorded in
+    `checkpoint_path`. Running the export again with the same checkpoint
+    discards anything written after the last checkpoint and resumes from
+    there. The checkpoint is removed once the export completes.
+
+    :param client: :class:`~elastic_app_search.Client` to export with.
+    :param engine_name: Name of the engine to export.
+    :param path: Output file.
+    :param checkpoint_path: Optional file recording export progress.
+    :param page_size: Number of documents per page.
+    :param max_workers: Number of pages fetched in parallel.
+    :param pages_per_checkpoint: Number of pages between checkpoints.
+    :param compresslevel: gzip compression level.
+    :return: Number of documents in the exported file.
+    """
+    checkpoint = read_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint.get('engine_name') != engine_name:
+        raise ValueError("checkpoint {} belongs to engine {}".format(
+            checkpoint_path, checkpoint.get('engine_name')))
+    checkpoint = checkpoint or {
+        'engine_name': engine_name, 'next_page': 1, 'offset': 0, 'documents': 0}
+
+    serializer = client.session.serializer
+    first_page = client.list_documents(engine_name, 1, page_size)
+    total_pages = first_page['meta']['page']['total_pages']
+
+    def fetch(current):
+        if current == 1:
+            return first_page
+        return client.list_documents(engine_name, current, page_size)
+
+    with io.open(path, 'r+b' if checkpoint['offset'] else 'wb') as f:
+        f.seek(checkpoint['offset'])
+        f.truncate()
+        member = None
+        pages = range(checkpoint['next_page'], total_pages + 1)
+        for current, response in zip(pages, ordered_map(fetch, pages, max_workers)):
+            if member is None:
+                member = gzip.GzipFile(fileobj=f, mode='wb', compresslevel=compresslevel)
+            for document in response['results']:
+                member.write(serializer.dumps(document))
+                member.write(b'\n')
+            checkpoint['documents'] += len(response['results'])
+
+            if current % pages_per_checkpoint == 0 or current == total_pages:
+                member.close()
+                member = None
+                f.flush()
+                os.fsync(f.fileno())
+                checkpoint['next_page'] = current + 1
+                checkpoint['offset'] = f.tell()
+                if checkpoint_path is not None:
+                    write_checkpoint(checkpoint_path, checkpoint)
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return checkpoint['documents']
+
+
+def read_documents(path, loads=None):
+    """
+    Lazily reads the documents of an NDJSON file, gzip compressed or not.
+
+    :param path: NDJSON file.
+    :param loads: Callable decoding one line of JSON bytes, by default
+    :meth:`JSONSerializer.loads`, since `json.loads` only accepts bytes from
+    Python 3.6.
+    """
+    if loads is None:
+        loads = JSONSerializer().loads
+    with io.open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    opener = gzip.open if compressed else io.open
+    with opener(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def import_documents(client, engine_name, path, max_workers=4):
+    """
+    Indexes the documents of an NDJSON file, such as one written by
+    :func:`export_documents`, in parallel.
+
+    :param client: :class:`~elastic_app_search.Client` to import with.
+    :param engine_name: Name of the engine to index documents into.
+    :param path: NDJSON file, gzip compressed or not.
+    :param max_workers: Number of requests sent in parallel.
+    :return: Dict with the number of `documents` sent and the `failed`
+    document statuses.
+    """
+    documents = 0
+    failed = []
+    documents_iterator = read_documents(path, client.session.serializer.loads)
+    for status in client.bulk_index_documents(engine_name, documents_iterator, max_workers):
+        documents += 1
+        if status.get('errors'):
+            failed.append(status)
+    return {'documents': documents, 'failed': failed}
@@ -0,0 +1,229 @@
+"""Request instrumentation: per-request metrics, histograms and exporters."""
+import threading
+import time
+from collections import defaultdict
+
+from .compat import perf_counter
+
+ENGINE_SUBRESOURCE_IDS = {
+    'synonyms': '{synonym_set_id}',
+    'curations': '{curation_id}',
+}
+
+
+def endpoint_template(endpoint):
+    """
+    Replaces the names and ids of an endpoint with placeholders so that
+    metrics of all engines aggregate together, e.g. `engines/videos/search`
+    becomes `engines/{engine_name}/search`.
+    """
+    parts = endpoint.split('/')
+    if len(parts) >= 2 and parts[0] == 'engines':
+        parts[1] = '{engine_name}'
+        if len(parts) >= 4 and parts[2] in ENGINE_SUBRESOURCE_IDS:
+            parts[3] = ENGINE_SUBRESOURCE_IDS[parts[2]]
+    return '/'.join(parts)
+
+
+class RequestMetrics:
+    """
+    Measurements of a single client call, including its retries. Timings are
+    in seconds and are None when they do not apply or the transport could not
+    measure them. `connect` covers opening a new connection, name resolution
+    and TLS included, and is None when a pooled connection was reused. `dns`
+    is only measured by the asyncio session.
+    """
+
+    __slots__ = ('http_method', 'endpoint', 'template', 'started_at',
+                 'start_time', 'dns', 'connect', 'ttfb', 'total',
+                 'status_code', 'request_bytes', 'response_bytes',
+                 'retries', 'error')
+
+    def __init__(self, http_method, endpoint, request_bytes=0):
+        self.http_method = http_method.upper()
+        self.endpoint = endpoint
+        self.template = endpoint_template(endpoint)
+        self.start_time = time.time()
+        self.started_at = perf_counter()
+        self.dns = None
+        self.connect = None
+        self.ttfb = None
+        self.total = None
+        self.status_code = None
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.retries = 0
+        self.error = None
+
+    def add_timing(self, name, value):
+        if value is not None:
+            setattr(self, name, (getattr(self, name) or 0.0) + value)
+
+    def finish(self):
+        self.total = perf_counter() - self.started_at
+
+
+class Histogram:
+    """
+    Log-linear histogram in the style of HdrHistogram. Each power of two is
+    split into `2 ** sub_bucket_bits` buckets, which bounds the relative error
+    of reported percentiles to about `2 ** -sub_bucket_bits` while keeping
+    memory proportional to the dynamic range of the recorded values.
+
+    Values are recorded as integers in units of `resolution` seconds.
+    """
+
+    def __init__(self, sub_bucket_bits=5, resolution=1e-6):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.resolution = resolution
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.lock = threading.Lock()
+
+    def bucket(self, units):
+        shift = max(units.bit_length() - self.sub_bucket_bits - 1, 0)
+        return shift, units >> shift
+
+    def record(self, value):
+        units = max(int(value / self.resolution), 0)
+        key = self.bucket(units)
+        with self.lock:
+            self.counts[key] += 1
+            self.count += 1
+            self.sum += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def percentile(self, percentile):
+        """
+        :param percentile: Percentile between 0 and 100.
+        :return: Upper bound of the bucket holding the percentile, in seconds,
+        or None when nothing was recorded.
+        """
+        with self.lock:
+            if not self.count:
+                return None
+            rank = max(percentile / 100.0 * self.count, 1)
+            seen = 0
+            for shift, sub_bucket in sorted(self.counts, key=lambda k: k[1] << k[0]):
+                seen += self.counts[(shift, sub_bucket)]
+                if seen >= rank:
+                    upper = ((sub_bucket + 1) << shift) - 1
+                    return min(upper * self.resolution, self.max)
+            return self.max
+
+
+class MetricsCollector:
+    """
+    Hook aggregating :class:`RequestMetrics` per HTTP method and endpoint
+    template into latency histograms and counters.
+    """
+
+    TIMINGS = ('dns', 'connect', 'ttfb', 'total')
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, sub_bucket_bits=5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.histograms = {}
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def histogram(self, key):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram(self.sub_bucket_bits))
+        return histogram
+
+    def __call__(self, metrics):
+        labels = (metrics.http_method, metrics.template)
+        for name in self.TIMINGS:
+            value = getattr(metrics, name)
+            if value is not None:
+                self.histogram(labels + (name,)).record(value)
+        status = str(metrics.status_code) if metrics.status_code is not None else 'error'
+        with self.lock:
+            self.counters[labels + ('requests', status)] += 1
+            self.counters[labels + ('request_bytes', None)] += metrics.request_bytes
+            self.counters[labels + ('response_bytes', None)] += metrics.response_bytes
+            self.counters[labels + ('retries', None)] += metrics.retries
+
+    def prometheus_text(self, prefix='app_search_client'):
+        """
+        :return: Collected metrics in the Prometheus text exposition format.
+        Latencies are exported as summaries.
+        """
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items(), key=lambda item: str(item[0]))
+
+        for name in self.TIMINGS:
+            metric = "{}_{}_seconds".format(prefix, name)
+            lines.append("# TYPE {} summary".format(metric))
+            for (method, template, timing), histogram in histograms:
+                if timing != name:
+                    continue
+                labels = 'method="{}",endpoint="{}"'.format(method, template)
+                for quantile in self.QUANTILES:
+                    lines.append('{}{{{},quantile="{}"}} {}'.format(
+                        metric, labels, quantile, histogram.percentile(quantile * 100)))
+                lines.append('{}_sum{{{}}} {}'.format(metric, labels, histogram.sum))
+                lines.append('{}_count{{{}}} {}'.format(metric, labels, histogram.count))
+
+        for name in ('requests', 'request_bytes', 'response_bytes', 'retries'):
+            metric = "{}_{}_total".format(prefix, name)
+            lines.append("# TYPE {} counter".format(metric))
+            for (method, template, counter, status), value in counters:
+                if counter != name:
+                    continue
+                labels = 'method="{}",endpoint="{}"'.format(method, template)
+                if status is not None:
+                    labels += ',status="{}"'.format(status)
+                lines.append('{}{{{}}} {}'.format(metric, labels, value))
+
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetryHook:
+    """
+    Hook emitting an OpenTelemetry span per request. Requires the
+    `opentelemetry-api` package.
+
+    :param tracer: Tracer to use, defaults to the tracer of this package from
+    the global tracer provider.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer('elastic_app_search')
+
+    def __call__(self, metrics):
+        start_time = int(metrics.start_time * 1e9)
+        span = self.tracer.start_span(
+            "{} {}".format(metrics.http_method, metrics.template),
+            kind=self.trace.SpanKind.CLIENT,
+            start_time=start_time)
+        span.set_attribute('http.request.method', metrics.http_method)
+        span.set_attribute('url.path', metrics.endpoint)
+        span.set_attribute('app_search.endpoint', metrics.template)
+        span.set_attribute('http.request.body.size', metrics.request_bytes)
+        span.set_attribute('http.response.body.size', metrics.response_bytes)
+        span.set_attribute('http.request.resend_count', metrics.retries)
+        if metrics.status_code is not None:
+            span.set_attribute('http.response.status_code', metrics.status_code)
+        for name in MetricsCollector.TIMINGS:
+            value = getattr(metrics, name)
+            if value is not None:
+                span.set_attribute('app_search.{}_seconds'.format(name), value)
+        if metrics.error is not None:
+            span.record_exception(metrics.error)
+            span.set_status(self.trace.Status(self.trace.StatusCode.ERROR))
+        span.end(end_time=start_time + int((metrics.total or 0) * 1e9))
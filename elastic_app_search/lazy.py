@@ -0,0 +1,269 @@
+"""Lazy decoding of large JSON responses."""
+import json
+import re
+import threading
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:  # Python 2
+    from collections import Mapping, Sequence
+
+from .serializer import default_serializer
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Values are located with the C scanner of the json module, which can start
+# decoding at an offset of a string, unlike orjson.
+DECODER = json.JSONDecoder()
+
+
+def skip_whitespace(text, position):
+    return WHITESPACE.match(text, position).end()
+
+
+def expect(text, position, tokens):
+    token = text[position:position + 1]
+    if token not in tokens:
+        raise ValueError('expected {!r} at {}'.format(tokens, position))
+    return token
+
+
+class LazyResults(Sequence):
+    """
+    Sequence over the elements of a JSON array that are decoded when first
+    accessed. Elements are only located as far as they are read, so the
+    first results are available without decoding the whole array. Accessed
+    elements are kept, iterating does not keep the elements it yields.
+
+    Reading locates elements under `lock`, so the sequence may be shared
+    between threads.
+    """
+
+    def __init__(self, text, start, result_class=None, lock=None):
+        self.text = text
+        self.result_class = result_class
+        self.lock = lock or threading.RLock()
+        self.spans = []
+        self.decoded = {}
+        self.position = skip_whitespace(text, start + 1)
+        self.complete = text[self.position:self.position + 1] == ']'
+        self.end = self.position + 1 if self.complete else None
+
+    def decode(self, value):
+        return self.result_class(value) if self.result_class is not None else value
+
+    def locate_next(self):
+        """
+        Decodes the element following the located ones.
+
+        :return: The decoded element.
+        """
+        text = self.text
+        start = self.position
+        value, end = DECODER.raw_decode(text, start)
+        self.spans.append((start, end))
+        position = skip_whitespace(text, end)
+        if expect(text, position, (',', ']')) == ']':
+            self.complete = True
+            self.end = position + 1
+        else:
+            self.position = skip_whitespace(text, position + 1)
+        return value
+
+    def locate(self, index=None):
+        with self.lock:
+            while not self.complete and (index is None or len(self.spans) <= index):
+                self.locate_next()
+
+    def __len__(self):
+        with self.lock:
+            self.locate()
+            return len(self.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError('result index out of range')
+        with self.lock:
+            return self.get(index)
+
+    def get(self, index):
+        if index not in self.decoded:
+            while index >= len(self.spans) and not self.complete:
+                value = self.locate_next()
+                if len(self.spans) - 1 == index:
+                    self.decoded[index] = self.decode(value)
+                    return self.decoded[index]
+            if index >= len(self.spans):
+                raise IndexError('result index out of range')
+            self.decoded[index] = self.decode(DECODER.raw_decode(self.text, self.spans[index][0])[0])
+        return self.decoded[index]
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self.lock:
+                if index in self.decoded:
+                    value = self.decoded[index]
+                elif index < len(self.spans):
+                    value = self.decode(DECODER.raw_decode(self.text, self.spans[index][0])[0])
+                elif self.complete:
+                    return
+                else:
+                    value = self.decode(self.locate_next())
+            yield value
+            index += 1
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'LazyResults({!r})'.format(list(self))
+
+
+class LazyResponse(Mapping):
+    """
+    Read-only mapping over a JSON object response that keeps the raw text
+    and decodes members up to the one accessed. A `results` array is
+    returned as :class:`LazyResults` without being decoded, so `meta` and
+    the first results of a search can be read before the rest is decoded.
+
+    Members are decoded under a lock shared with the results, so a response
+    may be shared between threads, e.g. by the response cache.
+    """
+
+    def __init__(self, text, result_class=None):
+        self.text = text
+        self.result_class = result_class
+        self.lock = threading.RLock()
+        self.members = {}
+        self.names = []
+        self.position = skip_whitespace(text, skip_whitespace(text, 0) + 1)
+        self.complete = text[self.position:self.position + 1] == '}'
+        self.results = None
+
+    def scan(self, key=None):
+        """
+        Decodes members until `key` is found, or all of them.
+        """
+        with self.lock:
+            self.scan_members(key)
+
+    def scan_members(self, key):
+        text = self.text
+        while not self.complete and (key is None or key not in self.members):
+            position = self.position
+            if self.results is not None:
+                # The members following the results start after them.
+                self.results.locate()
+                position = skip_whitespace(text, self.results.end)
+                self.results = None
+                if expect(text, position, (',', '}')) == '}':
+                    self.complete = True
+                    return
+                position = skip_whitespace(text, position + 1)
+
+            name, end = DECODER.raw_decode(text, position)
+            position = skip_whitespace(text, end)
+            expect(text, position, (':',))
+            start = skip_whitespace(text, position + 1)
+            self.names.append(name)
+            if name == 'results' and text[start:start + 1] == '[':
+                self.results = self.members[name] = LazyResults(
+                    text, start, self.result_class, self.lock)
+                continue
+
+            self.members[name], end = DECODER.raw_decode(text, start)
+            position = skip_whitespace(text, end)
+            if expect(text, position, (',', '}')) == '}':
+                self.complete = True
+            else:
+                self.position = skip_whitespace(text, position + 1)
+
+    def __getitem__(self, key):
+        self.scan(key)
+        return self.members[key]
+
+    def __iter__(self):
+        self.scan()
+        return iter(self.names)
+
+    def __len__(self):
+        self.scan()
+        return len(self.names)
+
+    def __repr__(self):
+        return 'LazyResponse({!r})'.format(dict(self))
+
+
+class CompactResult(object):
+    """
+    Compact representation of a search result, flattening the `raw` and
+    `snippet` values of each field.
+    """
+
+    __slots__ = ('id', 'score', 'raw', 'snippets')
+
+    def __init__(self, result):
+        meta = result.get('_meta') or {}
+        self.score = meta.get('score')
+        self.raw = {}
+        self.snippets = {}
+        for name, value in result.items():
+            if name == '_meta' or not isinstance(value, dict):
+                continue
+            if 'raw' in value:
+                self.raw[name] = value['raw']
+            if value.get('snippet') is not None:
+                self.snippets[name] = value['snippet']
+        self.id = self.raw.get('id', meta.get('id'))
+
+    def __repr__(self):
+        return 'CompactResult(id={!r}, score={!r})'.format(self.id, self.score)
+
+
+def loads_lazily(data, loads, result_class=None):
+    """
+    Decodes a JSON object response to a :class:`LazyResponse`, and other
+    values with `loads`.
+
+    :param result_class: Optional callable applied to each decoded result,
+    such as :class:`CompactResult` for search responses.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    start = skip_whitespace(data, 0)
+    if data[start:start + 1] != '{':
+        return loads(data)
+    return LazyResponse(data, result_class)
+
+
+class LazySerializer(object):
+    """
+    Serializer decoding JSON object responses to :class:`LazyResponse`, so
+    that large responses are only decoded as far as they are read. Other
+    responses, and requests, are handled by `serializer`. To decode only
+    some responses lazily, or to decode results to :class:`CompactResult`,
+    use the `lazy` option of :meth:`~elastic_app_search.Client.search`
+    instead.
+
+    Lazy responses are read-only and must not be mutated.
+
+    :param serializer: Serializer encoding requests and decoding values.
+    Defaults to :func:`~elastic_app_search.serializer.default_serializer`.
+    """
+
+    def __init__(self, serializer=None):
+        self.serializer = serializer or default_serializer()
+
+    def dumps(self, value):
+        return self.serializer.dumps(value)
+
+    def loads(self, data):
+        return loads_lazily(data, self.serializer.loads)
@@ -0,0 +1,146 @@
+"""Cache for engine schemas and search settings."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .compat import monotonic
+
+SCHEMA = 'schema'
+SEARCH_SETTINGS = 'search_settings'
+
+
+class CacheEntry:
+
+    __slots__ = ('value', 'etag', 'updated_at')
+
+    def __init__(self, value, etag, updated_at):
+        self.value = value
+        self.etag = etag
+        self.updated_at = updated_at
+
+
+class MetadataCache:
+    """
+    Caches engine schemas and search settings, which change rarely but are
+    read on hot paths.
+
+    Once a value is older than `refresh_after` seconds it is still returned
+    but revalidated in the background, with `If-None-Match` when the server
+    sent an `ETag`, so readers keep being served from memory. Readers only
+    wait for the server when nothing is cached or the value is older than
+    `ttl + max_stale` seconds, e.g. because refreshes keep failing.
+
+    Schema and search settings updates made through the client invalidate
+    the engine. Cached values are shared between callers and must not be
+    mutated.
+
+    :param ttl: Seconds after which a value is considered stale.
+    :param refresh_after: Seconds after which a value is refreshed in the
+    background. Defaults to three quarters of `ttl`.
+    :param max_stale: Seconds a stale value may still be served while it is
+    being refreshed.
+    :param max_workers: Number of background refresh threads.
+    """
+
+    def __init__(self, ttl=300, refresh_after=None, max_stale=3600, max_workers=1):
+        self.ttl = ttl
+        self.refresh_after = refresh_after if refresh_after is not None else ttl * 0.75
+        self.max_stale = max_stale
+        self.max_workers = max_workers
+        self.entries = {}
+        self.generations = {}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def lookup(self, key):
+        """
+        :return: Tuple of the cached value, or None when it cannot be served,
+        and whether it should be refreshed.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, True
+            age = monotonic() - entry.updated_at
+            if age > self.ttl + self.max_stale:
+                return None, True
+            return entry.value, age > self.refresh_after
+
+    def etag(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry.etag if entry is not None else None
+
+    def generation(self, engine_name):
+        with self.lock:
+            return self.generations.get(engine_name, 0)
+
+    def store(self, key, value, etag, generation):
+        """
+        Caches `value` unless the engine was invalidated since `generation`
+        was read, in which case the value may predate the update.
+        """
+        with self.lock:
+            if self.generations.get(key[0], 0) == generation:
+                self.entries[key] = CacheEntry(value, etag, monotonic())
+
+    def revalidated(self, key):
+        """
+        Marks the cached value as fresh after the server answered
+        `304 Not Modified`, and returns it.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry.updated_at = monotonic()
+            return entry.value
+
+    def invalidate(self, engine_name):
+        with self.lock:
+            self.generations[engine_name] = self.generations.get(engine_name, 0) + 1
+            for key in [key for key in self.entries if key[0] == engine_name]:
+                del self.entries[key]
+
+    def claim_refresh(self, key):
+        """
+        :return: True when the caller should refresh `key`, False when a
+        refresh is already running.
+        """
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def release_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def refresh_in_background(self, key, refresh):
+        """
+        Runs `refresh()` on a background thread unless `key` is already being
+        refreshed. Errors are swallowed: the cached value keeps being served
+        and the next read tries again.
+        """
+        if not self.claim_refresh(key):
+            return
+
+        def run():
+            try:
+                refresh()
+            except Exception:
+                pass
+            finally:
+                self.release_refresh(key)
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.executor.submit(run)
+
+    def close(self):
+        """Stops the background refresh threads."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
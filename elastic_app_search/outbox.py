@@ -0,0 +1,382 @@
+"""Durable local queue of document writes, drained in the background."""
+import atexit
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import requests
+
+from .bulk import MAX_DOCUMENTS_PER_REQUEST
+from .compat import monotonic
+from .counters import CounterMixin
+from .document_buffer import HTTP_METHODS, INDEX, UPDATE, PendingWrites
+from .exceptions import CircuitOpen, ElasticAppSearchError, Forbidden, InvalidCredentials
+from .export import read_checkpoint, write_checkpoint
+
+SEGMENT_NAME = re.compile(r'^segment-(\d+)\.log$')
+
+
+def rejected(error):
+    """
+    Tells whether the server refused a request for good, e.g. with a `413`
+    for a batch over the payload limit, so that sending it again cannot
+    succeed. Throttled requests, server errors and authentication errors,
+    e.g. of an API key being rotated, are retried.
+    """
+    if isinstance(error, (CircuitOpen, InvalidCredentials, Forbidden)):
+        return False
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is not None and response.status_code < 500 and response.status_code != 429
+    return True
+
+
+def segment_name(number):
+    return 'segment-{:010d}.log'.format(number)
+
+
+class DocumentOutbox(CounterMixin):
+    """
+    Durable outbox for document writes. Documents are appended to a local
+    log and sent to App Search by a background thread, so that producers do
+    not wait for, or fail with, the server.
+
+    The log is a directory of append-only segment files of newline delimited
+    JSON records. The position of the sender is recorded in a cursor file
+    once a batch is delivered, and segments are deleted once fully sent, so
+    that writes survive restarts and are delivered at least once.
+
+    Records read together, up to `batch_size`, are coalesced by engine and
+    document id before being sent, see :class:`PendingWrites`. Documents
+    returned with `errors` are appended to the log again, up to date with
+    later writes of the same document, and retried up to `max_attempts`
+    times, after which they are written with their errors to the
+    `failed.ndjson` file of the directory, as are documents of a request
+    rejected by the server. When the server cannot be reached the batch is
+    retried every `retry_interval` seconds.
+
+    Only one outbox may use a directory at a time.
+
+    :param client: :class:`~elastic_app_search.Client` sending the documents.
+    :param directory: Directory holding the log.
+    :param segment_bytes: Size after which a new segment file is started.
+    :param batch_size: Maximum number of records read per batch.
+    :param flush_interval: Maximum time in seconds a record waits to be sent.
+    :param max_attempts: Number of times a document is sent before failing.
+    :param retry_interval: Seconds between attempts to reach the server.
+    :param fsync: Whether appends are synced to disk before returning.
+    """
+
+    def __init__(self, client, directory, segment_bytes=64 * 1024 * 1024,
+                 batch_size=MAX_DOCUMENTS_PER_REQUEST, flush_interval=1.0,
+                 max_attempts=5, retry_interval=5, fsync=True):
+        self.client = client
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.fsync = fsync
+        self.cursor_path = os.path.join(directory, 'cursor.json')
+        self.failed_path = os.path.join(directory, 'failed.ndjson')
+        self.condition = threading.Condition()
+        self.closed = False
+        self.counters = {'appended': 0, 'sent': 0, 'coalesced': 0, 'retried': 0, 'failed': 0}
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        segments = self.segments()
+        cursor = read_checkpoint(self.cursor_path)
+        if cursor is None or cursor['segment'] not in segments:
+            cursor = {'segment': segments[0] if segments else 1, 'offset': 0}
+        self.cursor = cursor
+        # Never append to a segment of a previous process, which may end with
+        # a partially written record.
+        self.write_segment = max(segments + [cursor['segment'] - 1]) + 1
+        self.write_file = None
+        self.write_offset = 0
+
+        self.thread = threading.Thread(target=self.run, name='app-search-outbox')
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def segments(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def segment_path(self, number):
+        return os.path.join(self.directory, segment_name(number))
+
+    def index_documents(self, engine_name, documents):
+        """
+        Queues documents to be created or updated.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Hashes representing documents.
+        """
+        self.append([(INDEX, engine_name, document, 0) for document in documents])
+
+    def update_documents(self, engine_name, documents):
+        """
+        Queues partial updates of documents.
+
+        :param engine_name: Name of engine to index documents into.
+        :param documents: Hashes representing documents, including their `id`.
+        """
+        for document in documents:
+            if document.get('id') is None:
+                raise ValueError('documents to update must have an id')
+        self.append([(UPDATE, engine_name, document, 0) for document in documents])
+
+    def append(self, records, retry=False):
+        data = b''.join(
+            json.dumps({'operation': operation, 'engine_name': engine_name,
+                        'document': document, 'attempts': attempts}).encode('utf-8') + b'\n'
+            for operation, engine_name, document, attempts in records)
+        with self.condition:
+            if self.closed and not retry:
+                raise ValueError('outbox is closed')
+            if self.write_file is None:
+                self.write_file = io.open(self.segment_path(self.write_segment), 'ab')
+                self.write_offset = self.write_file.tell()
+            self.write_file.write(data)
+            self.write_file.flush()
+            if self.fsync:
+                os.fsync(self.write_file.fileno())
+            self.write_offset += len(data)
+            if self.write_offset >= self.segment_bytes:
+                self.write_file.close()
+                self.write_file = None
+                self.write_segment += 1
+                self.write_offset = 0
+            if not retry:
+                self.counters['appended'] += len(records)
+            self.condition.notify_all()
+
+    def drained(self):
+        cursor = self.cursor
+        if cursor['segment'] < self.write_segment:
+            return False
+        return cursor['segment'] > self.write_segment or cursor['offset'] >= self.write_offset
+
+    def stats(self):
+        """
+        :return: Dict with the number of documents `appended`, `sent`,
+        `coalesced` into another write, `retried` and `failed`.
+        """
+        with self.condition:
+            return dict(self.counters)
+
+    def flush(self, timeout=None):
+        """
+        Waits until every appended document is sent.
+
+        :return: True when the log was drained within `timeout` seconds.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        with self.condition:
+            self.condition.notify_all()
+            while not self.drained():
+                remaining = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def close(self, timeout=None):
+        """
+        Stops accepting documents and sends what the server accepts within
+        `timeout` seconds. Documents left in the log are sent by the next
+        outbox opened on the directory.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        with self.condition:
+            if self.write_file is not None:
+                self.write_file.close()
+                self.write_file = None
+
+    def read_batch(self):
+        """
+        Reads up to `batch_size` complete records at the cursor.
+
+        :return: Tuple of the records and the offset following them.
+        """
+        segment, offset = self.cursor['segment'], self.cursor['offset']
+        path = self.segment_path(segment)
+        records = []
+        if not os.path.exists(path):
+            return records, offset
+        with io.open(path, 'rb') as f:
+            f.seek(offset)
+            while len(records) < self.batch_size:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    if segment < self.write_segment:
+                        # Record cut short by a crash, never acknowledged to a producer.
+                        offset += len(line)
+                    break
+                offset += len(line)
+                records.append(json.loads(line.decode('utf-8')))
+        return records, offset
+
+    def advance(self, offset):
+        with self.condition:
+            self.cursor = {'segment': self.cursor['segment'], 'offset': offset}
+            if self.cursor['segment'] < self.write_segment:
+                path = self.segment_path(self.cursor['segment'])
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                if offset >= size:
+                    self.cursor = {'segment': self.cursor['segment'] + 1, 'offset': 0}
+                    write_checkpoint(self.cursor_path, self.cursor)
+                    if os.path.exists(path):
+                        os.remove(path)
+                    self.condition.notify_all()
+                    return
+            write_checkpoint(self.cursor_path, self.cursor)
+            self.condition.notify_all()
+
+    def wait(self, timeout):
+        with self.condition:
+            if not self.closed:
+                self.condition.wait(timeout)
+
+    def run(self):
+        while True:
+            with self.condition:
+                if self.drained():
+                    if self.closed:
+                        return
+                    self.condition.wait(self.flush_interval)
+                    continue
+                closed = self.closed
+            records, offset = self.read_batch()
+            try:
+                if records:
+                    self.deliver(records, offset)
+            except Exception:
+                if closed:
+                    return
+                self.wait(self.retry_interval)
+                continue
+            self.advance(offset)
+            if not records and not self.drained():
+                # A segment still being written: wait for complete records.
+                self.wait(self.flush_interval)
+
+    def deliver(self, records, offset):
+        pending = OrderedDict()
+        for record in records:
+            writes = pending.setdefault(record['engine_name'], PendingWrites())
+            writes.add(record['operation'], record['document'], record['attempts'])
+
+        retries = []
+        for engine_name, writes in pending.items():
+            self.count('coalesced', writes.added - len(writes))
+            for operation, entries in writes.batches():
+                retries.extend(self.send(engine_name, operation, entries))
+        if retries:
+            self.append_retries(retries, offset)
+
+    def send(self, engine_name, operation, entries):
+        """
+        :return: Records to retry.
+        """
+        endpoint = "engines/{}/documents".format(engine_name)
+        documents = [document for document, _ in entries]
+        try:
+            statuses = self.client._write_request(
+                engine_name, HTTP_METHODS[operation], endpoint,
+                data=self.client.session.serializer.dumps(documents))
+        except (ElasticAppSearchError, requests.exceptions.HTTPError) as error:
+            if not rejected(error):
+                raise
+            self.fail([(operation, engine_name, document, [str(error)])
+                       for document in documents])
+            return []
+
+        retries = []
+        failed = []
+        for (document, attempts), status in zip(entries, statuses):
+            if not status.get('errors'):
+                continue
+            if attempts + 1 < self.max_attempts:
+                retries.append((operation, engine_name, document, attempts + 1))
+            else:
+                failed.append((operation, engine_name, document, status['errors']))
+        self.count('sent', len(documents) - len(retries) - len(failed))
+        if failed:
+            self.fail(failed)
+        return retries
+
+    def append_retries(self, records, offset):
+        with self.condition:
+            retries = self.supersede(records, offset)
+            if retries:
+                self.append(retries, retry=True)
+        self.count('coalesced', len(records) - len(retries))
+        self.count('retried', len(retries))
+
+    def supersede(self, records, offset):
+        """
+        Brings records to retry up to date with the writes appended to the
+        log after their batch, which ends at `offset` of the cursor segment,
+        since retries are appended after those writes. A retry is dropped
+        when a later index operation replaces its document, and later
+        updates of its document are merged into it.
+
+        :return: Records to retry.
+        """
+        records = list(records)
+        positions = {}
+        for position, (_, engine_name, document, _) in enumerate(records):
+            if document.get('id') is not None:
+                positions[(engine_name, document['id'])] = position
+
+        for record in self.read_records(self.cursor['segment'], offset):
+            position = positions.get((record['engine_name'], record['document'].get('id')))
+            if position is None or records[position] is None:
+                continue
+            if record['operation'] == INDEX:
+                records[position] = None
+            else:
+                operation, engine_name, document, attempts = records[position]
+                merged = dict(document)
+                merged.update(record['document'])
+                records[position] = (operation, engine_name, merged, attempts)
+        return [record for record in records if record is not None]
+
+    def read_records(self, segment, offset):
+        """
+        :return: Generator of the complete records from `offset` of `segment`
+        to the end of the log.
+        """
+        for number in range(segment, self.write_segment + 1):
+            path = self.segment_path(number)
+            if not os.path.exists(path):
+                continue
+            with io.open(path, 'rb') as f:
+                f.seek(offset if number == segment else 0)
+                for line in f:
+                    if line.endswith(b'\n'):
+                        yield json.loads(line.decode('utf-8'))
+
+    def fail(self, records):
+        with io.open(self.failed_path, 'ab') as f:
+            for operation, engine_name, document, errors in records:
+                f.write(json.dumps({'operation': operation, 'engine_name': engine_name,
+                                    'document': document, 'errors': errors}).encode('utf-8'))
+                f.write(b'\n')
+        self.count('failed', len(records))
@@ -0,0 +1,71 @@
+"""Lazy iteration over paginated list endpoints."""
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_PAGE_SIZE = 100
+
+
+def is_last_page(response, size):
+    results = response.get('results') or []
+    page = response.get('meta', {}).get('page', {})
+    total_pages = page.get('total_pages')
+    if total_pages is not None:
+        return page.get('current', 0) >= total_pages
+    return len(results) < size
+
+
+class PageIterator:
+    """
+    Iterates over the results of a paginated endpoint one item at a time,
+    holding a single page in memory.
+
+    While a page is consumed the next one is fetched on a background thread.
+    `current` is the page the last yielded item belongs to, so an iteration
+    that failed can be resumed by passing it as the starting page of a new
+    iterator; items of that page are then yielded again.
+
+    :param fetch_page: Callable taking `current` and `size` and returning a
+    list response with `meta` and `results`.
+    :param current: Page to start from.
+    :param size: Number of items per page.
+    :param prefetch: Fetch the next page while the current one is consumed.
+    """
+
+    def __init__(self, fetch_page, current=1, size=MAX_PAGE_SIZE, prefetch=True):
+        self.fetch_page = fetch_page
+        self.current = current
+        self.size = size
+        self.prefetch = prefetch
+
+    def __iter__(self):
+        if not self.prefetch:
+            return self.iterate_serially()
+        return self.iterate_prefetching()
+
+    def iterate_serially(self):
+        current = self.current
+        while True:
+            response = self.fetch_page(current, self.size)
+            self.current = current
+            for result in response.get('results') or []:
+                yield result
+            if is_last_page(response, self.size):
+                return
+            current += 1
+
+    def iterate_prefetching(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self.fetch_page, self.current, self.size)
+            current = self.current
+            try:
+                while pending is not None:
+                    response = pending.result()
+                    self.current = current
+                    pending = None
+                    if not is_last_page(response, self.size):
+                        current += 1
+                        pending = executor.submit(self.fetch_page, current, self.size)
+                    for result in response.get('results') or []:
+                        yield result
+            finally:
+                if pending is not None:
+                    pending.cancel()
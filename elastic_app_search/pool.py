@@ -0,0 +1,141 @@
+"""Connection pool configuration and statistics for RequestSession."""
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.poolmanager import PoolManager
+
+from .compat import perf_counter
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class PoolStats:
+    """
+    Thread-safe counters describing how pooled connections are used.
+
+    `created` counts new connections, `reused` counts requests served by an
+    already open connection, `waited` counts requests that had to wait for a
+    free connection because the pool was blocking and exhausted, and
+    `discarded` counts connections closed because the pool was full.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.created = 0
+        self.checkouts = 0
+        self.waited = 0
+        self.discarded = 0
+
+    def increment(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'created': self.created,
+                'reused': max(self.checkouts - self.created, 0),
+                'waited': self.waited,
+                'discarded': self.discarded
+            }
+
+
+# Time spent opening a connection (name resolution, TCP and TLS handshakes)
+# by the last request of the current thread, None when a pooled connection
+# was reused.
+connection_timings = threading.local()
+
+
+class TimedConnectionMixin(object):
+
+    def connect(self):
+        started_at = perf_counter()
+        super(TimedConnectionMixin, self).connect()
+        connection_timings.connect = perf_counter() - started_at
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class StatsConnectionPoolMixin(object):
+
+    stats = None
+
+    def _new_conn(self):
+        self.stats.increment('created')
+        return super(StatsConnectionPoolMixin, self)._new_conn()
+
+    def _get_conn(self, timeout=None):
+        if self.block and self.pool is not None and self.pool.empty():
+            self.stats.increment('waited')
+        self.stats.increment('checkouts')
+        return super(StatsConnectionPoolMixin, self)._get_conn(timeout)
+
+    def _put_conn(self, conn):
+        if self.pool is not None and self.pool.full():
+            self.stats.increment('discarded')
+        return super(StatsConnectionPoolMixin, self)._put_conn(conn)
+
+
+class StatsHTTPConnectionPool(StatsConnectionPoolMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class StatsHTTPSConnectionPool(StatsConnectionPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class StatsPoolManager(PoolManager):
+
+    def __init__(self, stats, *args, **kwargs):
+        super(StatsPoolManager, self).__init__(*args, **kwargs)
+        self.stats = stats
+        self.pool_classes_by_scheme = {
+            'http': StatsHTTPConnectionPool,
+            'https': StatsHTTPSConnectionPool
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super(StatsPoolManager, self)._new_pool(scheme, host, port, request_context)
+        pool.stats = self.stats
+        return pool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that records :class:`PoolStats` and passes `socket_options`
+    (e.g. TCP keep-alive settings) to every connection it opens, in addition
+    to the urllib3 defaults which disable Nagle's algorithm.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['socket_options']
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False,
+                 socket_options=None, **kwargs):
+        self.stats = PoolStats()
+        self.socket_options = socket_options
+        super(PooledHTTPAdapter, self).__init__(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+            pool_block=pool_block, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        if getattr(self, 'stats', None) is None:
+            self.stats = PoolStats()
+        if self.socket_options is not None:
+            pool_kwargs['socket_options'] = (
+                HTTPConnection.default_socket_options + list(self.socket_options))
+        self.poolmanager = StatsPoolManager(
+            self.stats, num_pools=connections, maxsize=maxsize, block=block,
+            **pool_kwargs)
@@ -0,0 +1,153 @@
+"""Client-side rate limiting of requests sent by RequestSession."""
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SEARCH = 'search'
+DOCUMENTS = 'documents'
+ANALYTICS = 'analytics'
+DEFAULT = 'default'
+
+ENDPOINT_CLASSES = {
+    'search': SEARCH,
+    'multi_search': SEARCH,
+    'query_suggestion': SEARCH,
+    'documents': DOCUMENTS,
+    'click': ANALYTICS,
+    'logs': ANALYTICS,
+    'analytics': ANALYTICS,
+}
+
+
+def endpoint_class(endpoint):
+    """
+    Classifies an endpoint such as `engines/{name}/search` as one of `search`,
+    `documents`, `analytics` or `default`.
+    """
+    parts = endpoint.split('/')
+    if len(parts) >= 3 and parts[0] == 'engines':
+        return ENDPOINT_CLASSES.get(parts[2], DEFAULT)
+    return DEFAULT
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket allowing `rate` requests per second with bursts
+    of up to `capacity` requests.
+
+    Callers reserve tokens ahead of time: when the bucket is empty the balance
+    goes negative and the caller is told how long to wait, so concurrent
+    callers are spaced out instead of all waking up at once.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.lock = threading.Lock()
+        self.tokens = self.capacity
+        self.updated_at = time.time()
+
+    def _take(self, tokens, updated_at, count, now):
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate) - count
+        delay = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, delay
+
+    def reserve(self, count=1):
+        """
+        Takes `count` tokens from the bucket.
+
+        :return: Number of seconds the caller has to wait before sending.
+        """
+        with self.lock:
+            now = time.time()
+            self.tokens, delay = self._take(self.tokens, self.updated_at, count, now)
+            self.updated_at = now
+            return delay
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a small file locked with `flock`, so
+    that every process on the host opening the same `path` shares one quota.
+    Only available on POSIX systems.
+    """
+
+    STATE = struct.Struct('dd')
+
+    def __init__(self, path, rate, capacity=None):
+        if fcntl is None:
+            raise RuntimeError('FileTokenBucket requires fcntl')
+        super(FileTokenBucket, self).__init__(rate, capacity)
+        self.path = path
+        self.fd = None
+        self.pid = None
+
+    def _file(self):
+        # flock locks are shared between a parent and its forked children
+        # through the inherited descriptor, so every process opens its own.
+        if self.fd is None or self.pid != os.getpid():
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self.pid = os.getpid()
+        return self.fd
+
+    def reserve(self, count=1):
+        with self.lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                # The descriptor is private to this process and used under
+                # self.lock, so seeking does not race (pread needs Python 3.3).
+                os.lseek(fd, 0, os.SEEK_SET)
+                data = os.read(fd, self.STATE.size)
+                if len(data) == self.STATE.size:
+                    tokens, updated_at = self.STATE.unpack(data)
+                else:
+                    tokens, updated_at = self.capacity, now
+                tokens, delay = self._take(tokens, updated_at, count, now)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, self.STATE.pack(tokens, now))
+                return delay
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """
+    Applies a token bucket per endpoint class. Endpoint classes without a
+    bucket are not limited.
+
+    :param search: Bucket for search, multi search and query suggestions.
+    :param documents: Bucket for the documents endpoints.
+    :param analytics: Bucket for clicks and API logs.
+    :param default: Bucket for every other endpoint.
+    """
+
+    def __init__(self, search=None, documents=None, analytics=None, default=None):
+        self.buckets = {
+            SEARCH: search,
+            DOCUMENTS: documents,
+            ANALYTICS: analytics,
+            DEFAULT: default
+        }
+
+    def reserve(self, endpoint):
+        """
+        :return: Number of seconds to wait before sending a request to
+        `endpoint`.
+        """
+        bucket = self.buckets[endpoint_class(endpoint)]
+        if bucket is None:
+            return 0.0
+        return bucket.reserve()
+
+    def acquire(self, endpoint):
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
@@ -1,43 +1,351 @@
+import time
+import zlib
 import requests
+from urllib3.exceptions import NewConnectionError
 import elastic_app_search
+from .compat import monotonic
+from .serializer import default_serializer
+from .instrumentation import RequestMetrics
+from .singleflight import SingleFlight
+from .endpoints import EndpointPool, can_fail_over, http_health_check
+from .streaming import ResultStream
+from .pool import connection_timings, PooledHTTPAdapter, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
 from .exceptions import InvalidCredentials, NonExistentRecord, RecordAlreadyExists, BadRequest, Forbidden
 
 
+def default_headers(api_key):
+    return {
+        'Authorization': "Bearer {}".format(api_key),
+        'X-Swiftype-Client': 'elastic-app-search-python',
+        'X-Swiftype-Client-Version': elastic_app_search.__version__,
+        'content-type': 'application/json; charset=utf8',
+        'Accept-Encoding': 'gzip, deflate'
+    }
+
+
+def compress_body(data, level=6):
+    """
+    :return: `data` compressed in the gzip format.
+    """
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def should_compress(data, threshold):
+    return threshold is not None and data is not None and len(data) >= threshold
+
+
+def with_header(kwargs, name, value):
+    headers = dict(kwargs.get('headers') or {})
+    headers[name] = value
+    kwargs['headers'] = headers
+    return kwargs
+
+
+def error_for_status(status_code, reason, text):
+    """
+    Maps an App Search error response to an exception. Returns None when the
+    status code has no specific mapping.
+    """
+    if status_code == requests.codes.unauthorized:
+        return InvalidCredentials(reason)
+    elif status_code == requests.codes.bad:
+        return BadRequest(text)
+    elif status_code == requests.codes.conflict:
+        return RecordAlreadyExists()
+    elif status_code == requests.codes.not_found:
+        return NonExistentRecord()
+    elif status_code == requests.codes.forbidden:
+        return Forbidden()
+
+
+def request_was_sent(error):
+    """Tells whether a request failing with `error` may have reached the server."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return not isinstance(reason, NewConnectionError)
+
+
+def single_flight_allowed(http_method, kwargs):
+    """
+    Only GET requests whose only arguments are their body are deduplicated.
+    """
+    return http_method.lower() == 'get' and set(kwargs) <= {'data', 'json'}
+
+
+def make_endpoint_pool(endpoint_pool):
+    """
+    :param endpoint_pool: An :class:`~elastic_app_search.endpoints.EndpointPool`,
+    a list of base URLs or None.
+    """
+    if endpoint_pool is None or isinstance(endpoint_pool, EndpointPool):
+        return endpoint_pool
+    return EndpointPool(list(endpoint_pool))
+
+
 class RequestSession:
 
-    def __init__(self, api_key, base_url):
+    def __init__(self, api_key, base_url,
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False,
+                 keep_alive=True,
+                 socket_options=None,
+                 retry_policy=None,
+                 rate_limiter=None,
+                 serializer=None,
+                 compress_threshold=None,
+                 compression_level=6,
+                 hooks=None,
+                 single_flight=False,
+                 endpoint_pool=None,
+                 circuit_breaker=None):
+        """
+        :param api_key: API key sent as a bearer token.
+        :param base_url: URL prefix of every endpoint.
+        :param pool_connections: Number of per-host connection pools to cache.
+        :param pool_maxsize: Maximum number of connections kept open per host.
+        Should be at least the number of threads sharing the session.
+        :param pool_block: When True, requests wait for a free connection
+        instead of opening one that is discarded afterwards.
+        :param keep_alive: When False, connections are closed after every
+        request.
+        :param socket_options: List of (level, option, value) tuples applied
+        to every new socket in addition to `TCP_NODELAY`, e.g. to enable TCP
+        keep-alive probes.
+        :param retry_policy: Optional
+        :class:`~elastic_app_search.retry.RetryPolicy` applied to throttled
+        and failed requests. Requests are not retried by default.
+        :param rate_limiter: Optional
+        :class:`~elastic_app_search.ratelimit.RateLimiter` that delays
+        requests to stay under a quota.
+        :param serializer: Serializer encoding request bodies and decoding
+        responses. Defaults to orjson when installed, see
+        :func:`~elastic_app_search.serializer.default_serializer`.
+        :param compress_threshold: Request bodies of at least this many bytes
+        are sent gzip compressed. Bodies are not compressed by default.
+        :param compression_level: zlib compression level, from 1 to 9.
+        :param hooks: Callables receiving the
+        :class:`~elastic_app_search.instrumentation.RequestMetrics` of every
+        request once it completes, e.g. a
+        :class:`~elastic_app_search.instrumentation.MetricsCollector`.
+        :param single_flight: When True, identical GET requests issued while
+        one is already in flight wait for it and share its decoded response,
+        which must then not be mutated.
+        :param endpoint_pool: Optional
+        :class:`~elastic_app_search.endpoints.EndpointPool`, or list of base
+        URLs, spreading requests over several nodes instead of `base_url`.
+        :param circuit_breaker: Optional
+        :class:`~elastic_app_search.circuit.CircuitBreaker` rejecting requests
+        to failing engines and endpoints.
+        """
         self.api_key = api_key
         self.base_url = base_url
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.serializer = serializer or default_serializer()
+        self.compress_threshold = compress_threshold
+        self.compression_level = compression_level
+        self.hooks = list(hooks or [])
+        self.single_flight = SingleFlight() if single_flight else None
+        self.circuit_breaker = circuit_breaker
         self.session = requests.Session()
+        self.session.headers.update(default_headers(api_key))
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        self.adapter = PooledHTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+            pool_block=pool_block, socket_options=socket_options)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self.endpoint_pool = make_endpoint_pool(endpoint_pool)
+        if self.endpoint_pool is not None:
+            self.endpoint_pool.start(http_health_check(dict(self.session.headers)))
 
-        headers = {
-            'Authorization': "Bearer {}".format(api_key),
-            'X-Swiftype-Client': 'elastic-app-search-python',
-            'X-Swiftype-Client-Version': elastic_app_search.__version__,
-            'content-type': 'application/json; charset=utf8'
-        }
-        self.session.headers.update(headers)
+    def pool_stats(self):
+        """
+        :return: Dict with the number of connections `created`, `reused`,
+        `waited` on and `discarded` since the session was created.
+        """
+        return self.adapter.stats.as_dict()
 
     def raise_if_error(self, response):
-        if response.status_code == requests.codes.unauthorized:
-            raise InvalidCredentials(response.reason)
-        elif response.status_code == requests.codes.bad:
-            raise BadRequest(response.text)
-        elif response.status_code == requests.codes.conflict:
-            raise RecordAlreadyExists()
-        elif response.status_code == requests.codes.not_found:
-            raise NonExistentRecord()
-        elif response.status_code == requests.codes.forbidden:
-            raise Forbidden()
+        if response.status_code >= 400:
+            error = error_for_status(response.status_code, response.reason, response.text)
+            if error is not None:
+                raise error
 
         response.raise_for_status()
 
     def request(self, http_method, endpoint, base_url=None, **kwargs):
-        return self.request_ignore_response(http_method, endpoint, base_url, **kwargs).json()
+        if self.single_flight is not None and single_flight_allowed(http_method, kwargs):
+            if kwargs.get('json') is not None:
+                kwargs['data'] = self.serializer.dumps(kwargs.pop('json'))
+            key = (base_url or self.base_url, endpoint, kwargs.get('data'))
+            return self.single_flight.do(
+                key, lambda: self.request_and_decode(http_method, endpoint, base_url, **kwargs))
+        return self.request_and_decode(http_method, endpoint, base_url, **kwargs)
 
-    def request_ignore_response(self, http_method, endpoint, base_url=None, **kwargs):
-        base_url = base_url or self.base_url
-        url = "{}/{}".format(base_url, endpoint)
+    def request_conditional(self, http_method, endpoint, etag=None, base_url=None, **kwargs):
+        """
+        Sends a request with `If-None-Match` when `etag` is given.
+
+        :return: Tuple of the decoded response, or None when the server
+        answered `304 Not Modified`, and the `ETag` of the response.
+        """
+        if etag is not None:
+            with_header(kwargs, 'If-None-Match', etag)
+        response = self.request_ignore_response(http_method, endpoint, base_url, **kwargs)
+        if response.status_code == requests.codes.not_modified:
+            return None, etag
+        return self.serializer.loads(response.content), response.headers.get('ETag')
+
+    def request_and_decode(self, http_method, endpoint, base_url=None, loads=None, **kwargs):
+        """
+        :param loads: Callable decoding the response instead of the serializer.
+        """
+        response = self.request_ignore_response(http_method, endpoint, base_url, **kwargs)
+        return (loads or self.serializer.loads)(response.content)
+
+    def request_stream(self, http_method, endpoint, base_url=None, chunk_size=64 * 1024,
+                       **kwargs):
+        """
+        Sends a request and decodes the `results` of its JSON object response
+        while it is downloaded, instead of buffering the whole body.
+
+        :param chunk_size: Number of bytes read at a time.
+        :return: :class:`~elastic_app_search.streaming.ResultStream`
+        """
+        response = self.request_ignore_response(
+            http_method, endpoint, base_url, stream=True, **kwargs)
+        return ResultStream(response.iter_content(chunk_size), response.close)
+
+    def send_once(self, http_method, endpoint, url, metrics=None, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(endpoint)
+        if metrics is None:
+            return self.session.request(http_method, url, **kwargs)
+
+        connection_timings.connect = None
         response = self.session.request(http_method, url, **kwargs)
-        self.raise_if_error(response)
+        metrics.add_timing('connect', connection_timings.connect)
+        metrics.ttfb = response.elapsed.total_seconds()
+        metrics.status_code = response.status_code
+        if not kwargs.get('stream'):
+            metrics.response_bytes = len(response.content)
         return response
+
+    def request_ignore_response(self, http_method, endpoint, base_url=None, **kwargs):
+        if kwargs.get('json') is not None:
+            kwargs['data'] = self.serializer.dumps(kwargs.pop('json'))
+        if should_compress(kwargs.get('data'), self.compress_threshold):
+            kwargs['data'] = compress_body(kwargs['data'], self.compression_level)
+            with_header(kwargs, 'Content-Encoding', 'gzip')
+        if not self.hooks:
+            return self.send_with_breaker(http_method, endpoint, base_url, **kwargs)
+
+        metrics = RequestMetrics(http_method, endpoint, len(kwargs.get('data') or b''))
+        try:
+            return self.send_with_breaker(http_method, endpoint, base_url, metrics=metrics, **kwargs)
+        except Exception as error:
+            metrics.error = error
+            raise
+        finally:
+            metrics.finish()
+            for hook in self.hooks:
+                hook(metrics)
+
+    def send_with_breaker(self, http_method, endpoint, base_url=None, metrics=None, **kwargs):
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self.send_to_endpoint(http_method, endpoint, base_url, metrics, **kwargs)
+
+        call = breaker.begin(endpoint)
+        try:
+            response = self.send_to_endpoint(http_method, endpoint, base_url, metrics, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            breaker.end(call, failed=True)
+            raise
+        except requests.exceptions.HTTPError as error:
+            breaker.end(call, error.response is None or error.response.status_code >= 500)
+            raise
+        except Exception:
+            breaker.end(call)
+            raise
+        except BaseException:
+            breaker.abandon(call)
+            raise
+        breaker.end(call)
+        return response
+
+    def send_to_endpoint(self, http_method, endpoint, base_url=None, metrics=None, **kwargs):
+        """
+        Sends a request to `base_url`, or to the nodes of the endpoint pool
+        until one answers without a network or server error.
+        """
+        pool = self.endpoint_pool
+        if base_url is not None or pool is None:
+            url = "{}/{}".format(base_url or self.base_url, endpoint)
+            return self.send_with_retries(http_method, endpoint, url, metrics, **kwargs)
+
+        tried = []
+        while True:
+            node = pool.acquire(tried)
+            url = "{}/{}".format(node.url, endpoint)
+            started_at = monotonic()
+            try:
+                response = self.send_with_retries(http_method, endpoint, url, metrics, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                pool.release(node, failed=True)
+                failure, request_sent = error, request_was_sent(error)
+            except requests.exceptions.HTTPError as error:
+                failed = error.response is not None and error.response.status_code >= 500
+                pool.release(node, monotonic() - started_at, failed)
+                if not failed:
+                    raise
+                failure, request_sent = error, True
+            except BaseException:
+                pool.release(node, monotonic() - started_at)
+                raise
+            else:
+                pool.release(node, monotonic() - started_at)
+                return response
+            tried.append(node)
+            if len(tried) >= len(pool) or not can_fail_over(http_method, request_sent):
+                raise failure
+
+    def send_with_retries(self, http_method, endpoint, url, metrics=None, **kwargs):
+        policy = self.retry_policy
+        if policy is None:
+            response = self.send_once(http_method, endpoint, url, metrics, **kwargs)
+            self.raise_if_error(response)
+            return response
+
+        policy.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = self.send_once(http_method, endpoint, url, metrics, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                delay = policy.get_delay(http_method, attempt,
+                                         request_sent=request_was_sent(error))
+                if delay is None:
+                    raise
+            else:
+                if response.status_code < 400:
+                    return response
+                delay = policy.get_delay(http_method, attempt, response.status_code,
+                                         response.headers.get('Retry-After'))
+                if delay is None:
+                    self.raise_if_error(response)
+                    return response
+                response.close()
+            attempt += 1
+            if metrics is not None:
+                metrics.retries = attempt
+            time.sleep(delay)
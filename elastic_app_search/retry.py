@@ -0,0 +1,131 @@
+"""Retry policies applied by RequestSession to throttled or failed requests."""
+import random
+import threading
+from email.utils import mktime_tz, parsedate_tz
+from time import time
+
+from .compat import monotonic
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+
+def parse_retry_after(value):
+    """
+    Parses a `Retry-After` header given either in seconds or as an HTTP date.
+
+    :return: Number of seconds to wait, or None when the value is invalid.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(mktime_tz(parsed) - time(), 0.0)
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of the requests sent by a client so that
+    retries cannot amplify an overload.
+
+    Every request deposits `ratio` tokens and every retry withdraws one. On top
+    of that, `min_per_second` tokens are refilled each second so that a client
+    with little traffic can still retry. At most `max_tokens` are kept.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(self.max_tokens, self.tokens + elapsed * self.min_per_second)
+
+    def deposit(self):
+        with self.lock:
+            self._refill(monotonic())
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            self._refill(monotonic())
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is retried.
+
+    Retries use exponential backoff with full jitter, or the delay requested
+    by the server through `Retry-After`. Requests that were rejected with a 429
+    or never reached the server are retried for any method, other failures
+    only for idempotent methods.
+
+    :param max_retries: Maximum number of retries per request.
+    :param backoff_factor: Base delay in seconds, doubled on every attempt.
+    :param max_backoff: Upper bound for a single delay in seconds, including
+    delays requested through `Retry-After`.
+    :param retry_statuses: Response status codes that are retried.
+    :param idempotent_methods: Methods retried on server and network errors.
+    :param budget: Optional :class:`RetryBudget` shared by all requests of a
+    client.
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 retry_statuses=RETRY_STATUSES,
+                 idempotent_methods=IDEMPOTENT_METHODS,
+                 budget=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(idempotent_methods)
+        self.budget = budget
+
+    def record_request(self):
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def get_delay(self, http_method, attempt, status_code=None, retry_after=None,
+                  request_sent=True):
+        """
+        :param http_method: Method of the failed request.
+        :param attempt: Number of retries already made for the request.
+        :param status_code: Status of the response, None on network errors.
+        :param retry_after: Value of the `Retry-After` response header.
+        :param request_sent: False when the request never reached the server.
+        :return: Seconds to wait before retrying, or None to give up.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if status_code is not None and status_code not in self.retry_statuses:
+            return None
+        safe = (
+            http_method.upper() in self.idempotent_methods
+            or status_code == 429
+            or not request_sent
+        )
+        if not safe:
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.backoff(attempt)
+        return min(delay, self.max_backoff)
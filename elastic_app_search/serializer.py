@@ -0,0 +1,70 @@
+"""JSON serializers used for request and response bodies."""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONSerializer(object):
+    """Serializer based on the standard library `json` module."""
+
+    def dumps(self, data):
+        """
+        :return: `data` encoded as compact UTF-8 JSON bytes.
+        """
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data):
+        """
+        :param data: JSON document as bytes or str.
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonSerializer(JSONSerializer):
+    """
+    Serializer based on `orjson`, which encodes straight to bytes and decodes
+    from bytes without building intermediate strings.
+
+    Values orjson does not handle natively (integers over 64 bits, subclasses
+    of builtin types, types the standard library rejects such as datetimes)
+    are delegated to :class:`JSONSerializer`, so both serializers accept and
+    reject the same values. The one difference is that NaN and infinity are
+    written as `null` rather than as the non-standard literals App Search
+    rejects, and integers over 64 bits in responses are decoded as floats,
+    matching the precision of App Search number fields.
+    """
+
+    def __init__(self):
+        self.options = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_SUBCLASS
+        )
+
+    def dumps(self, data):
+        try:
+            return orjson.dumps(data, option=self.options)
+        except TypeError:
+            return super(OrjsonSerializer, self).dumps(data)
+
+    def loads(self, data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super(OrjsonSerializer, self).loads(data)
+
+
+def default_serializer():
+    """
+    :return: :class:`OrjsonSerializer` when orjson is installed, otherwise
+    :class:`JSONSerializer`.
+    """
+    if orjson is not None:
+        return OrjsonSerializer()
+    return JSONSerializer()
@@ -0,0 +1,41 @@
+"""Deduplication of identical concurrent requests."""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Runs a function at most once at a time per key. Callers asking for a key
+    that is already in flight wait for that call and share its result or
+    exception instead of starting their own.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
@@ -0,0 +1,214 @@
+"""Incremental decoding of the results of streamed responses."""
+import codecs
+import json
+import re
+from collections import deque
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+
+# Parser states, named after what is expected next.
+OBJECT = 'object'
+KEY_OR_END = 'key_or_end'
+KEY = 'key'
+MEMBER_SEPARATOR = 'member_separator'
+ELEMENT_OR_END = 'element_or_end'
+ELEMENT = 'element'
+ELEMENT_SEPARATOR = 'element_separator'
+DONE = 'done'
+
+# Consumed text is dropped from the buffer once it exceeds this many characters.
+COMPACT_AFTER = 64 * 1024
+
+
+class IncompleteValue(Exception):
+    """Raised when the buffer ends before the value being decoded."""
+
+
+class ResultsParser:
+    """
+    Push parser for a JSON object response that decodes each element of its
+    `results` array as soon as it is complete, holding only the unparsed
+    text in memory. Other members of the object are decoded whole into
+    `members`.
+    """
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.position = 0
+        self.state = OBJECT
+        self.members = {}
+
+    def feed(self, data, final=False):
+        """
+        :param data: Next chunk of the response body.
+        :param final: Whether this is the last chunk.
+        :return: List of the results completed by the chunk.
+        """
+        self.text += self.decoder.decode(data, final)
+        results = []
+        while self.state != DONE:
+            try:
+                if not self.step(results, final):
+                    break
+            except IncompleteValue:
+                break
+        if self.position > COMPACT_AFTER:
+            self.text = self.text[self.position:]
+            self.position = 0
+        if final and self.state != DONE:
+            raise ValueError('response ended before the end of its JSON object')
+        return results
+
+    def close(self):
+        """
+        :return: List of the results completed by the end of the body.
+        """
+        return self.feed(b'', final=True)
+
+    def skip_whitespace(self, position):
+        return WHITESPACE.match(self.text, position).end()
+
+    def decode(self, position, final):
+        """
+        Decodes the value at `position`. Unless the body is complete, a value
+        must be followed by another character, since a number at the end of
+        the buffer may continue in the next chunk.
+        """
+        try:
+            value, end = DECODER.raw_decode(self.text, position)
+        except ValueError:
+            if final:
+                raise
+            raise IncompleteValue()
+        if not final and self.skip_whitespace(end) >= len(self.text):
+            raise IncompleteValue()
+        return value, end
+
+    def token(self, position, tokens):
+        if position >= len(self.text):
+            raise IncompleteValue()
+        token = self.text[position]
+        if token not in tokens:
+            raise ValueError('expected {!r} at {!r}'.format(tokens, self.text[position:position + 20]))
+        return token
+
+    def step(self, results, final):
+        """
+        Parses the next token or value.
+
+        :return: False when more data is needed.
+        """
+        position = self.skip_whitespace(self.position)
+        if position >= len(self.text):
+            return False
+        state = self.state
+
+        if state == OBJECT:
+            self.token(position, '{')
+            self.position, self.state = position + 1, KEY_OR_END
+        elif state in (KEY_OR_END, KEY):
+            if state == KEY_OR_END and self.text[position] == '}':
+                self.position, self.state = position + 1, DONE
+                return True
+            self.token(position, '"')
+            key, end = self.decode(position, final)
+            colon = self.skip_whitespace(end)
+            self.token(colon, ':')
+            start = self.skip_whitespace(colon + 1)
+            if start >= len(self.text):
+                raise IncompleteValue()
+            if key == 'results' and self.text[start] == '[':
+                self.position, self.state = start + 1, ELEMENT_OR_END
+            else:
+                self.members[key], self.position = self.decode(start, final)
+                self.state = MEMBER_SEPARATOR
+        elif state == MEMBER_SEPARATOR:
+            token = self.token(position, ',}')
+            self.position, self.state = position + 1, (KEY if token == ',' else DONE)
+        elif state in (ELEMENT_OR_END, ELEMENT):
+            if state == ELEMENT_OR_END and self.text[position] == ']':
+                self.position, self.state = position + 1, MEMBER_SEPARATOR
+                return True
+            result, self.position = self.decode(position, final)
+            results.append(result)
+            self.state = ELEMENT_SEPARATOR
+        elif state == ELEMENT_SEPARATOR:
+            token = self.token(position, ',]')
+            self.position = position + 1
+            self.state = ELEMENT if token == ',' else MEMBER_SEPARATOR
+        return True
+
+
+class ResultStream:
+    """
+    Iterator over the `results` of a streamed response, decoded while the
+    body is downloaded. Other members of the response, such as `meta`, are
+    available from :attr:`members` once read; :attr:`meta` reads ahead until
+    it is available. The connection is released once the stream is
+    exhausted or closed.
+
+    :param chunks: Iterable of response body chunks.
+    :param close: Optional callable releasing the response.
+    """
+
+    def __init__(self, chunks, close=None):
+        self.chunks = iter(chunks)
+        self.release = close
+        self.parser = ResultsParser()
+        self.pending = deque()
+        self.finished = False
+
+    @property
+    def members(self):
+        return self.parser.members
+
+    @property
+    def meta(self):
+        while 'meta' not in self.parser.members and self.read():
+            pass
+        return self.parser.members.get('meta')
+
+    def read(self):
+        """
+        Parses the next chunk.
+
+        :return: False once the body is exhausted.
+        """
+        if self.finished:
+            return False
+        try:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.pending.extend(self.parser.close())
+                self.close()
+                return False
+            self.pending.extend(self.parser.feed(chunk))
+            return True
+        except Exception:
+            self.close()
+            raise
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self.pending:
+            if not self.read():
+                raise StopIteration
+        return self.pending.popleft()
+
+    next = __next__  # Python 2
+
+    def close(self):
+        if not self.finished:
+            self.finished = True
+            if self.release is not None:
+                self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,194 @@
+"""Local validation of documents against an engine schema."""
+import math
+import re
+
+from .exceptions import InvalidDocument
+from .serializer import default_serializer
+
+MAX_DOCUMENT_BYTES = 100 * 1024
+MAX_FIELDS = 64
+MAX_FIELD_NAME_LENGTH = 64
+
+FIELD_NAME = re.compile(r'^[a-z0-9_]+$')
+RESERVED_FIELD_NAMES = frozenset([
+    'external_id', 'engine_id', 'highlight', 'or', 'and', 'not', 'any', 'all', 'none'
+])
+DATE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}'
+    r'([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?'
+    r'(Z|[+-]\d{2}(:?\d{2})?)?$'
+)
+
+try:
+    string_types = (str, unicode)  # noqa: F821
+except NameError:
+    string_types = (str,)
+
+
+def is_finite(value):
+    return not (math.isinf(value) or math.isnan(value))
+
+
+def is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return not isinstance(value, float) or is_finite(value)
+    if isinstance(value, string_types):
+        try:
+            return is_finite(float(value))
+        except ValueError:
+            return False
+    return False
+
+
+def is_date(value):
+    return isinstance(value, string_types) and DATE.match(value) is not None
+
+
+def is_geolocation(value):
+    if not isinstance(value, string_types):
+        return False
+    parts = value.split(',')
+    if len(parts) != 2:
+        return False
+    try:
+        latitude, longitude = float(parts[0]), float(parts[1])
+    except ValueError:
+        return False
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def is_text(value):
+    return True
+
+
+CHECKS = {
+    'text': is_text,
+    'number': is_number,
+    'date': is_date,
+    'geolocation': is_geolocation,
+}
+
+
+def field_name_error(name):
+    if name == 'id':
+        return None
+    if len(name) > MAX_FIELD_NAME_LENGTH:
+        return "Field name '{}' is longer than {} characters".format(name, MAX_FIELD_NAME_LENGTH)
+    if not FIELD_NAME.match(name):
+        return "Field name '{}' may only contain lowercase letters, numbers and underscores".format(name)
+    if name.startswith('_'):
+        return "Field name '{}' may not start with an underscore".format(name)
+    if name in RESERVED_FIELD_NAMES:
+        return "Field name '{}' is reserved".format(name)
+    return None
+
+
+class DocumentValidator:
+    """
+    Checks documents against the rules App Search applies when indexing them,
+    so that invalid documents can be rejected before they are sent.
+
+    The schema is compiled once into a check per field. Documents are checked
+    for field names, reserved names, nested objects, values that cannot be
+    coerced to the field type, the number of fields and their serialized
+    size. Fields absent from the schema are accepted, as App Search creates
+    them as text fields.
+
+    :param schema: Dict of field name to type, as returned by `get_schema`.
+    :param max_document_bytes: Maximum size of a serialized document.
+    :param max_fields: Maximum number of fields of the engine.
+    :param serializer: Serializer used to measure documents.
+    """
+
+    def __init__(self, schema, max_document_bytes=MAX_DOCUMENT_BYTES,
+                 max_fields=MAX_FIELDS, serializer=None):
+        self.checks = {
+            name: (field_type, CHECKS.get(field_type, is_text))
+            for name, field_type in schema.items()
+        }
+        self.max_document_bytes = max_document_bytes
+        self.max_fields = max_fields
+        self.serializer = serializer or default_serializer()
+
+    @classmethod
+    def from_client(cls, client, engine_name, **kwargs):
+        """
+        Builds a validator from the schema of an engine.
+        """
+        kwargs.setdefault('serializer', client.session.serializer)
+        return cls(client.get_schema(engine_name), **kwargs)
+
+    def value_errors(self, name, value):
+        if value is None:
+            return []
+        values = value if isinstance(value, list) else [value]
+        field_type, check = self.checks.get(name, ('text', is_text))
+        for item in values:
+            if isinstance(item, (dict, list)):
+                return ["Field '{}' contains a nested object or array".format(name)]
+            if item is not None and not check(item):
+                return ["Field '{}' with value {!r} is not a valid {}".format(
+                    name, item, field_type)]
+        return []
+
+    def errors(self, document):
+        """
+        :return: List of error messages, empty when the document is valid.
+        """
+        if not isinstance(document, dict):
+            return ['Document must be an object']
+
+        errors = []
+        new_fields = 0
+        for name, value in document.items():
+            name_error = field_name_error(name)
+            if name_error:
+                errors.append(name_error)
+                continue
+            if name not in self.checks and name != 'id':
+                new_fields += 1
+            errors.extend(self.value_errors(name, value))
+
+        if len(self.checks) + new_fields > self.max_fields:
+            errors.append('Document would exceed the maximum of {} fields'.format(self.max_fields))
+        if not errors and len(self.serializer.dumps(document)) > self.max_document_bytes:
+            errors.append('Document exceeds the maximum size of {} bytes'.format(
+                self.max_document_bytes))
+        return errors
+
+    def validate(self, document):
+        """
+        Raises :class:`~elastic_app_search.exceptions.InvalidDocument` when
+        the document is invalid.
+        """
+        errors = self.errors(document)
+        if errors:
+            raise InvalidDocument('; '.join(errors), document)
+
+    def partition(self, documents):
+        """
+        :return: Tuple of the valid documents and a dict mapping the position
+        of each invalid document to its document status.
+        """
+        valid = []
+        rejected = {}
+        for position, document in enumerate(documents):
+            errors = self.errors(document)
+            if errors:
+                document_id = document.get('id') if isinstance(document, dict) else None
+                rejected[position] = {'id': document_id, 'errors': errors}
+            else:
+                valid.append(document)
+        return valid, rejected
+
+
+def merge_statuses(count, rejected, statuses):
+    """
+    Interleaves the statuses of locally rejected documents with the statuses
+    returned by the server for the valid ones, restoring input order.
+    """
+    statuses = iter(statuses)
+    return [rejected[position] if position in rejected else next(statuses)
+            for position in range(count)]
@@ -35,14 +35,21 @@ setup(
         'Programming Language :: Python :: 3.6',
     ],
     keywords='elastic app search api',
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
+    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'benchmarks']),
     install_requires=[
         'requests',
-        'PyJWT<=1.7.1'
+        'PyJWT<=1.7.1',
+        'futures; python_version < "3"'
     ],
+    extras_require={
+        'async': ['aiohttp; python_version >= "3.6"'],
+        'orjson': ['orjson; python_version >= "3.6"']
+    },
     tests_require=[
         'requests_mock',
-        'future'
+        'future',
+        'aiohttp; python_version >= "3.6"'
     ],
-    test_suite='tests'
+    test_suite='tests',
+    test_loader='tests.loader:VersionScanningLoader'
 )
@@ -0,0 +1,4 @@
+import sys
+
+# The asyncio client requires Python 3.6+ and aiohttp.
+collect_ignore = ['test_async_client.py'] if sys.version_info < (3, 6) else []
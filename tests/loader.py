@@ -0,0 +1,15 @@
+"""Test loader of `python setup.py test` skipping modules the running Python cannot import."""
+import sys
+
+from setuptools.command.test import ScanningLoader
+
+# Modules using syntax or dependencies of Python 3.6+.
+ASYNC_TEST_MODULES = frozenset(['tests.test_async_client'])
+
+
+class VersionScanningLoader(ScanningLoader):
+
+    def loadTestsFromName(self, name, module=None):
+        if sys.version_info < (3, 6) and name in ASYNC_TEST_MODULES:
+            return self.suiteClass()
+        return ScanningLoader.loadTestsFromName(self, name, module)
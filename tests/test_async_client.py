@@ -0,0 +1,229 @@
+import asyncio
+import socket
+from unittest import TestCase
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from elastic_app_search.async_client import AsyncClient
+from elastic_app_search.exceptions import InvalidCredentials, InvalidDocument, NonExistentRecord
+
+
+class TestAsyncClient(TestCase):
+
+    engine_name = 'some-engine-name'
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.requests = []
+        self.routes = web.RouteTableDef()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_with_server(self, test, **options):
+        async def run():
+            app = web.Application()
+            app.add_routes(self.routes)
+            async with TestServer(app) as server:
+                client = AsyncClient(
+                    '', 'api_key', 'localhost:{}/api/as/v1'.format(server.port), False,
+                    **options)
+                async with client:
+                    return await test(client)
+
+        return self.loop.run_until_complete(run())
+
+    def test_search(self):
+        expected_return = {'meta': {}, 'results': []}
+
+        @self.routes.get('/api/as/v1/engines/{engine}/search')
+        async def search(request):
+            self.requests.append(await request.json())
+            self.assertEqual(request.headers['Authorization'], 'Bearer api_key')
+            return web.json_response(expected_return)
+
+        response = self.run_with_server(
+            lambda client: client.search(self.engine_name, 'query', {}))
+        self.assertEqual(response, expected_return)
+        self.assertEqual(self.requests, [{'query': 'query'}])
+
+    def test_index_document_processing_error(self):
+        @self.routes.post('/api/as/v1/engines/{engine}/documents')
+        async def index(request):
+            return web.json_response([{'id': 'something', 'errors': ['some processing error']}])
+
+        with self.assertRaises(InvalidDocument):
+            self.run_with_server(
+                lambda client: client.index_document(self.engine_name, {'id': 'something'}))
+
+    def test_bulk_index_documents(self):
+        documents = [{'id': str(i)} for i in range(250)]
+
+        @self.routes.post('/api/as/v1/engines/{engine}/documents')
+        async def index(request):
+            batch = await request.json()
+            self.requests.append(len(batch))
+            return web.json_response([{'id': doc['id'], 'errors': []} for doc in batch])
+
+        async def bulk_index(client):
+            return [status async for status in
+                    client.bulk_index_documents(self.engine_name, documents)]
+
+        response = self.run_with_server(bulk_index)
+        self.assertEqual(response, [{'id': str(i), 'errors': []} for i in range(250)])
+        self.assertEqual(sorted(self.requests), [50, 100, 100])
+
+    def test_bulk_index_documents_with_validation(self):
+        documents = [{'id': '1', 'price': 1}, {'id': '2', 'price': 'x'}, {'id': '3'}]
+
+        @self.routes.get('/api/as/v1/engines/{engine}/schema')
+        async def schema(request):
+            return web.json_response({'price': 'number'})
+
+        @self.routes.post('/api/as/v1/engines/{engine}/documents')
+        async def index(request):
+            batch = await request.json()
+            self.requests.append(batch)
+            return web.json_response([{'id': doc['id'], 'errors': []} for doc in batch])
+
+        async def bulk_index(client):
+            return [status async for status in client.bulk_index_documents(
+                self.engine_name, documents, validate=True)]
+
+        response = self.run_with_server(bulk_index)
+        self.assertEqual([status['id'] for status in response], ['1', '2', '3'])
+        self.assertTrue(response[1]['errors'])
+        self.assertEqual(self.requests, [[documents[0], documents[2]]])
+
+    def test_bulk_get_documents(self):
+        document_ids = [str(i) for i in range(150)] + ['missing']
+
+        @self.routes.get('/api/as/v1/engines/{engine}/documents')
+        async def get(request):
+            ids = await request.json()
+            self.requests.append(len(ids))
+            return web.json_response(
+                [None if document_id == 'missing' else {'id': document_id} for document_id in ids])
+
+        documents = self.run_with_server(
+            lambda client: client.bulk_get_documents(self.engine_name, document_ids))
+        self.assertEqual(documents, [{'id': str(i)} for i in range(150)] + [None])
+        self.assertEqual(sorted(self.requests), [51, 100])
+
+    def test_bulk_destroy_documents(self):
+        @self.routes.delete('/api/as/v1/engines/{engine}/documents')
+        async def destroy(request):
+            ids = await request.json()
+            return web.json_response(
+                [{'id': document_id, 'deleted': document_id != '7'} for document_id in ids])
+
+        summary = self.run_with_server(lambda client: client.bulk_destroy_documents(
+            self.engine_name, (str(i) for i in range(150)), max_workers=2))
+        self.assertEqual(summary['deleted'], 149)
+        self.assertEqual(summary['missing'], ['7'])
+
+    def test_error_mapping(self):
+        @self.routes.get('/api/as/v1/engines/{engine}')
+        async def get_engine(request):
+            status = 401 if request.match_info['engine'] == 'private' else 404
+            return web.json_response({'errors': []}, status=status)
+
+        with self.assertRaises(InvalidCredentials):
+            self.run_with_server(lambda client: client.get_engine('private'))
+        with self.assertRaises(NonExistentRecord):
+            self.run_with_server(lambda client: client.get_engine('missing'))
+
+    def test_iter_documents(self):
+        @self.routes.get('/api/as/v1/engines/{engine}/documents/list')
+        async def list_documents(request):
+            page = (await request.json())['page']
+            start = (page['current'] - 1) * page['size']
+            return web.json_response({
+                'meta': {'page': {'current': page['current'], 'total_pages': 3}},
+                'results': [{'id': str(i)} for i in range(start, start + page['size'])]
+            })
+
+        async def iterate(client):
+            return [document['id'] async for document in
+                    client.iter_documents(self.engine_name, size=2)]
+
+        self.assertEqual(self.run_with_server(iterate), [str(i) for i in range(6)])
+
+    def test_list_documents_stream(self):
+        @self.routes.get('/api/as/v1/engines/{engine}/documents/list')
+        async def list_documents(request):
+            if request.match_info['engine'] == 'missing':
+                return web.json_response({'errors': []}, status=404)
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await response.write(b'{"results": [')
+            for i in range(100):
+                await response.write('{}{{"id": "{}"}}'.format(',' if i else '', i).encode('utf-8'))
+            await response.write(b'], "meta": {"page": {"current": 1}}}')
+            return response
+
+        async def stream(client):
+            async with await client.list_documents(
+                    self.engine_name, size=100, stream=True) as documents:
+                ids = [document['id'] async for document in documents]
+                return ids, await documents.meta()
+
+        ids, meta = self.run_with_server(stream)
+        self.assertEqual(ids, [str(i) for i in range(100)])
+        self.assertEqual(meta, {'page': {'current': 1}})
+        with self.assertRaises(NonExistentRecord):
+            self.run_with_server(lambda client: client.list_documents('missing', stream=True))
+
+    def test_hooks(self):
+        collected = []
+
+        @self.routes.get('/api/as/v1/engines/{engine}/search')
+        async def search(request):
+            return web.json_response({'results': []})
+
+        self.run_with_server(
+            lambda client: client.search(self.engine_name, 'query'), hooks=[collected.append])
+        metrics, = collected
+        self.assertEqual(metrics.template, 'engines/{engine_name}/search')
+        self.assertEqual(metrics.status_code, 200)
+        self.assertGreater(metrics.connect, 0)
+        self.assertGreater(metrics.ttfb, 0)
+
+    def test_single_flight(self):
+        @self.routes.get('/api/as/v1/engines/{engine}/schema')
+        async def schema(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.1)
+            return web.json_response({'title': 'text'})
+
+        async def get_schemas(client):
+            return await asyncio.gather(*[client.get_schema(self.engine_name) for _ in range(5)])
+
+        results = self.run_with_server(get_schemas, single_flight=True)
+        self.assertEqual(results, [{'title': 'text'}] * 5)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_endpoint_pool_fails_over(self):
+        @self.routes.get('/api/as/v1/engines/{engine}/search')
+        async def search(request):
+            return web.json_response({'results': []})
+
+        unused = socket.socket()
+        unused.bind(('127.0.0.1', 0))
+        closed_url = 'http://127.0.0.1:{}/api/as/v1'.format(unused.getsockname()[1])
+        unused.close()
+
+        async def run():
+            app = web.Application()
+            app.add_routes(self.routes)
+            async with TestServer(app) as server:
+                urls = [closed_url, 'http://localhost:{}/api/as/v1'.format(server.port)]
+                async with AsyncClient(endpoint_pool=urls) as client:
+                    results = [await client.search(self.engine_name, 'query') for _ in range(3)]
+                    return results, client.session.endpoint_pool.stats()
+
+        results, stats = self.loop.run_until_complete(run())
+        self.assertEqual(results, [{'results': []}] * 3)
+        self.assertLessEqual(stats[0]['failures'], 1)
+        self.assertEqual(stats[1]['failures'], 0)
@@ -0,0 +1,122 @@
+from unittest import TestCase
+import requests_mock
+import json
+
+from elastic_app_search import Client
+from elastic_app_search.bulk import chunk_documents, ordered_map
+from elastic_app_search.cache import ResponseCache
+
+
+class TestBulk(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.client = Client('host_identifier', 'api_key')
+
+        self.document_index_url = "{}/{}".format(
+            self.client.session.base_url,
+            "engines/{}/documents".format(self.engine_name)
+        )
+
+    def test_chunk_documents_by_count(self):
+        documents = [{'id': str(i)} for i in range(250)]
+        chunks = list(chunk_documents(documents, max_documents=100))
+        self.assertEqual([len(docs) for docs, _ in chunks], [100, 100, 50])
+        for docs, body in chunks:
+            self.assertEqual(json.loads(body.decode('utf-8')), docs)
+
+    def test_chunk_documents_by_size(self):
+        documents = [{'id': str(i), 'body': 'x' * 100} for i in range(10)]
+        single = len(json.dumps(documents[0]))
+        chunks = list(chunk_documents(documents, max_bytes=3 * single + 4))
+        self.assertEqual([len(docs) for docs, _ in chunks], [3, 3, 3, 1])
+        for _, body in chunks:
+            self.assertLessEqual(len(body), 3 * single + 4)
+
+    def test_chunk_documents_oversized_document(self):
+        documents = [{'id': '1', 'body': 'x' * 100}, {'id': '2'}]
+        chunks = list(chunk_documents(documents, max_bytes=10))
+        self.assertEqual([docs for docs, _ in chunks], [[documents[0]], [documents[1]]])
+
+    def test_ordered_map_preserves_order(self):
+        results = list(ordered_map(lambda x: x * 2, iter(range(50)), max_workers=8))
+        self.assertEqual(results, [x * 2 for x in range(50)])
+
+    def test_ordered_map_raises(self):
+        def fail(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        with self.assertRaises(ValueError):
+            list(ordered_map(fail, range(10)))
+
+    def test_bulk_index_documents(self):
+        documents = ({'id': str(i)} for i in range(230))
+
+        def callback(request, context):
+            return [{'id': doc['id'], 'errors': []} for doc in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.document_index_url,
+                           json=callback, status_code=200)
+            response = list(self.client.bulk_index_documents(
+                self.engine_name, documents, max_workers=3))
+            self.assertEqual(m.call_count, 3)
+
+        self.assertEqual(
+            response, [{'id': str(i), 'errors': []} for i in range(230)])
+
+    def test_bulk_get_documents(self):
+        document_ids = [str(i) for i in range(250)] + ['missing', '3']
+
+        def callback(request, context):
+            return [None if document_id == 'missing' else {'id': document_id}
+                    for document_id in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.document_index_url, json=callback)
+            documents = self.client.bulk_get_documents(
+                self.engine_name, iter(document_ids), max_workers=3)
+            self.assertEqual(sorted(len(r.json()) for r in m.request_history), [51, 100, 100])
+
+        self.assertEqual(documents[:250], [{'id': str(i)} for i in range(250)])
+        self.assertEqual(documents[250:], [None, {'id': '3'}])
+
+    def test_bulk_get_documents_with_cache(self):
+        client = Client('host_identifier', 'api_key', document_cache=ResponseCache())
+
+        def callback(request, context):
+            return [{'id': document_id} for document_id in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.document_index_url, json=callback)
+            m.register_uri('POST', self.document_index_url, json=[])
+            client.bulk_get_documents(self.engine_name, ['1', '2'])
+            self.assertEqual(client.bulk_get_documents(self.engine_name, ['2', '3', '1']),
+                             [{'id': '2'}, {'id': '3'}, {'id': '1'}])
+            self.assertEqual(m.request_history[-1].json(), ['3'])
+
+            client.index_documents(self.engine_name, [{'id': '1'}])
+            client.bulk_get_documents(self.engine_name, ['1', '2'])
+            self.assertEqual(m.request_history[-1].json(), ['1', '2'])
+
+    def test_bulk_destroy_documents(self):
+        document_ids = (str(i) for i in range(250))
+        progress = []
+
+        def callback(request, context):
+            return [{'id': document_id, 'deleted': int(document_id) % 50 != 0}
+                    for document_id in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('DELETE', self.document_index_url, json=callback)
+            summary = self.client.bulk_destroy_documents(
+                self.engine_name, document_ids, max_workers=3, progress=progress.append)
+            self.assertEqual(m.call_count, 3)
+
+        self.assertEqual(summary['documents'], 250)
+        self.assertEqual(summary['deleted'], 245)
+        self.assertEqual(summary['missing'], ['0', '50', '100', '150', '200'])
+        self.assertEqual([p['documents'] for p in progress], [100, 200, 250])
+        self.assertGreater(summary['documents_per_second'], 0)
@@ -0,0 +1,71 @@
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.cache import ResponseCache, cache_key
+
+
+class TestCache(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.cache = ResponseCache(max_entries=2)
+        self.client = Client('host_identifier', 'api_key', cache=self.cache)
+        self.search_url = "{}/engines/{}/search".format(
+            self.client.session.base_url, self.engine_name)
+
+    def test_cache_key_is_canonical(self):
+        self.assertEqual(
+            cache_key('engine', 'search', {'query': 'cat', 'page': {'size': 1, 'current': 2}}),
+            cache_key('engine', 'search', {'page': {'current': 2, 'size': 1}, 'query': 'cat'}))
+
+    def test_lru_eviction(self):
+        self.cache.set(('engine', 'search', 'a'), 1)
+        self.cache.set(('engine', 'search', 'b'), 2)
+        self.cache.get(('engine', 'search', 'a'))
+        self.cache.set(('engine', 'search', 'c'), 3)
+        self.assertIsNone(self.cache.get(('engine', 'search', 'b')))
+        self.assertEqual(self.cache.get(('engine', 'search', 'a')), 1)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_engine_ttl(self):
+        cache = ResponseCache(ttl=60, engine_ttls={'live': 0})
+        cache.set(('live', 'search', 'a'), 1)
+        cache.set(('other', 'search', 'a'), 1)
+        self.assertIsNone(cache.get(('live', 'search', 'a')))
+        self.assertEqual(cache.get(('other', 'search', 'a')), 1)
+
+    def test_stale_generation_is_not_cached(self):
+        generation = self.cache.generation('engine')
+        self.cache.invalidate('engine')
+        self.cache.set(('engine', 'search', 'a'), 1, generation)
+        self.assertIsNone(self.cache.get(('engine', 'search', 'a')))
+
+    def test_search_is_cached(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.search_url, json={'results': []})
+            first = self.client.search(self.engine_name, 'cat', {'page': {'size': 5}})
+            second = self.client.search(self.engine_name, 'cat', {'page': {'size': 5}})
+            self.client.search(self.engine_name, 'dog')
+            self.assertEqual(m.call_count, 2)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_writes_invalidate_engine(self):
+        invalidated = []
+        self.cache.add_invalidation_hook(invalidated.append)
+        documents_url = "{}/engines/{}/documents".format(
+            self.client.session.base_url, self.engine_name)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.search_url, json={'results': []})
+            m.register_uri('POST', documents_url, json=[{'id': '1', 'errors': []}])
+            m.register_uri('DELETE', documents_url, json=[{'id': '1', 'deleted': True}])
+            self.client.search(self.engine_name, 'cat')
+            self.client.index_documents(self.engine_name, [{'id': '1'}])
+            self.client.search(self.engine_name, 'cat')
+            self.client.destroy_documents(self.engine_name, ['1'])
+            self.client.search(self.engine_name, 'cat')
+            self.assertEqual(m.call_count, 5)
+        self.assertEqual(invalidated, [self.engine_name, self.engine_name])
@@ -0,0 +1,116 @@
+import time
+from unittest import TestCase
+import requests
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.cache import ResponseCache
+from elastic_app_search.circuit import CircuitBreaker, circuit_key
+from elastic_app_search.exceptions import CircuitOpen, NonExistentRecord
+from elastic_app_search.request_session import RequestSession
+
+
+class TestCircuitBreaker(TestCase):
+
+    endpoint = 'engines/videos/search'
+
+    def call(self, breaker, failed=False, endpoint=None):
+        breaker.end(breaker.begin(endpoint or self.endpoint), failed)
+
+    def test_circuit_key(self):
+        self.assertEqual(circuit_key('engines/videos/synonyms/syn-1'),
+                         ('videos', 'engines/{engine_name}/synonyms/{synonym_set_id}'))
+        self.assertEqual(circuit_key('engines'), (None, 'engines'))
+
+    def test_opens_at_failure_rate(self):
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=4)
+        for failed in (False, True, False):
+            self.call(breaker, failed)
+        self.assertEqual(breaker.state(self.endpoint), 'closed')
+        self.call(breaker, failed=True)
+        self.assertEqual(breaker.state(self.endpoint), 'open')
+        with self.assertRaises(CircuitOpen) as context:
+            breaker.begin(self.endpoint)
+        self.assertEqual(context.exception.key, ('videos', 'engines/{engine_name}/search'))
+        # Other engines and endpoints have their own circuit.
+        self.call(breaker, endpoint='engines/books/search')
+        self.call(breaker, endpoint='engines/videos/documents')
+
+    def test_failures_leave_the_window(self):
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window=0.01)
+        self.call(breaker, failed=True)
+        time.sleep(0.02)
+        self.call(breaker)
+        self.call(breaker)
+        self.assertEqual(breaker.state(self.endpoint), 'closed')
+        stats = breaker.stats()[circuit_key(self.endpoint)]
+        self.assertEqual((stats['calls'], stats['failure_rate']), (2, 0.0))
+
+    def test_opens_at_slow_call_rate(self):
+        breaker = CircuitBreaker(slow_call_duration=0.01, slow_call_rate=0.5, min_calls=2)
+        self.call(breaker)
+        call = breaker.begin(self.endpoint)
+        time.sleep(0.02)
+        breaker.end(call)
+        self.assertEqual(breaker.state(self.endpoint), 'open')
+
+    def test_half_open_probes(self):
+        breaker = CircuitBreaker(min_calls=1, open_time=0.01, half_open_calls=1)
+        self.call(breaker, failed=True)
+        time.sleep(0.02)
+        probe = breaker.begin(self.endpoint)
+        self.assertEqual(breaker.state(self.endpoint), 'half_open')
+        with self.assertRaises(CircuitOpen):
+            breaker.begin(self.endpoint)
+        breaker.end(probe, failed=True)
+        self.assertEqual(breaker.state(self.endpoint), 'open')
+
+        time.sleep(0.02)
+        breaker.abandon(breaker.begin(self.endpoint))
+        self.call(breaker)
+        self.assertEqual(breaker.state(self.endpoint), 'closed')
+
+
+class TestRequestSessionCircuitBreaker(TestCase):
+
+    endpoint = 'engines/videos/search'
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(min_calls=2, open_time=60)
+        self.session = RequestSession('api_key', 'http://www.base_url.com',
+                                      circuit_breaker=self.breaker)
+        self.url = "{}/{}".format(self.session.base_url, self.endpoint)
+
+    def test_server_errors_open_the_circuit(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.url, status_code=503)
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    self.session.request('get', self.endpoint)
+            with self.assertRaises(CircuitOpen):
+                self.session.request('get', self.endpoint)
+            self.assertEqual(m.call_count, 2)
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.url, status_code=404)
+            for _ in range(3):
+                with self.assertRaises(NonExistentRecord):
+                    self.session.request('get', self.endpoint)
+        self.assertEqual(self.breaker.state(self.endpoint), 'closed')
+
+    def test_serves_stale_search_results_while_open(self):
+        cache = ResponseCache(ttl=0.01, stale_ttl=60)
+        client = Client('host_identifier', 'api_key', cache=cache,
+                        circuit_breaker=CircuitBreaker(min_calls=1, open_time=60))
+        url = "{}/{}".format(client.session.base_url, self.endpoint)
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', url, [{'json': {'results': [1]}}, {'status_code': 503}])
+            self.assertEqual(client.search('videos', 'cat'), {'results': [1]})
+            time.sleep(0.02)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.search('videos', 'cat')
+            self.assertEqual(client.search('videos', 'cat'), {'results': [1]})
+            with self.assertRaises(CircuitOpen):
+                client.search('videos', 'dog')
+        self.assertEqual(cache.stats()['stale_hits'], 1)
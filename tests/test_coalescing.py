@@ -0,0 +1,81 @@
+import threading
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.coalescing import SearchCoalescer
+from elastic_app_search.exceptions import BadRequest, ElasticAppSearchError
+
+
+class TestCoalescing(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.client = Client('host_identifier', 'api_key',
+                             search_coalescer=SearchCoalescer(window=1, max_size=4))
+        base_url = self.client.session.base_url
+        self.search_url = "{}/engines/{}/search".format(base_url, self.engine_name)
+        self.multi_search_url = "{}/engines/{}/multi_search".format(base_url, self.engine_name)
+
+    def search_concurrently(self, queries):
+        results = {}
+
+        def search(query):
+            try:
+                results[query] = self.client.search(self.engine_name, query)
+            except Exception as error:
+                results[query] = error
+
+        threads = [threading.Thread(target=search, args=(query,)) for query in queries]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def multi_search(self, request, context):
+        queries = request.json()['queries']
+        if any(query['query'] == 'invalid' for query in queries):
+            context.status_code = 400
+            return {'errors': ['invalid query']}
+        return [{'results': [{'query': query['query']}]} for query in queries]
+
+    def test_concurrent_searches_are_coalesced(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.multi_search_url, json=self.multi_search)
+            results = self.search_concurrently(['a', 'b', 'c', 'd'])
+            self.assertEqual(m.call_count, 1)
+
+        for query, result in results.items():
+            self.assertEqual(result, {'results': [{'query': query}]})
+
+    def test_single_search_is_sent_as_search(self):
+        self.client.search_coalescer.window = 0.01
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.search_url, json={'results': []})
+            self.assertEqual(self.client.search(self.engine_name, 'a'), {'results': []})
+            self.assertEqual(m.call_count, 1)
+
+    def test_missing_results_fail_their_callers(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.multi_search_url, json=[{'results': []}] * 3)
+            results = self.search_concurrently(['a', 'b', 'c', 'd'])
+
+        self.assertEqual(sum(isinstance(result, ElasticAppSearchError)
+                             for result in results.values()), 1)
+
+    def test_bad_request_only_fails_its_caller(self):
+        def search(request, context):
+            if request.json()['query'] == 'invalid':
+                context.status_code = 400
+                return {'errors': ['invalid query']}
+            return {'results': [{'query': request.json()['query']}]}
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.multi_search_url, json=self.multi_search)
+            m.register_uri('GET', self.search_url, json=search)
+            results = self.search_concurrently(['a', 'b', 'c', 'invalid'])
+
+        self.assertIsInstance(results.pop('invalid'), BadRequest)
+        for query, result in results.items():
+            self.assertEqual(result, {'results': [{'query': query}]})
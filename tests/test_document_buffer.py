@@ -0,0 +1,107 @@
+import threading
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.document_buffer import DocumentBuffer, PendingWrites, INDEX, UPDATE
+
+
+class TestPendingWrites(TestCase):
+
+    def test_coalesces_by_id(self):
+        writes = PendingWrites()
+        writes.add(INDEX, {'id': '1', 'title': 'first'})
+        writes.add(UPDATE, {'id': '1', 'body': 'patched'})
+        writes.add(UPDATE, {'id': '2', 'title': 'a'})
+        writes.add(UPDATE, {'id': '2', 'body': 'b'}, attempts=2)
+        writes.add(UPDATE, {'id': '3', 'title': 'dropped'})
+        writes.add(INDEX, {'id': '3', 'title': 'latest'})
+        writes.add(INDEX, {'title': 'no id'})
+        writes.add(INDEX, {'title': 'no id'})
+
+        self.assertEqual(len(writes), 6 - 1)
+        self.assertEqual(list(writes.batches()), [
+            (INDEX, [({'id': '1', 'title': 'first', 'body': 'patched'}, 0),
+                     ({'id': '3', 'title': 'latest'}, 0),
+                     ({'title': 'no id'}, 0),
+                     ({'title': 'no id'}, 0)]),
+            (UPDATE, [({'id': '2', 'title': 'a', 'body': 'b'}, 2)]),
+        ])
+
+    def test_batches_are_bounded(self):
+        writes = PendingWrites()
+        for i in range(250):
+            writes.add(INDEX, {'id': str(i)})
+        self.assertEqual([len(entries) for _, entries in writes.batches()], [100, 100, 50])
+
+
+class TestDocumentBuffer(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.client = Client('host_identifier', 'api_key')
+        self.documents_url = "{}/engines/{}/documents".format(
+            self.client.session.base_url, self.engine_name)
+
+    def respond(self, request, context):
+        return [{'id': doc['id'], 'errors': []} for doc in request.json()]
+
+    def test_flush_sends_latest_writes(self):
+        buffer = DocumentBuffer(self.client, max_age=60)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            m.register_uri('PATCH', self.documents_url, json=self.respond)
+            for i in range(20):
+                buffer.update_documents(self.engine_name, [{'id': 'hot', 'count': i}])
+            buffer.index_documents(self.engine_name, [{'id': 'other', 'title': 'a'}])
+            buffer.update_documents(self.engine_name, [{'id': 'other', 'body': 'b'}])
+            statuses = buffer.flush()
+            requests = [(r.method, r.json()) for r in m.request_history]
+            buffer.close()
+
+        self.assertEqual(requests, [
+            ('POST', [{'id': 'other', 'title': 'a', 'body': 'b'}]),
+            ('PATCH', [{'id': 'hot', 'count': 19}]),
+        ])
+        self.assertEqual([status['id'] for status in statuses], ['other', 'hot'])
+        self.assertEqual(buffer.stats(), {'added': 22, 'sent': 2, 'coalesced': 20})
+
+    def test_flushes_on_size(self):
+        flushed = []
+        buffer = DocumentBuffer(self.client, max_documents=3, max_age=60,
+                                on_flush=lambda *args: flushed.append(args))
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            buffer.index_documents(self.engine_name, [{'id': '1'}, {'id': '1'}, {'id': '2'}])
+            self.assertEqual(m.call_count, 0)
+            buffer.index_documents(self.engine_name, [{'id': '3'}])
+            self.assertEqual(m.call_count, 1)
+            buffer.close()
+
+        self.assertEqual(flushed, [(self.engine_name, INDEX, [
+            {'id': '1', 'errors': []}, {'id': '2', 'errors': []}, {'id': '3', 'errors': []}])])
+
+    def test_flushes_on_age(self):
+        flushed = threading.Event()
+        buffer = DocumentBuffer(self.client, max_age=0.05,
+                                on_flush=lambda *args: flushed.set())
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            buffer.index_documents(self.engine_name, [{'id': '1'}])
+            self.assertTrue(flushed.wait(5))
+            self.assertEqual(m.request_history[0].json(), [{'id': '1'}])
+            buffer.close()
+
+    def test_failed_flush_keeps_newer_writes(self):
+        buffer = DocumentBuffer(self.client, max_age=60)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, status_code=503)
+            buffer.index_documents(self.engine_name, [{'id': '1', 'title': 'old', 'body': 'a'}])
+            with self.assertRaises(Exception):
+                buffer.flush()
+
+            buffer.update_documents(self.engine_name, [{'id': '1', 'title': 'new'}])
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            buffer.close()
+            self.assertEqual(m.request_history[-1].json(),
+                             [{'id': '1', 'title': 'new', 'body': 'a'}])
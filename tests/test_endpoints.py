@@ -0,0 +1,126 @@
+from unittest import TestCase
+import requests
+import requests_mock
+
+from elastic_app_search.compat import monotonic
+from elastic_app_search.endpoints import EndpointPool, can_fail_over
+from elastic_app_search.request_session import RequestSession
+
+
+class TestEndpointPool(TestCase):
+
+    urls = ['http://node-1/api/as/v1', 'http://node-2/api/as/v1']
+
+    def test_least_loaded(self):
+        pool = EndpointPool(self.urls)
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertNotEqual(first, second)
+        pool.release(first, 0.1)
+        self.assertIs(pool.acquire(), first)
+
+    def test_lowest_latency(self):
+        pool = EndpointPool(self.urls, strategy='lowest_latency')
+        slow, fast = pool.endpoints
+        for endpoint, latency in ((slow, 0.5), (fast, 0.1)):
+            pool.acquire([other for other in pool.endpoints if other is not endpoint])
+            pool.release(endpoint, latency)
+        self.assertIs(pool.acquire(), fast)
+        # Requests in flight weigh against the fastest node.
+        for _ in range(5):
+            pool.acquire([slow])
+        self.assertIs(pool.acquire(), slow)
+
+    def test_ejects_after_consecutive_failures(self):
+        pool = EndpointPool(self.urls, max_failures=2, ejection_time=60)
+        broken, healthy = pool.endpoints
+        for _ in range(2):
+            pool.acquire([healthy])
+            pool.release(broken, failed=True)
+        self.assertEqual([stats['healthy'] for stats in pool.stats()], [False, True])
+        for _ in range(3):
+            self.assertIs(pool.acquire(), healthy)
+
+    def test_uses_ejected_node_when_all_are_ejected(self):
+        pool = EndpointPool(self.urls, max_failures=1, ejection_time=60)
+        first, second = pool.endpoints
+        for endpoint in (second, first):
+            pool.acquire([other for other in pool.endpoints if other is not endpoint])
+            pool.release(endpoint, failed=True)
+        self.assertIs(pool.acquire(), second)
+        self.assertIsNone(pool.acquire(pool.endpoints))
+
+    def test_ejection_time_grows(self):
+        pool = EndpointPool(self.urls, max_failures=1, ejection_time=1, max_ejection_time=3)
+        endpoint = pool.endpoints[0]
+        durations = []
+        for _ in range(3):
+            pool.acquire([pool.endpoints[1]])
+            pool.release(endpoint, failed=True)
+            durations.append(endpoint.ejected_until - monotonic())
+        self.assertEqual([round(duration) for duration in durations], [1, 2, 3])
+        pool.acquire([pool.endpoints[1]])
+        pool.release(endpoint, 0.1)
+        self.assertEqual(endpoint.ejections, 0)
+
+    def test_health_check(self):
+        healthy = {self.urls[0]: False, self.urls[1]: True}
+        pool = EndpointPool(self.urls, health_check=lambda url: healthy[url])
+        pool.check()
+        self.assertEqual([stats['healthy'] for stats in pool.stats()], [False, True])
+        healthy[self.urls[0]] = True
+        pool.check()
+        self.assertEqual([stats['healthy'] for stats in pool.stats()], [True, True])
+
+    def test_can_fail_over(self):
+        self.assertTrue(can_fail_over('get'))
+        self.assertFalse(can_fail_over('post'))
+        self.assertTrue(can_fail_over('post', request_sent=False))
+
+
+class TestRequestSessionEndpointPool(TestCase):
+
+    endpoint = 'engines/some-engine/search'
+    urls = ['http://node-1/api/as/v1', 'http://node-2/api/as/v1']
+
+    def test_fails_over_to_next_node(self):
+        session = RequestSession('api_key', 'http://unused', endpoint_pool=self.urls)
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', "{}/{}".format(self.urls[0], self.endpoint),
+                           exc=requests.exceptions.ConnectTimeout)
+            m.register_uri('GET', "{}/{}".format(self.urls[1], self.endpoint),
+                           exc=requests.exceptions.ConnectTimeout)
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                session.request('get', self.endpoint)
+            self.assertEqual(m.call_count, 2)
+
+            m.register_uri('GET', "{}/{}".format(self.urls[1], self.endpoint),
+                           json={'results': []})
+            for _ in range(4):
+                self.assertEqual(session.request('get', self.endpoint), {'results': []})
+        failures = [stats['failures'] for stats in session.endpoint_pool.stats()]
+        self.assertEqual(failures[1], 0)
+
+    def test_server_errors_fail_over_idempotent_requests_only(self):
+        session = RequestSession('api_key', 'http://unused', endpoint_pool=self.urls)
+        documents = 'engines/some-engine/documents'
+        with requests_mock.Mocker() as m:
+            for url in self.urls:
+                m.register_uri('GET', "{}/{}".format(url, self.endpoint), status_code=503)
+                m.register_uri('POST', "{}/{}".format(url, documents), status_code=503)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                session.request('get', self.endpoint)
+            self.assertEqual(m.call_count, 2)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                session.request('post', documents, json=[])
+            self.assertEqual(m.call_count, 3)
+
+    def test_client_errors_do_not_fail_over(self):
+        session = RequestSession('api_key', 'http://unused', endpoint_pool=self.urls)
+        with requests_mock.Mocker() as m:
+            for url in self.urls:
+                m.register_uri('GET', "{}/{}".format(url, self.endpoint), status_code=422)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                session.request('get', self.endpoint)
+            self.assertEqual(m.call_count, 1)
+        self.assertTrue(all(stats['healthy'] for stats in session.endpoint_pool.stats()))
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.events import EventSender
+
+
+class TestEventSender(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.directory = tempfile.mkdtemp()
+        self.spill_path = os.path.join(self.directory, 'clicks.ndjson')
+        self.click_url = "{}/engines/{}/click".format(
+            Client('host_identifier', 'api_key').session.base_url, self.engine_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def client(self, **options):
+        return Client('host_identifier', 'api_key', event_sender=EventSender(**options))
+
+    def test_click_is_sent_in_background(self):
+        client = self.client(flush_interval=10)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.click_url, status_code=200)
+            for i in range(5):
+                self.assertIsNone(client.click(self.engine_name, {'query': str(i)}))
+            self.assertTrue(client.event_sender.flush(timeout=5))
+            client.event_sender.close()
+            self.assertEqual([r.json()['query'] for r in m.request_history],
+                             [str(i) for i in range(5)])
+
+        self.assertEqual(client.event_sender.stats()['sent'], 5)
+
+    def test_flush_timeout_resets_flushing(self):
+        sender = EventSender(flush_interval=10)
+        sender.buffer.append(('engines/e/click', {}))
+        self.assertFalse(sender.flush(timeout=0))
+        self.assertFalse(sender.flushing)
+
+    def test_full_buffer_drops_events(self):
+        client = self.client(max_buffer=2, flush_interval=10, batch_size=10)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.click_url, status_code=200)
+            results = [client.event_sender.enqueue(client.session, 'engines/e/click', {})
+                       for _ in range(3)]
+            client.event_sender.close()
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(client.event_sender.stats()['dropped'], 1)
+
+    def test_client_errors_are_not_retried(self):
+        client = self.client()
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.click_url, status_code=400, json={'errors': ['bad']})
+            client.click(self.engine_name, {'query': 'cat'})
+            client.event_sender.close()
+            self.assertEqual(m.call_count, 1)
+
+        self.assertEqual(client.event_sender.stats()['failed'], 1)
+
+    def test_spills_while_unavailable_and_replays(self):
+        client = self.client(spill_path=self.spill_path, retry_interval=60)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.click_url, status_code=503)
+            for i in range(3):
+                client.click(self.engine_name, {'query': str(i)})
+            client.event_sender.close()
+
+        self.assertEqual(client.event_sender.stats()['spilled'], 3)
+        with open(self.spill_path) as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        # A new process sends the spilled events first.
+        client = self.client(spill_path=self.spill_path)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.click_url, status_code=200)
+            client.click(self.engine_name, {'query': '3'})
+            client.event_sender.close()
+            self.assertEqual([r.json()['query'] for r in m.request_history],
+                             ['0', '1', '2', '3'])
+
+        self.assertFalse(os.path.exists(self.spill_path))
+        self.assertFalse(os.path.exists(self.spill_path + '.replay'))
+
+    def test_unavailable_without_spill_path_drops_on_close(self):
+        client = self.client(retry_interval=60)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.click_url, status_code=503)
+            client.click(self.engine_name, {'query': 'cat'})
+            client.event_sender.close(timeout=5)
+
+        self.assertEqual(client.event_sender.stats()['dropped'], 1)
+
+    def test_closed_sender_rejects_events(self):
+        client = self.client()
+        client.event_sender.close()
+        with self.assertRaises(ValueError):
+            client.click(self.engine_name, {'query': 'cat'})
@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.export import export_documents, import_documents, read_documents
+
+
+class TestExport(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.client = Client('host_identifier', 'api_key')
+        self.list_url = "{}/engines/{}/documents/list".format(
+            self.client.session.base_url, self.engine_name)
+        self.documents_url = "{}/engines/{}/documents".format(
+            self.client.session.base_url, self.engine_name)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'export.ndjson.gz')
+        self.checkpoint_path = os.path.join(self.directory, 'export.checkpoint')
+        self.fail_on_page = None
+
+    def list_documents(self, request, context):
+        page = request.json()['page']
+        if page['current'] == self.fail_on_page:
+            context.status_code = 503
+            return {}
+        start = (page['current'] - 1) * page['size']
+        return {
+            'meta': {'page': {'current': page['current'], 'total_pages': 5}},
+            'results': [{'id': str(i)} for i in range(start, start + page['size'])]
+        }
+
+    def test_export_documents(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.list_url, json=self.list_documents)
+            count = export_documents(self.client, self.engine_name, self.path,
+                                     self.checkpoint_path, page_size=3)
+        self.assertEqual(count, 15)
+        self.assertEqual([d['id'] for d in read_documents(self.path)],
+                         [str(i) for i in range(15)])
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resume_export(self):
+        self.fail_on_page = 4
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.list_url, json=self.list_documents)
+            with self.assertRaises(Exception):
+                export_documents(self.client, self.engine_name, self.path,
+                                 self.checkpoint_path, page_size=3,
+                                 max_workers=1, pages_per_checkpoint=2)
+            with open(self.checkpoint_path) as f:
+                self.assertEqual(json.load(f)['next_page'], 3)
+
+            self.fail_on_page = None
+            count = export_documents(self.client, self.engine_name, self.path,
+                                     self.checkpoint_path, page_size=3,
+                                     pages_per_checkpoint=2)
+        self.assertEqual(count, 15)
+        self.assertEqual([d['id'] for d in read_documents(self.path)],
+                         [str(i) for i in range(15)])
+
+    def test_import_documents(self):
+        with gzip.open(self.path, 'wb') as f:
+            for i in range(150):
+                f.write(json.dumps({'id': str(i)}).encode('utf-8') + b'\n')
+
+        def index(request, context):
+            return [{'id': d['id'], 'errors': ['bad'] if d['id'] == '7' else []}
+                    for d in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=index)
+            summary = import_documents(self.client, self.engine_name, self.path)
+            self.assertEqual(m.call_count, 2)
+        self.assertEqual(summary, {'documents': 150,
+                                   'failed': [{'id': '7', 'errors': ['bad']}]})
@@ -0,0 +1,107 @@
+import random
+import requests
+import requests_mock
+from unittest import TestCase, skipIf
+
+from elastic_app_search import Client
+from elastic_app_search.instrumentation import (
+    Histogram, MetricsCollector, OpenTelemetryHook, RequestMetrics, endpoint_template)
+from elastic_app_search.retry import RetryPolicy
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+
+class TestInstrumentation(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.collected = []
+        self.client = Client('host_identifier', 'api_key', hooks=[self.collected.append],
+                             retry_policy=RetryPolicy(backoff_factor=0))
+        self.search_url = "{}/engines/{}/search".format(
+            self.client.session.base_url, self.engine_name)
+
+    def test_endpoint_template(self):
+        self.assertEqual(endpoint_template('engines/videos/search'), 'engines/{engine_name}/search')
+        self.assertEqual(endpoint_template('engines/videos/synonyms/syn-1'),
+                         'engines/{engine_name}/synonyms/{synonym_set_id}')
+        self.assertEqual(endpoint_template('engines/videos'), 'engines/{engine_name}')
+        self.assertEqual(endpoint_template('engines'), 'engines')
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram(sub_bucket_bits=5)
+        values = [random.uniform(0.001, 2.0) for _ in range(10000)]
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for percentile in (50, 90, 99):
+            exact = values[int(len(values) * percentile / 100.0) - 1]
+            self.assertAlmostEqual(histogram.percentile(percentile) / exact, 1, delta=1 / 32.0)
+        self.assertEqual(histogram.percentile(100), max(values))
+        self.assertIsNone(Histogram().percentile(50))
+
+    def test_hooks_receive_metrics(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.search_url, [
+                {'status_code': 503},
+                {'content': b'{"results":[]}', 'status_code': 200}
+            ])
+            self.client.search(self.engine_name, 'cat')
+
+        metrics, = self.collected
+        self.assertEqual(metrics.http_method, 'GET')
+        self.assertEqual(metrics.template, 'engines/{engine_name}/search')
+        self.assertEqual(metrics.status_code, 200)
+        self.assertEqual(metrics.retries, 1)
+        self.assertEqual(metrics.request_bytes, len(b'{"query":"cat"}'))
+        self.assertEqual(metrics.response_bytes, len(b'{"results":[]}'))
+        self.assertGreater(metrics.total, 0)
+
+    def test_hooks_receive_errors(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.search_url, status_code=500)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.client.search(self.engine_name, 'cat')
+
+        metrics, = self.collected
+        self.assertEqual(metrics.status_code, 500)
+        self.assertIsInstance(metrics.error, requests.exceptions.HTTPError)
+
+    def test_prometheus_text(self):
+        collector = MetricsCollector()
+        for status in (200, 200, None):
+            metrics = RequestMetrics('get', 'engines/videos/search', request_bytes=10)
+            metrics.status_code = status
+            metrics.ttfb = 0.01
+            metrics.finish()
+            collector(metrics)
+
+        text = collector.prometheus_text()
+        labels = 'method="GET",endpoint="engines/{engine_name}/search"'
+        self.assertIn('# TYPE app_search_client_total_seconds summary', text)
+        self.assertIn('app_search_client_ttfb_seconds_count{%s} 3' % labels, text)
+        self.assertIn('app_search_client_requests_total{%s,status="200"} 2' % labels, text)
+        self.assertIn('app_search_client_requests_total{%s,status="error"} 1' % labels, text)
+        self.assertIn('app_search_client_request_bytes_total{%s} 30' % labels, text)
+
+    @skipIf(TracerProvider is None, 'opentelemetry-sdk is not installed')
+    def test_opentelemetry_spans(self):
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        hook = OpenTelemetryHook(provider.get_tracer('test'))
+
+        metrics = RequestMetrics('get', 'engines/videos/search')
+        metrics.status_code = 200
+        metrics.finish()
+        hook(metrics)
+
+        span, = exporter.get_finished_spans()
+        self.assertEqual(span.name, 'GET engines/{engine_name}/search')
+        self.assertEqual(span.attributes['http.response.status_code'], 200)
+        self.assertEqual(span.attributes['url.path'], 'engines/videos/search')
@@ -0,0 +1,121 @@
+import json
+import threading
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.lazy import (
+    CompactResult, LazyResponse, LazyResults, LazySerializer, loads_lazily)
+from elastic_app_search.serializer import JSONSerializer
+
+
+class TestLazy(TestCase):
+
+    def setUp(self):
+        self.response = {
+            'meta': {'page': {'current': 1, 'total_pages': 1}, 'request_id': 'abc'},
+            'results': [
+                {'id': {'raw': str(i)}, 'title': {'raw': 'Title [{"}', 'snippet': 'Title'},
+                 'tags': {'raw': ['a', 'b']}, '_meta': {'id': str(i), 'score': 1.5}}
+                for i in range(5)
+            ],
+        }
+        self.data = json.dumps(self.response, indent=1).encode('utf-8')
+        self.serializer = LazySerializer(JSONSerializer())
+
+    def test_members_after_results(self):
+        response = self.serializer.loads(
+            b'{"results": [{"a": "]}"}, {"b": 1}], "meta": {"request_id": "abc"}}')
+        self.assertEqual(response['meta'], {'request_id': 'abc'})
+        self.assertEqual(list(response['results']), [{'a': ']}'}, {'b': 1}])
+        self.assertEqual(list(response), ['results', 'meta'])
+
+    def test_invalid_json(self):
+        with self.assertRaises(ValueError):
+            self.serializer.loads(b'{"meta": {"request_id": }}')['meta']
+
+    def test_lazy_response(self):
+        response = self.serializer.loads(self.data)
+        self.assertIsInstance(response, LazyResponse)
+        self.assertEqual(response['meta'], self.response['meta'])
+        self.assertEqual(response, self.response)
+        self.assertEqual(sorted(response), ['meta', 'results'])
+
+    def test_mapping_methods(self):
+        response = self.serializer.loads(self.data)
+        self.assertEqual(sorted(response.keys()), ['meta', 'results'])
+        copy = dict(response)
+        self.assertEqual(copy['meta'], self.response['meta'])
+        self.assertEqual(list(copy['results']), self.response['results'])
+        self.assertTrue(repr(response).startswith('LazyResponse({'))
+        self.assertIn("'request_id': 'abc'", repr(response))
+
+    def test_results_are_decoded_on_access(self):
+        results = self.serializer.loads(self.data)['results']
+        self.assertIsInstance(results, LazyResults)
+        self.assertEqual(results[0], self.response['results'][0])
+        self.assertEqual(len(results.spans), 1)
+        self.assertEqual(list(results.decoded), [0])
+        self.assertEqual(results[-1], self.response['results'][-1])
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[1:3], self.response['results'][1:3])
+        self.assertEqual(list(results), self.response['results'])
+        with self.assertRaises(IndexError):
+            results[5]
+
+    def test_empty_results(self):
+        response = self.serializer.loads(b'{"meta": {}, "results": [ ]}')
+        self.assertEqual(list(response['results']), [])
+        self.assertEqual(len(response['results']), 0)
+
+    def test_other_values_are_decoded_eagerly(self):
+        self.assertEqual(self.serializer.loads(b'[{"id": "1"}]'), [{'id': '1'}])
+        self.assertEqual(self.serializer.loads(b'true'), True)
+
+    def test_compact_results(self):
+        response = loads_lazily(self.data, json.loads, result_class=CompactResult)
+        result = response['results'][2]
+        self.assertEqual(result.id, '2')
+        self.assertEqual(result.score, 1.5)
+        self.assertEqual(result.raw, {'id': '2', 'title': 'Title [{"}', 'tags': ['a', 'b']})
+        self.assertEqual(result.snippets, {'title': 'Title'})
+        self.assertFalse(hasattr(result, '__dict__'))
+
+    def test_shared_between_threads(self):
+        response = self.serializer.loads(self.data)
+        lists = []
+
+        def read():
+            lists.append(list(response['results']))
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(lists, [self.response['results']] * 8)
+        self.assertEqual(len(response['results'].spans), 5)
+
+    def test_client_lazy_search(self):
+        client = Client('host_identifier', 'api_key')
+        base_url = client.session.base_url
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', base_url + '/engines/some-engine-name/search', content=self.data)
+            m.register_uri('GET', base_url + '/engines', json=[{'name': 'some-engine-name'}])
+            response = client.search('some-engine-name', 'query', lazy=CompactResult)
+            engines = client.list_engines()
+
+        self.assertIsInstance(response, LazyResponse)
+        self.assertEqual(response['results'][0].id, '0')
+        self.assertEqual(engines, [{'name': 'some-engine-name'}])
+
+    def test_client_search(self):
+        client = Client('host_identifier', 'api_key', serializer=self.serializer)
+        url = "{}/engines/some-engine-name/search".format(client.session.base_url)
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', url, content=self.data)
+            response = client.search('some-engine-name', 'query', {})
+            self.assertEqual(m.request_history[0].json(), {'query': 'query'})
+
+        self.assertEqual(response['meta']['request_id'], 'abc')
+        self.assertEqual(response['results'][0]['_meta']['score'], 1.5)
@@ -0,0 +1,83 @@
+import time
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.metadata_cache import MetadataCache
+
+
+class TestMetadataCache(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.cache = MetadataCache(ttl=60)
+        self.addCleanup(self.cache.close)
+        self.client = Client('host_identifier', 'api_key', metadata_cache=self.cache)
+        self.schema_url = "{}/engines/{}/schema".format(
+            self.client.session.base_url, self.engine_name)
+        self.settings_url = "{}/engines/{}/search_settings".format(
+            self.client.session.base_url, self.engine_name)
+
+    def test_schema_is_cached(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.schema_url, json={'title': 'text'})
+            self.assertEqual(self.client.get_schema(self.engine_name), {'title': 'text'})
+            self.assertEqual(self.client.get_schema(self.engine_name), {'title': 'text'})
+            self.assertEqual(m.call_count, 1)
+
+    def test_update_schema_invalidates(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.schema_url, [
+                {'json': {'title': 'text'}}, {'json': {'title': 'text', 'price': 'number'}}])
+            m.register_uri('POST', self.schema_url, json={'title': 'text', 'price': 'number'})
+            self.client.get_schema(self.engine_name)
+            self.client.update_schema(self.engine_name, {'price': 'number'})
+            self.assertEqual(self.client.get_schema(self.engine_name),
+                             {'title': 'text', 'price': 'number'})
+            self.assertEqual(m.call_count, 3)
+
+    def test_search_settings_reset_invalidates(self):
+        reset_url = self.settings_url + '/reset'
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.settings_url, json={'boosts': {}})
+            m.register_uri('POST', reset_url, json={'boosts': {}})
+            self.client.get_search_settings(self.engine_name)
+            self.client.get_search_settings(self.engine_name)
+            self.client.reset_search_settings(self.engine_name)
+            self.client.get_search_settings(self.engine_name)
+            self.assertEqual(m.call_count, 3)
+
+    def test_background_revalidation_with_etag(self):
+        self.cache.refresh_after = 0
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.schema_url, [
+                {'json': {'title': 'text'}, 'headers': {'ETag': '"v1"'}},
+                {'status_code': 304, 'headers': {'ETag': '"v1"'}},
+            ])
+            self.client.get_schema(self.engine_name)
+            self.assertEqual(self.client.get_schema(self.engine_name), {'title': 'text'})
+            self.cache.close()
+            self.assertEqual(m.call_count, 2)
+            self.assertEqual(m.last_request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(self.cache.lookup((self.engine_name, 'schema')), ({'title': 'text'}, True))
+
+    def test_stale_value_is_served_while_refreshing(self):
+        self.cache.refresh_after = 0
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.schema_url, [
+                {'json': {'title': 'text'}}, {'json': {'title': 'text', 'price': 'number'}}])
+            self.client.get_schema(self.engine_name)
+            self.assertEqual(self.client.get_schema(self.engine_name), {'title': 'text'})
+            self.cache.close()
+            self.assertEqual(self.client.get_schema(self.engine_name),
+                             {'title': 'text', 'price': 'number'})
+
+    def test_too_stale_value_blocks(self):
+        self.cache.ttl = 0
+        self.cache.max_stale = 0
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.schema_url, json={'title': 'text'})
+            self.client.get_schema(self.engine_name)
+            time.sleep(0.01)
+            self.client.get_schema(self.engine_name)
+            self.assertEqual(m.call_count, 2)
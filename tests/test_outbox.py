@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.outbox import DocumentOutbox
+
+
+class TestDocumentOutbox(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.directory = tempfile.mkdtemp()
+        self.client = Client('host_identifier', 'api_key')
+        self.documents_url = "{}/engines/{}/documents".format(
+            self.client.session.base_url, self.engine_name)
+        self.outboxes = []
+
+    def tearDown(self):
+        for outbox in self.outboxes:
+            outbox.close()
+        shutil.rmtree(self.directory)
+
+    def outbox(self, **options):
+        options.setdefault('flush_interval', 0.01)
+        outbox = DocumentOutbox(self.client, self.directory, **options)
+        self.outboxes.append(outbox)
+        return outbox
+
+    def respond(self, request, context):
+        return [{'id': doc['id'], 'errors': []} for doc in request.json()]
+
+    def test_drains_coalesced_writes(self):
+        outbox = self.outbox(flush_interval=10)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            m.register_uri('PATCH', self.documents_url, json=self.respond)
+            outbox.index_documents(self.engine_name, [{'id': '1', 'title': 'a'}])
+            outbox.update_documents(self.engine_name, [{'id': '1', 'body': 'b'}])
+            outbox.update_documents(self.engine_name, [{'id': '2', 'body': 'c'}])
+            self.assertTrue(outbox.flush(timeout=5))
+            requests = [(r.method, r.json()) for r in m.request_history]
+
+        self.assertEqual(requests, [
+            ('POST', [{'id': '1', 'title': 'a', 'body': 'b'}]),
+            ('PATCH', [{'id': '2', 'body': 'c'}]),
+        ])
+        self.assertEqual(outbox.stats()['sent'], 2)
+        self.assertEqual(outbox.stats()['coalesced'], 1)
+        self.assertEqual(json.loads(open(os.path.join(self.directory, 'cursor.json')).read()),
+                         {'segment': 1, 'offset': os.path.getsize(
+                             os.path.join(self.directory, 'segment-0000000001.log'))})
+
+    def test_retries_documents_with_errors(self):
+        attempts = []
+
+        def respond(request, context):
+            attempts.append(request.json())
+            return [{'id': doc['id'], 'errors': ['error'] if doc['id'] == 'bad' else []}
+                    for doc in request.json()]
+
+        outbox = self.outbox(max_attempts=3)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=respond)
+            outbox.index_documents(self.engine_name, [{'id': 'good'}, {'id': 'bad'}])
+            self.assertTrue(outbox.flush(timeout=5))
+
+        self.assertEqual(attempts, [[{'id': 'good'}, {'id': 'bad'}], [{'id': 'bad'}], [{'id': 'bad'}]])
+        with io.open(os.path.join(self.directory, 'failed.ndjson'), 'rb') as f:
+            failed = [json.loads(line.decode('utf-8')) for line in f]
+        self.assertEqual(failed, [{'operation': 'index', 'engine_name': self.engine_name,
+                                   'document': {'id': 'bad'}, 'errors': ['error']}])
+        self.assertEqual(outbox.stats()['retried'], 2)
+        self.assertEqual(outbox.stats()['failed'], 1)
+
+    def test_retries_do_not_replace_later_writes(self):
+        outbox = self.outbox(flush_interval=10)
+        requests = []
+
+        def respond(request, context):
+            documents = request.json()
+            requests.append(documents)
+            if len(requests) > 1:
+                return [{'id': doc['id'], 'errors': []} for doc in documents]
+            # Newer writes of both documents arrive while the first batch is sent.
+            outbox.index_documents(self.engine_name, [{'id': '1', 'v': 2}])
+            outbox.update_documents(self.engine_name, [{'id': '2', 'body': 'b'}])
+            return [{'id': doc['id'], 'errors': ['transient']} for doc in documents]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=respond)
+            outbox.index_documents(self.engine_name, [{'id': '1', 'v': 1}, {'id': '2', 'v': 1}])
+            self.assertTrue(outbox.flush(timeout=5))
+            self.assertEqual(m.call_count, 2)
+
+        self.assertEqual(requests[1], [{'id': '1', 'v': 2}, {'id': '2', 'v': 1, 'body': 'b'}])
+        self.assertEqual(outbox.stats()['retried'], 1)
+
+    def test_fails_documents_of_rejected_requests(self):
+        outbox = self.outbox(retry_interval=60)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, status_code=413)
+            outbox.index_documents(self.engine_name, [{'id': '1'}, {'id': '2'}])
+            self.assertTrue(outbox.flush(timeout=5))
+            self.assertEqual(m.call_count, 1)
+
+        with io.open(os.path.join(self.directory, 'failed.ndjson'), 'rb') as f:
+            failed = [json.loads(line.decode('utf-8'))['document'] for line in f]
+        self.assertEqual(failed, [{'id': '1'}, {'id': '2'}])
+        self.assertEqual(outbox.stats()['failed'], 2)
+
+    def test_keeps_documents_while_unauthorized(self):
+        outbox = self.outbox(retry_interval=0.01)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url,
+                           [{'status_code': 401}, {'json': self.respond}])
+            outbox.index_documents(self.engine_name, [{'id': '1'}])
+            self.assertTrue(outbox.flush(timeout=5))
+            self.assertEqual(m.call_count, 2)
+
+        self.assertEqual(outbox.stats()['failed'], 0)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'failed.ndjson')))
+
+    def test_keeps_documents_while_unavailable(self):
+        outbox = self.outbox(retry_interval=60)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, status_code=503)
+            outbox.index_documents(self.engine_name, [{'id': '1'}, {'id': '2'}])
+            self.assertFalse(outbox.flush(timeout=0.2))
+            outbox.close()
+
+        # A new outbox on the same directory sends the pending documents.
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            outbox = self.outbox()
+            outbox.index_documents(self.engine_name, [{'id': '3'}])
+            self.assertTrue(outbox.flush(timeout=5))
+            sent = [doc['id'] for r in m.request_history for doc in r.json()]
+
+        self.assertEqual(sent, ['1', '2', '3'])
+
+    def test_rotates_segments(self):
+        outbox = self.outbox(segment_bytes=100, batch_size=2)
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            for i in range(10):
+                outbox.index_documents(self.engine_name, [{'id': str(i)}])
+            self.assertTrue(outbox.flush(timeout=5))
+            sent = [doc['id'] for r in m.request_history for doc in r.json()]
+
+        self.assertEqual(sent, [str(i) for i in range(10)])
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.log')], [])
+
+    def test_skips_truncated_record(self):
+        with io.open(os.path.join(self.directory, 'segment-0000000001.log'), 'wb') as f:
+            f.write(b'{"operation": "index", "engine_name": "some-engine-name", '
+                    b'"document": {"id": "1"}, "attempts": 0}\n{"operation": "ind')
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.documents_url, json=self.respond)
+            outbox = self.outbox()
+            self.assertTrue(outbox.flush(timeout=5))
+            self.assertEqual(m.request_history[0].json(), [{'id': '1'}])
+
+    def test_update_requires_id(self):
+        with self.assertRaises(ValueError):
+            self.outbox().update_documents(self.engine_name, [{'title': 'no id'}])
@@ -0,0 +1,79 @@
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.pagination import PageIterator
+
+
+def list_response(current, size, total):
+    start = (current - 1) * size
+    total_pages = (total + size - 1) // size
+    return {
+        'meta': {'page': {'current': current, 'total_pages': total_pages,
+                          'total_results': total, 'size': size}},
+        'results': [{'id': str(i)} for i in range(start, min(start + size, total))]
+    }
+
+
+class TestPagination(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.client = Client('host_identifier', 'api_key')
+
+    def register_list(self, m, url, total):
+        def callback(request, context):
+            page = request.json()['page']
+            return list_response(page['current'], page['size'], total)
+
+        m.register_uri('GET', url, json=callback, status_code=200)
+
+    def test_iter_documents(self):
+        with requests_mock.Mocker() as m:
+            url = "{}/engines/{}/documents/list".format(
+                self.client.session.base_url, self.engine_name)
+            self.register_list(m, url, 25)
+            documents = list(self.client.iter_documents(self.engine_name, size=10))
+            self.assertEqual(m.call_count, 3)
+        self.assertEqual([d['id'] for d in documents], [str(i) for i in range(25)])
+
+    def test_iter_engines_without_prefetch(self):
+        with requests_mock.Mocker() as m:
+            self.register_list(m, "{}/engines".format(self.client.session.base_url), 5)
+            engines = list(self.client.iter_engines(size=2, prefetch=False))
+        self.assertEqual(len(engines), 5)
+
+    def test_iter_synonym_sets_from_page(self):
+        with requests_mock.Mocker() as m:
+            url = "{}/engines/{}/synonyms".format(
+                self.client.session.base_url, self.engine_name)
+            self.register_list(m, url, 30)
+            synonym_sets = list(self.client.iter_synonym_sets(
+                self.engine_name, current=2, size=10))
+        self.assertEqual([s['id'] for s in synonym_sets], [str(i) for i in range(10, 30)])
+
+    def test_resume_after_failure(self):
+        failures = [2]
+
+        def fetch_page(current, size):
+            if current in failures:
+                failures.remove(current)
+                raise IOError('connection lost')
+            return list_response(current, size, 6)
+
+        for prefetch in (True, False):
+            failures[:] = [2]
+            iterator = PageIterator(fetch_page, size=2, prefetch=prefetch)
+            seen = []
+            with self.assertRaises(IOError):
+                for item in iterator:
+                    seen.append(item['id'])
+            self.assertEqual(iterator.current, 1)
+
+            resumed = PageIterator(fetch_page, current=iterator.current + 1, size=2)
+            seen.extend(item['id'] for item in resumed)
+            self.assertEqual(seen, [str(i) for i in range(6)])
+
+    def test_empty_results(self):
+        iterator = PageIterator(lambda current, size: {'results': []})
+        self.assertEqual(list(iterator), [])
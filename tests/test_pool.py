@@ -0,0 +1,79 @@
+import json
+import socket
+import threading
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from elastic_app_search import Client
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        body = json.dumps({'name': 'engine'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPool(TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base_endpoint = '127.0.0.1:{}/api/as/v1'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pool_options(self):
+        client = Client('', 'api_key', self.base_endpoint, False,
+                        pool_connections=2, pool_maxsize=25, pool_block=True)
+        adapter = client.session.session.get_adapter('http://localhost')
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 25)
+        self.assertTrue(adapter._pool_block)
+
+    def test_pool_stats_reuse_connections(self):
+        client = Client('', 'api_key', self.base_endpoint, False)
+        for _ in range(3):
+            client.get_engine('engine')
+        self.assertEqual(client.session.pool_stats(),
+                         {'created': 1, 'reused': 2, 'waited': 0, 'discarded': 0})
+
+    def test_keep_alive_disabled(self):
+        client = Client('', 'api_key', self.base_endpoint, False, keep_alive=False)
+        self.assertEqual(client.session.session.headers['Connection'], 'close')
+
+    def test_socket_options(self):
+        options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        client = Client('', 'api_key', self.base_endpoint, False, socket_options=options)
+        client.get_engine('engine')
+        pool = client.session.adapter.poolmanager.connection_from_url(
+            'http://{}'.format(self.base_endpoint))
+        self.assertEqual(pool.conn_kw['socket_options'],
+                         [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)] + options)
+
+    def test_connect_timing(self):
+        collected = []
+        client = Client('', 'api_key', self.base_endpoint, False, hooks=[collected.append])
+        client.get_engine('engine')
+        client.get_engine('engine')
+        self.assertGreater(collected[0].connect, 0)
+        self.assertIsNone(collected[1].connect)
+        self.assertGreater(collected[1].ttfb, 0)
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search.ratelimit import (
+    FileTokenBucket, RateLimiter, TokenBucket, endpoint_class, fcntl)
+from elastic_app_search.request_session import RequestSession
+
+
+class TestRateLimit(TestCase):
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class('engines/my-engine/search'), 'search')
+        self.assertEqual(endpoint_class('engines/my-engine/multi_search'), 'search')
+        self.assertEqual(endpoint_class('engines/my-engine/documents/list'), 'documents')
+        self.assertEqual(endpoint_class('engines/my-engine/logs/api'), 'analytics')
+        self.assertEqual(endpoint_class('engines/my-engine/click'), 'analytics')
+        self.assertEqual(endpoint_class('engines/my-engine/schema'), 'default')
+        self.assertEqual(endpoint_class('engines'), 'default')
+
+    def test_token_bucket_spaces_out_requests(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    def test_file_token_bucket_shares_state(self):
+        if fcntl is None:
+            self.skipTest('fcntl is not available')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'bucket')
+        first = FileTokenBucket(path, rate=10, capacity=1)
+        second = FileTokenBucket(path, rate=10, capacity=1)
+        self.assertEqual(first.reserve(), 0)
+        self.assertAlmostEqual(second.reserve(), 0.1, places=2)
+
+    def test_rate_limiter_only_limits_configured_classes(self):
+        limiter = RateLimiter(search=TokenBucket(rate=1, capacity=1))
+        self.assertEqual(limiter.reserve('engines/my-engine/search'), 0)
+        self.assertGreater(limiter.reserve('engines/my-engine/search'), 0.9)
+        self.assertEqual(limiter.reserve('engines/my-engine/documents'), 0)
+
+    def test_request_session_acquires_before_sending(self):
+        reserved = []
+
+        class RecordingLimiter(RateLimiter):
+            def reserve(self, endpoint):
+                reserved.append(endpoint)
+                return 0.0
+
+        session = RequestSession('api_key', 'http://www.base_url.com',
+                                 rate_limiter=RecordingLimiter())
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://www.base_url.com/engines/my-engine/search', json={})
+            session.request('get', 'engines/my-engine/search')
+        self.assertEqual(reserved, ['engines/my-engine/search'])
@@ -1,3 +1,5 @@
+import json
+import zlib
 from unittest import TestCase, skipIf
 from requests.status_codes import codes
 from future.utils import iteritems
@@ -48,3 +50,21 @@ class TestRequestSession(TestCase):
 
             with self.assertRaises(InvalidCredentials) as _context:
                 self.session.request('post', endpoint)
+
+    def test_request_compression(self):
+        session = RequestSession(self.api_host_key, 'http://www.base_url.com', compress_threshold=100)
+        endpoint = 'some_endpoint'
+        small = [{'id': '1'}]
+        large = [{'id': str(i), 'body': 'some text'} for i in range(20)]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', "{}/{}".format(session.base_url, endpoint), json={}, status_code=200)
+
+            session.request('post', endpoint, json=small)
+            self.assertNotIn('Content-Encoding', m.last_request.headers)
+            self.assertEqual(json.loads(m.last_request.body.decode('utf-8')), small)
+
+            session.request('post', endpoint, json=large)
+            self.assertEqual(m.last_request.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(json.loads(zlib.decompress(
+                m.last_request.body, 16 + zlib.MAX_WBITS).decode('utf-8')), large)
@@ -0,0 +1,88 @@
+from unittest import TestCase
+import requests
+import requests_mock
+
+from elastic_app_search.request_session import RequestSession
+from elastic_app_search.retry import RetryBudget, RetryPolicy, parse_retry_after
+
+
+class TestRetryPolicy(TestCase):
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_backoff_is_bounded(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+        for attempt in range(2):
+            delay = policy.get_delay('get', attempt, 503)
+            self.assertTrue(0 <= delay <= 2 ** attempt)
+        self.assertLessEqual(policy.get_delay('get', 2, 503, retry_after='60'), 5)
+
+    def test_gives_up_after_max_retries(self):
+        policy = RetryPolicy(max_retries=2)
+        self.assertIsNotNone(policy.get_delay('get', 1, 503))
+        self.assertIsNone(policy.get_delay('get', 2, 503))
+
+    def test_idempotency_rules(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.get_delay('post', 0, 503))
+        self.assertIsNone(policy.get_delay('patch', 0))
+        self.assertIsNotNone(policy.get_delay('post', 0, 429))
+        self.assertIsNotNone(policy.get_delay('post', 0, request_sent=False))
+        self.assertIsNotNone(policy.get_delay('delete', 0, 502))
+        self.assertIsNone(policy.get_delay('get', 0, 400))
+
+    def test_budget_limits_retries(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+        policy = RetryPolicy(budget=budget)
+        self.assertIsNotNone(policy.get_delay('get', 0, 503))
+        self.assertIsNone(policy.get_delay('get', 0, 503))
+        policy.record_request()
+        policy.record_request()
+        self.assertIsNotNone(policy.get_delay('get', 0, 503))
+
+
+class TestRequestSessionRetry(TestCase):
+
+    endpoint = 'engines/some-engine/documents'
+
+    def setUp(self):
+        policy = RetryPolicy(max_retries=2, backoff_factor=0)
+        self.session = RequestSession('api_key', 'http://www.base_url.com', retry_policy=policy)
+        self.url = "{}/{}".format(self.session.base_url, self.endpoint)
+
+    def test_retries_throttled_request(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.url, [
+                {'status_code': 429, 'headers': {'Retry-After': '0'}},
+                {'json': [{'id': '1', 'errors': []}], 'status_code': 200}
+            ])
+            response = self.session.request('post', self.endpoint, data='[{"id": "1"}]')
+            self.assertEqual(response, [{'id': '1', 'errors': []}])
+            self.assertEqual(m.call_count, 2)
+
+    def test_raises_when_retries_exhausted(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.url, status_code=503)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.session.request('get', self.endpoint)
+            self.assertEqual(m.call_count, 3)
+
+    def test_does_not_retry_non_idempotent_server_error(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.url, status_code=503)
+            with self.assertRaises(requests.exceptions.HTTPError):
+                self.session.request('post', self.endpoint)
+            self.assertEqual(m.call_count, 1)
+
+    def test_retries_connect_timeout(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', self.url, [
+                {'exc': requests.exceptions.ConnectTimeout},
+                {'json': {}, 'status_code': 200}
+            ])
+            self.assertEqual(self.session.request('post', self.endpoint), {})
+            self.assertEqual(m.call_count, 2)
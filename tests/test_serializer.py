@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import datetime
+from unittest import TestCase, skipIf
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.serializer import JSONSerializer, OrjsonSerializer, orjson
+
+
+class TestSerializer(TestCase):
+
+    values = [
+        {'id': '1', 'title': u'caf\xe9', 'price': 1.5, 'tags': ['a', None], 'in_stock': True},
+        [{'id': str(i)} for i in range(3)],
+        {1: 'integer key'},
+        2 ** 70,
+    ]
+
+    def test_json_serializer_round_trip(self):
+        serializer = JSONSerializer()
+        for value in self.values:
+            encoded = serializer.dumps(value)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(serializer.loads(encoded), serializer.loads(encoded.decode('utf-8')))
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_matches_json(self):
+        reference = JSONSerializer()
+        serializer = OrjsonSerializer()
+        for value in self.values:
+            self.assertEqual(serializer.dumps(value), reference.dumps(value))
+            self.assertEqual(serializer.loads(reference.dumps(value)),
+                             reference.loads(reference.dumps(value)))
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_rejects_what_json_rejects(self):
+        for value in [datetime.datetime(2020, 1, 1), object()]:
+            with self.assertRaises(TypeError):
+                OrjsonSerializer().dumps(value)
+
+    def test_client_uses_serializer(self):
+        encoded = []
+
+        class RecordingSerializer(JSONSerializer):
+            def dumps(self, data):
+                encoded.append(data)
+                return super(RecordingSerializer, self).dumps(data)
+
+        client = Client('host_identifier', 'api_key', serializer=RecordingSerializer())
+        with requests_mock.Mocker() as m:
+            url = "{}/engines/engine/search".format(client.session.base_url)
+            m.register_uri('GET', url, content=b'{"results":[]}')
+            response = client.search('engine', 'cat')
+            self.assertEqual(m.last_request.body, b'{"query":"cat"}')
+        self.assertEqual(response, {'results': []})
+        self.assertEqual(encoded, [{'query': 'cat'}])
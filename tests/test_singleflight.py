@@ -0,0 +1,76 @@
+import threading
+import time
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.singleflight import SingleFlight
+
+
+class TestSingleFlight(TestCase):
+
+    def run_concurrently(self, fn, count=5):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(fn())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_shares_in_flight_call(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'result'
+
+        results = self.run_concurrently(lambda: single_flight.do('key', slow))
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.in_flight(), 0)
+
+    def test_shares_exception(self):
+        single_flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                single_flight.do('key', fail)
+            except ValueError as error:
+                return error
+
+        errors = self.run_concurrently(call, 3)
+        self.assertEqual(len(set(map(id, errors))), 1)
+
+    def test_client_deduplicates_identical_gets(self):
+        client = Client('host_identifier', 'api_key', single_flight=True)
+        url = "{}/engines/engine/schema".format(client.session.base_url)
+
+        def schema(request, context):
+            time.sleep(0.2)
+            return {'title': 'text'}
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', url, json=schema)
+            results = self.run_concurrently(lambda: client.get_schema('engine'))
+            self.assertEqual(m.call_count, 1)
+        self.assertEqual(results, [{'title': 'text'}] * 5)
+
+    def test_client_does_not_deduplicate_writes(self):
+        client = Client('host_identifier', 'api_key', single_flight=True)
+        url = "{}/engines/engine/documents".format(client.session.base_url)
+
+        def index(request, context):
+            time.sleep(0.1)
+            return [{'id': '1', 'errors': []}]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', url, json=index)
+            self.run_concurrently(lambda: client.index_documents('engine', [{'id': '1'}]), 3)
+            self.assertEqual(m.call_count, 3)
@@ -0,0 +1,76 @@
+import json
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.streaming import ResultsParser, ResultStream
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestStreaming(TestCase):
+
+    def setUp(self):
+        self.response = {
+            'meta': {'page': {'current': 1, 'size': 3}},
+            'results': [{'id': str(i), 'title': u'caf\xe9 [{"}', 'n': i * 10} for i in range(3)],
+            'after': 12345,
+        }
+        self.data = json.dumps(self.response, ensure_ascii=False).encode('utf-8')
+
+    def test_parses_any_chunking(self):
+        for size in (1, 2, 7, len(self.data)):
+            parser = ResultsParser()
+            results = []
+            for chunk in split(self.data, size):
+                results.extend(parser.feed(chunk))
+            results.extend(parser.close())
+            self.assertEqual(results, self.response['results'], size)
+            self.assertEqual(parser.members, {'meta': self.response['meta'], 'after': 12345})
+
+    def test_yields_results_before_the_end(self):
+        parser = ResultsParser()
+        first_result_end = self.data.index(b'}, {') + 1
+        self.assertEqual(parser.feed(self.data[:first_result_end + 2]), [self.response['results'][0]])
+        self.assertEqual(parser.members, {'meta': self.response['meta']})
+
+    def test_does_not_cut_numbers(self):
+        parser = ResultsParser()
+        self.assertEqual(parser.feed(b'{"results": [1'), [])
+        self.assertEqual(parser.feed(b'23, 4'), [123])
+        self.assertEqual(parser.feed(b']}'), [4])
+        self.assertEqual(parser.close(), [])
+
+    def test_empty_results(self):
+        parser = ResultsParser()
+        self.assertEqual(parser.feed(b'{"meta": {}, "results": []}'), [])
+        self.assertEqual(parser.close(), [])
+
+    def test_truncated_response(self):
+        parser = ResultsParser()
+        parser.feed(b'{"results": [{"id": "1"}, {"id"')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+    def test_invalid_response(self):
+        with self.assertRaises(ValueError):
+            ResultsParser().feed(b'[1, 2]')
+
+    def test_result_stream(self):
+        closed = []
+        stream = ResultStream(split(self.data, 5), lambda: closed.append(True))
+        self.assertEqual(stream.meta, self.response['meta'])
+        self.assertEqual(list(stream), self.response['results'])
+        self.assertEqual(stream.members['after'], 12345)
+        self.assertEqual(closed, [True])
+
+    def test_list_documents_stream(self):
+        client = Client('host_identifier', 'api_key')
+        url = "{}/engines/some-engine-name/documents/list".format(client.session.base_url)
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', url, content=self.data)
+            with client.list_documents('some-engine-name', 1, 3, stream=True) as stream:
+                self.assertEqual([document['id'] for document in stream], ['0', '1', '2'])
+            self.assertEqual(m.request_history[0].json(), {'page': {'current': 1, 'size': 3}})
@@ -0,0 +1,130 @@
+from unittest import TestCase
+import requests_mock
+
+from elastic_app_search import Client
+from elastic_app_search.exceptions import InvalidDocument
+from elastic_app_search.validation import DocumentValidator, merge_statuses
+
+
+class TestValidation(TestCase):
+
+    def setUp(self):
+        self.engine_name = 'some-engine-name'
+        self.client = Client('host_identifier', 'api_key')
+        self.schema = {
+            'title': 'text',
+            'price': 'number',
+            'published_at': 'date',
+            'location': 'geolocation',
+        }
+        self.validator = DocumentValidator(self.schema)
+
+        self.base_url = "{}/engines/{}".format(self.client.session.base_url, self.engine_name)
+
+    def test_valid_documents(self):
+        documents = [
+            {'id': '1', 'title': 'Title', 'price': 10, 'published_at': '2020-01-31T10:20:30Z',
+             'location': '37.386, -122.084'},
+            {'id': '2', 'price': '10.5', 'published_at': '2020-01-31', 'new_field': True},
+            {'id': '3', 'price': [1, 2.5], 'title': None, 'location': None},
+        ]
+        for document in documents:
+            self.assertEqual(self.validator.errors(document), [])
+
+    def test_invalid_values(self):
+        self.assertEqual(len(self.validator.errors({'price': 'cheap'})), 1)
+        self.assertEqual(len(self.validator.errors({'price': True})), 1)
+        self.assertEqual(len(self.validator.errors({'price': float('nan')})), 1)
+        self.assertEqual(len(self.validator.errors({'published_at': 'yesterday'})), 1)
+        self.assertEqual(len(self.validator.errors({'location': '91,0'})), 1)
+        self.assertEqual(len(self.validator.errors({'location': [37.3, -122.0]})), 1)
+        self.assertEqual(len(self.validator.errors({'title': {'nested': 'object'}})), 1)
+        self.assertEqual(len(self.validator.errors({'title': [['nested']]})), 1)
+        self.assertEqual(self.validator.errors('document'), ['Document must be an object'])
+
+    def test_invalid_field_names(self):
+        for name in ('Title', 'with-dash', '_private', 'external_id', 'engine_id', 'x' * 65):
+            self.assertEqual(len(self.validator.errors({name: 'value'})), 1, name)
+
+    def test_limits(self):
+        validator = DocumentValidator(self.schema, max_document_bytes=50, max_fields=5)
+        self.assertEqual(len(validator.errors({'title': 'x' * 50})), 1)
+        self.assertEqual(len(validator.errors({'a': 1, 'b': 2})), 1)
+        self.assertEqual(validator.errors({'a': 1, 'id': '1'}), [])
+
+    def test_validate_raises(self):
+        with self.assertRaises(InvalidDocument) as context:
+            self.validator.validate({'id': '1', 'price': 'cheap'})
+        self.assertEqual(context.exception.document, {'id': '1', 'price': 'cheap'})
+
+    def test_merge_statuses(self):
+        valid, rejected = self.validator.partition(
+            [{'id': '1'}, {'id': '2', 'price': 'x'}, {'id': '3'}])
+        self.assertEqual(valid, [{'id': '1'}, {'id': '3'}])
+        self.assertEqual(list(rejected), [1])
+        self.assertEqual(
+            merge_statuses(3, rejected, ['first', 'third']),
+            ['first', rejected[1], 'third'])
+
+    def test_index_documents_with_validation(self):
+        def callback(request, context):
+            return [{'id': doc['id'], 'errors': []} for doc in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.base_url + '/schema', json=self.schema)
+            m.register_uri('POST', self.base_url + '/documents', json=callback)
+            response = self.client.index_documents(
+                self.engine_name,
+                [{'id': '1'}, {'id': '2', 'price': 'x'}, {'id': '3'}],
+                validate=True)
+            self.assertEqual(m.request_history[-1].json(), [{'id': '1'}, {'id': '3'}])
+
+        self.assertEqual([status['id'] for status in response], ['1', '2', '3'])
+        self.assertEqual(response[0]['errors'], [])
+        self.assertEqual(len(response[1]['errors']), 1)
+
+    def test_validator_is_reused_until_schema_update(self):
+        def callback(request, context):
+            return [{'id': doc['id'], 'errors': []} for doc in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.base_url + '/schema', json=self.schema)
+            m.register_uri('POST', self.base_url + '/schema', json=self.schema)
+            m.register_uri('POST', self.base_url + '/documents', json=callback)
+            for _ in range(3):
+                self.client.index_documents(self.engine_name, [{'id': '1'}], validate=True)
+            self.client.update_schema(self.engine_name, {'price': 'number'})
+            self.client.index_documents(self.engine_name, [{'id': '1'}], validate=True)
+            requests = [(r.method, r.path.rsplit('/', 1)[-1]) for r in m.request_history]
+
+        self.assertEqual(requests, [
+            ('GET', 'schema'), ('POST', 'documents'), ('POST', 'documents'),
+            ('POST', 'documents'), ('POST', 'schema'), ('GET', 'schema'),
+            ('POST', 'documents')])
+
+    def test_index_documents_all_invalid(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.base_url + '/schema', json=self.schema)
+            response = self.client.index_documents(
+                self.engine_name, [{'id': '1', 'Title': 'x'}], validate=True)
+            self.assertEqual(m.call_count, 1)
+
+        self.assertEqual(len(response[0]['errors']), 1)
+
+    def test_bulk_index_documents_with_validation(self):
+        documents = ({'id': str(i), 'price': 'x' if i % 7 == 0 else i} for i in range(230))
+
+        def callback(request, context):
+            return [{'id': doc['id'], 'errors': []} for doc in request.json()]
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', self.base_url + '/schema', json=self.schema)
+            m.register_uri('POST', self.base_url + '/documents', json=callback)
+            response = list(self.client.bulk_index_documents(
+                self.engine_name, documents, max_workers=3, validate=True))
+            sent = sum(len(r.json()) for r in m.request_history if r.method == 'POST')
+
+        self.assertEqual([status['id'] for status in response], [str(i) for i in range(230)])
+        failed = [status['id'] for status in response if status['errors']]
+        self.assertEqual(failed, [str(i) for i in range(0, 230, 7)])
+        self.assertEqual(sent, 230 - len(failed))